@@ -0,0 +1,268 @@
+"""
+Admission Control - Per-request deadlines and per-client quotas
+Estimates analysis cost from text length and the recognizer profile, runs the
+analysis off the event loop under a deadline, and degrades to the
+patterns-only path when the full NLP pass would not fit the budget
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from parallel_analysis import effective_parallelism
+from prefilter import ROUTE_FULL, ROUTE_PATTERNS
+from recognizer_profiles import RECOGNIZER_PROFILE
+
+ANALYZE_DEADLINE_MS = float(os.getenv("ANALYZE_DEADLINE_MS", "2000"))
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))
+# Overrunning analyses still occupying workers; past this, new texts go straight to patterns
+ANALYSIS_MAX_OVERRUNS = int(os.getenv("ANALYSIS_MAX_OVERRUNS", str(max(1, ANALYSIS_WORKERS - 1))))
+# Separate pool and deadline for the patterns-only fallback so it never queues behind NLP work
+ANALYSIS_FALLBACK_WORKERS = int(os.getenv("ANALYSIS_FALLBACK_WORKERS", "2"))
+ANALYZE_FALLBACK_DEADLINE_MS = float(os.getenv("ANALYZE_FALLBACK_DEADLINE_MS", "1000"))
+CLIENT_MAX_CONCURRENCY = int(os.getenv("CLIENT_MAX_CONCURRENCY", "4"))
+CLIENT_BYTES_PER_SECOND = float(os.getenv("CLIENT_BYTES_PER_SECOND", "200000"))
+CLIENT_BURST_BYTES = float(os.getenv("CLIENT_BURST_BYTES", "1000000"))
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))
+
+# Starting cost model (ms); the NLP rate is recalibrated from observed runs
+BASE_COST_MS = 2.0
+NER_MS_PER_KCHAR = float(os.getenv("NER_MS_PER_KCHAR", "8"))
+PATTERN_MS_PER_KCHAR = float(os.getenv("PATTERN_MS_PER_KCHAR", "1"))
+
+# Relative cost of each recognizer profile compared to "full"
+PROFILE_COST_FACTORS = {
+    "full": 1.0,
+    "india": 0.85,
+    "us": 0.85,
+    "minimal": 0.6,
+}
+
+# Texts shorter than this are dominated by fixed overhead; don't calibrate on them
+CALIBRATION_MIN_CHARS = 1000
+CALIBRATION_ALPHA = 0.1
+
+
+class AdmissionRejected(Exception):
+    """Raised when a client is over its concurrency or byte-rate quota"""
+
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class _TokenBucket:
+    """Byte-rate bucket; requests larger than the burst are admitted on a full bucket"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, amount: float) -> float:
+        """Take tokens and return 0, or return the seconds to wait before retrying"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        needed = min(amount, self.capacity)
+        if self.tokens < needed:
+            return (needed - self.tokens) / self.rate
+        self.tokens -= amount
+        return 0.0
+
+
+class _ClientState:
+    def __init__(self):
+        self.bucket = _TokenBucket(CLIENT_BYTES_PER_SECOND, CLIENT_BURST_BYTES)
+        self.in_flight = 0
+
+
+class AdmissionController:
+    """Per-client quotas plus deadline-bounded analysis"""
+
+    def __init__(self, deadline_ms: float = ANALYZE_DEADLINE_MS,
+                 workers: int = ANALYSIS_WORKERS, profile: str = RECOGNIZER_PROFILE):
+        self.deadline_ms = deadline_ms
+        self.profile_factor = PROFILE_COST_FACTORS.get(profile, 1.0)
+        self.ner_ms_per_kchar = NER_MS_PER_KCHAR
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis")
+        self._fallback_executor = ThreadPoolExecutor(
+            max_workers=ANALYSIS_FALLBACK_WORKERS, thread_name_prefix="analysis-fallback")
+        self._overruns = 0
+        self._clients: "OrderedDict[str, _ClientState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "admitted": 0,
+            "rejected_concurrency": 0,
+            "rejected_rate": 0,
+            "degraded_estimated_cost": 0,
+            "degraded_deadline": 0,
+            "degraded_overloaded": 0,
+            "fallback_timeouts": 0,
+        }
+
+    @contextmanager
+    def admit(self, client_id: str, size: int):
+        """
+        Hold a concurrency slot for a client for the duration of a request
+
+        Pass the yielded slot to run_analysis: an analysis that overruns its
+        deadline keeps holding the slot until its worker actually finishes.
+
+        Args:
+            client_id: Quota key from main.client_key (client IP, or tenant id from a trusted proxy)
+            size: Request text size in bytes (charged to the byte-rate bucket)
+
+        Raises:
+            AdmissionRejected: Client is over its concurrency or byte-rate quota
+        """
+        with self._lock:
+            state = self._clients.pop(client_id, None) or _ClientState()
+            self._clients[client_id] = state
+            while len(self._clients) > ADMISSION_MAX_CLIENTS:
+                idle_id = next((key for key, value in self._clients.items() if value.in_flight == 0), None)
+                if idle_id is None:
+                    break
+                del self._clients[idle_id]
+
+            if state.in_flight >= CLIENT_MAX_CONCURRENCY:
+                self._stats["rejected_concurrency"] += 1
+                raise AdmissionRejected("Too many concurrent requests for this client", 1.0)
+            wait = state.bucket.take(size)
+            if wait:
+                self._stats["rejected_rate"] += 1
+                raise AdmissionRejected("Byte-rate quota exceeded for this client", wait)
+            state.in_flight += 1
+            self._stats["admitted"] += 1
+        try:
+            yield state
+        finally:
+            with self._lock:
+                state.in_flight -= 1
+
+    def estimate_cost_ms(self, length: int, route: str = ROUTE_FULL) -> float:
+        """Estimated analysis time for a text of this many characters on the given route"""
+        kchars = length / 1000
+        if route == ROUTE_PATTERNS:
+            return BASE_COST_MS + kchars * PATTERN_MS_PER_KCHAR
+        # Long documents are split across worker processes (parallel_analysis)
+        ner_ms = kchars * self.ner_ms_per_kchar * self.profile_factor / effective_parallelism(length)
+        return BASE_COST_MS + ner_ms + kchars * PATTERN_MS_PER_KCHAR
+
+    def _calibrate(self, length: int, elapsed_ms: float):
+        if length < CALIBRATION_MIN_CHARS:
+            return
+        kchars = length / 1000
+        observed = max(0.0, (elapsed_ms - BASE_COST_MS) / kchars - PATTERN_MS_PER_KCHAR)
+        observed *= effective_parallelism(length) / self.profile_factor
+        with self._lock:
+            self.ner_ms_per_kchar += CALIBRATION_ALPHA * (observed - self.ner_ms_per_kchar)
+
+    def _hold_until_done(self, future: Future, slot: Optional[_ClientState]):
+        """Keep charging an abandoned worker to its client and the overrun budget until it finishes"""
+        if future.cancel():
+            return  # Never started: nothing left running
+        with self._lock:
+            self._overruns += 1
+            if slot is not None:
+                slot.in_flight += 1
+
+        def release(_):
+            with self._lock:
+                self._overruns -= 1
+                if slot is not None:
+                    slot.in_flight -= 1
+
+        future.add_done_callback(release)
+
+    async def _bounded(self, executor: ThreadPoolExecutor, call, timeout_s: float,
+                       slot: Optional[_ClientState]) -> Dict:
+        """Run call in executor; on timeout the worker stays charged until it finishes"""
+        future = executor.submit(call)
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=timeout_s)
+        except asyncio.TimeoutError:
+            self._hold_until_done(future, slot)
+            raise
+
+    async def run_analysis(self, analyze, text, size: Optional[int] = None,
+                           slot: Optional[_ClientState] = None, **kwargs) -> Dict:
+        """
+        Run analyze(text, **kwargs) in the worker pool under the deadline
+
+        Texts whose estimated cost exceeds the deadline, or that arrive while
+        too many overrunning analyses still occupy the pool, go straight to the
+        patterns-only route. If the full analysis overruns, the patterns-only
+        result is returned instead; the overrunning worker cannot be
+        interrupted, so it keeps the client's slot and counts against
+        ANALYSIS_MAX_OVERRUNS until it finishes. The fallback runs on its own
+        pool under ANALYZE_FALLBACK_DEADLINE_MS.
+
+        Args:
+            analyze: analyze_text, or another analysis function taking force_route
+            text: Input passed to analyze
+            size: Characters to analyze, for the cost estimate (default: len(text))
+            slot: Client slot yielded by admit()
+
+        Returns:
+            The analysis result with "degraded" and "degraded_reason" added
+
+        Raises:
+            AdmissionRejected: The patterns-only fallback overran as well
+        """
+        deadline_ms = self.deadline_ms
+        length = len(text) if size is None else size
+        reason = None
+
+        with self._lock:
+            overloaded = self._overruns >= ANALYSIS_MAX_OVERRUNS
+        if overloaded:
+            reason = "overloaded"
+        elif self.estimate_cost_ms(length) > deadline_ms:
+            reason = "estimated_cost"
+        else:
+            started = time.perf_counter()
+            try:
+                result = await self._bounded(
+                    self._executor, lambda: analyze(text, **kwargs), deadline_ms / 1000, slot)
+                if result.get("route") == ROUTE_FULL:
+                    self._calibrate(length, (time.perf_counter() - started) * 1000)
+                result["degraded"] = False
+                result["degraded_reason"] = None
+                return result
+            except asyncio.TimeoutError:
+                reason = "deadline"
+
+        with self._lock:
+            self._stats[f"degraded_{reason}"] += 1
+        try:
+            result = await self._bounded(
+                self._fallback_executor, lambda: analyze(text, force_route=ROUTE_PATTERNS, **kwargs),
+                ANALYZE_FALLBACK_DEADLINE_MS / 1000, slot)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._stats["fallback_timeouts"] += 1
+            raise AdmissionRejected("Analysis capacity exhausted, retry later", 1.0)
+        result["degraded"] = True
+        result["degraded_reason"] = reason
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "deadline_ms": self.deadline_ms,
+                "overruns_running": self._overruns,
+                "ner_ms_per_kchar": round(self.ner_ms_per_kchar, 3),
+                "clients": len(self._clients),
+                "in_flight": sum(state.in_flight for state in self._clients.values()),
+            }
+
+
+admission = AdmissionController()
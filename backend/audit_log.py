@@ -0,0 +1,274 @@
+"""
+Audit Log - Server-side analysis history with a non-blocking write path
+Request handlers drop records into an in-memory ring buffer; a background
+task flushes them in batches to SQLite and/or JSONL (MongoDB optional)
+IMPORTANT: Records hold no text at all - only entity types, counts, score and timing
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+AUDIT_SINKS = [s.strip() for s in os.getenv("AUDIT_SINKS", "sqlite").lower().split(",") if s.strip()]
+AUDIT_DB_PATH = os.getenv("AUDIT_DB_PATH", "audit.db")
+AUDIT_JSONL_PATH = os.getenv("AUDIT_JSONL_PATH", "audit.jsonl")
+AUDIT_BUFFER_SIZE = int(os.getenv("AUDIT_BUFFER_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+MONGODB_URI = os.getenv("MONGODB_URI", "")
+MONGODB_DB = os.getenv("MONGODB_DB", "privacyshield")
+
+
+def build_audit_record(endpoint: str, entities: List[Dict], privacy_score: int,
+                       processing_ms: float, route: Optional[str] = None,
+                       language: Optional[str] = None) -> Dict:
+    """
+    Build a redacted-only audit record from an analysis result
+
+    Args:
+        endpoint: API endpoint that served the request
+        entities: Detected entities (only their types are kept)
+        privacy_score: Privacy risk score
+        processing_ms: Analysis time in milliseconds
+        route: Pre-filter route taken
+        language: Language the text was analyzed as
+
+    Returns:
+        Dict safe to persist (no original or redacted text)
+    """
+    return {
+        "timestamp": time.time(),
+        "endpoint": endpoint,
+        "entity_types": dict(Counter(entity["entity_type"] for entity in entities)),
+        "entity_count": len(entities),
+        "privacy_score": privacy_score,
+        "processing_ms": round(processing_ms, 2),
+        "route": route,
+        "language": language,
+    }
+
+
+class SQLiteAuditSink:
+    """Audit records in SQLite, indexed by timestamp and entity type"""
+
+    def __init__(self, path: str = AUDIT_DB_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL syncs the WAL on every commit (one fsync per batch, not per record),
+        # so a committed batch survives a power loss
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS audit_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp REAL NOT NULL,
+                endpoint TEXT,
+                entity_count INTEGER NOT NULL,
+                privacy_score INTEGER NOT NULL,
+                processing_ms REAL,
+                route TEXT,
+                language TEXT
+            );
+            CREATE TABLE IF NOT EXISTS audit_entities (
+                log_id INTEGER NOT NULL REFERENCES audit_logs(id),
+                entity_type TEXT NOT NULL,
+                count INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp ON audit_logs(timestamp);
+            CREATE INDEX IF NOT EXISTS idx_audit_entities_type ON audit_entities(entity_type, log_id);
+            CREATE INDEX IF NOT EXISTS idx_audit_entities_log ON audit_entities(log_id);
+        """)
+        self._conn.commit()
+
+    def write_batch(self, records: List[Dict]):
+        with self._lock:
+            cursor = self._conn.cursor()
+            for record in records:
+                cursor.execute(
+                    "INSERT INTO audit_logs (timestamp, endpoint, entity_count, privacy_score, "
+                    "processing_ms, route, language) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (record["timestamp"], record["endpoint"], record["entity_count"],
+                     record["privacy_score"], record["processing_ms"], record["route"],
+                     record["language"]))
+                log_id = cursor.lastrowid
+                cursor.executemany(
+                    "INSERT INTO audit_entities (log_id, entity_type, count) VALUES (?, ?, ?)",
+                    [(log_id, entity_type, count) for entity_type, count in record["entity_types"].items()])
+            self._conn.commit()
+
+    def query(self, limit: int = 50, before_id: Optional[int] = None,
+              entity_type: Optional[str] = None) -> List[Dict]:
+        """Most recent records first, paged by id (keyset pagination)"""
+        conditions = []
+        params: List = []
+        if before_id is not None:
+            conditions.append("l.id < ?")
+            params.append(before_id)
+        if entity_type:
+            conditions.append("l.id IN (SELECT log_id FROM audit_entities WHERE entity_type = ?)")
+            params.append(entity_type)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT l.id, l.timestamp, l.endpoint, l.entity_count, l.privacy_score, "
+                f"l.processing_ms, l.route, l.language FROM audit_logs l {where} "
+                f"ORDER BY l.id DESC LIMIT ?", params).fetchall()
+            ids = [row[0] for row in rows]
+            entity_rows = []
+            if ids:
+                placeholders = ",".join("?" * len(ids))
+                entity_rows = self._conn.execute(
+                    f"SELECT log_id, entity_type, count FROM audit_entities WHERE log_id IN ({placeholders})",
+                    ids).fetchall()
+
+        entity_types: Dict[int, Dict[str, int]] = {}
+        for log_id, name, count in entity_rows:
+            entity_types.setdefault(log_id, {})[name] = count
+        return [{
+            "id": row[0],
+            "timestamp": row[1],
+            "endpoint": row[2],
+            "entity_count": row[3],
+            "privacy_score": row[4],
+            "processing_ms": row[5],
+            "route": row[6],
+            "language": row[7],
+            "entity_types": entity_types.get(row[0], {}),
+        } for row in rows]
+
+
+class JSONLAuditSink:
+    """Append-only JSON lines file, fsynced once per batch"""
+
+    def __init__(self, path: str = AUDIT_JSONL_PATH):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write_batch(self, records: List[Dict]):
+        self._file.write("".join(json.dumps(record) + "\n" for record in records))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+class MongoAuditSink:
+    """Audit records in MongoDB (requires pymongo)"""
+
+    def __init__(self, uri: str = MONGODB_URI, database: str = MONGODB_DB):
+        from pymongo import MongoClient, ASCENDING
+        self._collection = MongoClient(uri)[database]["audit_logs"]
+        self._collection.create_index([("timestamp", ASCENDING)])
+        self._collection.create_index([("entity_types_list", ASCENDING)])
+
+    def write_batch(self, records: List[Dict]):
+        self._collection.insert_many([
+            {**record, "entity_types_list": list(record["entity_types"].keys())} for record in records
+        ], ordered=False)
+
+
+class AuditLog:
+    """Ring buffer plus background batch flusher"""
+
+    def __init__(self, sinks: List[str] = AUDIT_SINKS):
+        self._buffer: deque = deque(maxlen=AUDIT_BUFFER_SIZE)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.sinks = []
+        self.queryable: Optional[SQLiteAuditSink] = None
+        self.written = 0  # Records persisted by every sink
+        self.written_by_sink: Dict[str, int] = {}
+        self.dropped = 0
+        self.failed_batches = 0
+
+        for name in sinks:
+            try:
+                if name == "sqlite":
+                    sink = SQLiteAuditSink()
+                    self.queryable = sink
+                elif name == "jsonl":
+                    sink = JSONLAuditSink()
+                elif name == "mongo":
+                    sink = MongoAuditSink()
+                else:
+                    print(f"Unknown audit sink '{name}', skipping")
+                    continue
+                self.sinks.append(sink)
+            except Exception as e:
+                print(f"Audit sink '{name}' disabled: {str(e)}")
+
+    def record(self, entry: Dict):
+        """Queue a record without blocking (the oldest record is dropped when full)"""
+        if not self.sinks:
+            return
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(entry)
+        if self._wakeup is not None and len(self._buffer) >= AUDIT_BATCH_SIZE:
+            self._wakeup.set()
+
+    def _drain(self) -> List[Dict]:
+        batch = []
+        while self._buffer and len(batch) < AUDIT_BATCH_SIZE:
+            batch.append(self._buffer.popleft())
+        return batch
+
+    def _write(self, batch: List[Dict]):
+        all_written = True
+        for sink in self.sinks:
+            name = type(sink).__name__
+            try:
+                sink.write_batch(batch)
+            except Exception as e:
+                all_written = False
+                self.failed_batches += 1
+                print(f"Audit flush to {name} failed: {str(e)}")
+            else:
+                self.written_by_sink[name] = self.written_by_sink.get(name, 0) + len(batch)
+        if all_written:
+            self.written += len(batch)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=AUDIT_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Write everything currently buffered, batch by batch, off the event loop"""
+        while self._buffer:
+            await asyncio.to_thread(self._write, self._drain())
+
+    def start(self):
+        if self.sinks and self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict:
+        return {
+            "sinks": [type(sink).__name__ for sink in self.sinks],
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "written_by_sink": dict(self.written_by_sink),
+            "dropped": self.dropped,
+            "failed_batches": self.failed_batches,
+        }
+
+
+audit_log = AuditLog()
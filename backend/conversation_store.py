@@ -0,0 +1,235 @@
+"""
+Conversation Store - Server-side history of already-redacted chat turns
+New turns are analyzed alone and appended; history sent upstream is kept
+within a token budget
+IMPORTANT: Only stores REDACTED text, never raw PII
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+CONVERSATION_STORE = os.getenv("CONVERSATION_STORE", "memory").lower()
+CONVERSATION_DB_PATH = os.getenv("CONVERSATION_DB_PATH", "conversations.db")
+CONVERSATION_MAX = int(os.getenv("CONVERSATION_MAX", "10000"))
+CONVERSATION_TTL_SECONDS = int(os.getenv("CONVERSATION_TTL_SECONDS", "3600"))
+CONVERSATION_MAX_TURNS = int(os.getenv("CONVERSATION_MAX_TURNS", "200"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+HISTORY_SUMMARY_CHARS = int(os.getenv("HISTORY_SUMMARY_CHARS", "400"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token for English)"""
+    return len(text) // 4 + 1
+
+
+class InMemoryConversationStore:
+    """Conversations in an LRU dict with idle-time expiry"""
+
+    def __init__(self, max_conversations: int = CONVERSATION_MAX,
+                 ttl_seconds: int = CONVERSATION_TTL_SECONDS,
+                 max_turns: int = CONVERSATION_MAX_TURNS):
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self._conversations: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        # Oldest entries are at the front, so stop at the first live one
+        while self._conversations:
+            conversation_id, conversation = next(iter(self._conversations.items()))
+            if now - conversation["updated"] <= self.ttl_seconds:
+                break
+            del self._conversations[conversation_id]
+
+    def get_turns(self, conversation_id: str) -> List[Dict]:
+        with self._lock:
+            self._expire(time.time())
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                return []
+            return list(conversation["turns"])
+
+    def append(self, conversation_id: str, role: str, content: str):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            conversation = self._conversations.pop(conversation_id, None)
+            if conversation is None:
+                conversation = {"turns": [], "updated": now}
+                while len(self._conversations) >= self.max_conversations:
+                    self._conversations.popitem(last=False)
+            conversation["turns"].append({
+                "role": role,
+                "content": content,
+                "tokens": estimate_tokens(content),
+            })
+            if len(conversation["turns"]) > self.max_turns:
+                del conversation["turns"][:-self.max_turns]
+            conversation["updated"] = now
+            self._conversations[conversation_id] = conversation
+
+    def delete(self, conversation_id: str) -> bool:
+        with self._lock:
+            return self._conversations.pop(conversation_id, None) is not None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "conversations": len(self._conversations),
+                "turns": sum(len(c["turns"]) for c in self._conversations.values()),
+            }
+
+
+class SQLiteConversationStore:
+    """Conversations persisted in SQLite, expired by idle time"""
+
+    def __init__(self, path: str = CONVERSATION_DB_PATH,
+                 ttl_seconds: int = CONVERSATION_TTL_SECONDS,
+                 max_turns: int = CONVERSATION_MAX_TURNS):
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                updated REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS turns (
+                conversation_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                PRIMARY KEY (conversation_id, seq)
+            );
+            CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations(updated);
+        """)
+        self._conn.commit()
+
+    def _purge(self, now: float):
+        # Expiry is a table scan on the index; do it at most once a minute
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        cutoff = now - self.ttl_seconds
+        self._conn.execute(
+            "DELETE FROM turns WHERE conversation_id IN (SELECT id FROM conversations WHERE updated < ?)",
+            (cutoff,))
+        self._conn.execute("DELETE FROM conversations WHERE updated < ?", (cutoff,))
+        self._conn.commit()
+
+    def get_turns(self, conversation_id: str) -> List[Dict]:
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            row = self._conn.execute(
+                "SELECT updated FROM conversations WHERE id = ?", (conversation_id,)).fetchone()
+            if row is None or now - row[0] > self.ttl_seconds:
+                return []
+            rows = self._conn.execute(
+                "SELECT role, content, tokens FROM turns WHERE conversation_id = ? ORDER BY seq",
+                (conversation_id,)).fetchall()
+        return [{"role": role, "content": content, "tokens": tokens} for role, content, tokens in rows]
+
+    def append(self, conversation_id: str, role: str, content: str):
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            row = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) FROM turns WHERE conversation_id = ?",
+                (conversation_id,)).fetchone()
+            seq = row[0] + 1
+            self._conn.execute(
+                "INSERT INTO turns (conversation_id, seq, role, content, tokens) VALUES (?, ?, ?, ?, ?)",
+                (conversation_id, seq, role, content, estimate_tokens(content)))
+            self._conn.execute(
+                "DELETE FROM turns WHERE conversation_id = ? AND seq <= ?",
+                (conversation_id, seq - self.max_turns))
+            self._conn.execute(
+                "INSERT INTO conversations (id, updated) VALUES (?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET updated = excluded.updated",
+                (conversation_id, now))
+            self._conn.commit()
+
+    def delete(self, conversation_id: str) -> bool:
+        with self._lock:
+            self._conn.execute("DELETE FROM turns WHERE conversation_id = ?", (conversation_id,))
+            cursor = self._conn.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            conversations = self._conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+            turns = self._conn.execute("SELECT COUNT(*) FROM turns").fetchone()[0]
+        return {"backend": "sqlite", "conversations": conversations, "turns": turns}
+
+
+def create_conversation_store():
+    """Create the store selected by CONVERSATION_STORE (memory or sqlite)"""
+    if CONVERSATION_STORE == "sqlite":
+        return SQLiteConversationStore()
+    return InMemoryConversationStore()
+
+
+def _summarize_turns(turns: List[Dict], max_chars: int) -> str:
+    """Cheap extractive summary: the first sentence of each dropped turn"""
+    lines = []
+    used = 0
+    for turn in turns:
+        first_sentence = turn["content"].split(". ")[0].strip()
+        if len(first_sentence) > 120:
+            first_sentence = first_sentence[:117] + "..."
+        line = f"{turn['role']}: {first_sentence}"
+        if used + len(line) > max_chars:
+            break
+        lines.append(line)
+        used += len(line)
+    return "Summary of earlier conversation:\n" + "\n".join(lines)
+
+
+def build_history(turns: List[Dict], token_budget: int = HISTORY_TOKEN_BUDGET,
+                  summarize: bool = True) -> List[Dict[str, str]]:
+    """
+    Select the history to send upstream within a token budget
+
+    The most recent turns are kept whole; older turns that don't fit are
+    dropped and, if summarize is set, replaced by a short system summary.
+
+    Args:
+        turns: Stored turns, oldest first
+        token_budget: Maximum estimated tokens of history
+        summarize: Add a summary message for dropped turns
+
+    Returns:
+        List of {"role", "content"} messages, oldest first
+    """
+    summary_budget = estimate_tokens("x" * HISTORY_SUMMARY_CHARS) if summarize else 0
+    remaining = token_budget
+    kept = []
+    for index in range(len(turns) - 1, -1, -1):
+        tokens = turns[index]["tokens"]
+        # Once anything is dropped, leave room for the summary
+        reserve = summary_budget if index > 0 else 0
+        if tokens + reserve > remaining:
+            break
+        kept.append(turns[index])
+        remaining -= tokens
+    kept.reverse()
+
+    history = [{"role": turn["role"], "content": turn["content"]} for turn in kept]
+    dropped = turns[:len(turns) - len(kept)]
+    if dropped and summarize:
+        history.insert(0, {
+            "role": "system",
+            "content": _summarize_turns(dropped, HISTORY_SUMMARY_CHARS),
+        })
+    return history
@@ -0,0 +1,268 @@
+"""
+Dedup - Analyze repeated lines once across batch and stream workloads
+Lines that repeat (signatures, headers, disclaimers) are cut out of each text
+and analyzed once, with their raw spans fanned back out, rebased, to every
+occurrence. The lines between them stay together as one block, so a text with
+no repeated line is analyzed whole and entities spanning lines keep their
+context. A count-min sketch tracks line frequency in bounded memory and only
+repeated lines enter the LRU cache of analyzed segments
+"""
+import hashlib
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from language_engines import DEFAULT_LANGUAGE, detect_language, language_engines
+from prefilter import ROUTE_FULL, ROUTE_PATTERNS, ROUTE_SKIP, screen_text
+from profiling import profiled
+from privacy_engine import EntitySpan, collect_spans, finalize_analysis, get_engine_state, intern_entity_type
+
+DEDUP_CACHE_SIZE = int(os.getenv("DEDUP_CACHE_SIZE", "50000"))
+DEDUP_MIN_COUNT = int(os.getenv("DEDUP_MIN_COUNT", "2"))
+DEDUP_MAX_SEGMENT_CHARS = int(os.getenv("DEDUP_MAX_SEGMENT_CHARS", "2000"))
+DEDUP_SKETCH_WIDTH = int(os.getenv("DEDUP_SKETCH_WIDTH", "65536"))
+DEDUP_SKETCH_DEPTH = int(os.getenv("DEDUP_SKETCH_DEPTH", "4"))
+# Counters are halved after this many updates, so counts reflect recent traffic
+DEDUP_SKETCH_WINDOW = int(os.getenv("DEDUP_SKETCH_WINDOW", "200000"))
+
+LINE = re.compile(r"[^\n]+")
+
+# Route precedence when reporting one route for a multi-segment text
+_ROUTE_RANK = {ROUTE_SKIP: 0, ROUTE_PATTERNS: 1, ROUTE_FULL: 2}
+
+SpanTuple = Tuple[str, int, int, float]
+
+
+def split_segments(text: str) -> List[Tuple[int, str]]:
+    """Non-blank lines of a text with their start offsets"""
+    return [(match.start(), match.group()) for match in LINE.finditer(text) if match.group().strip()]
+
+
+def group_segments(text: str, lines: List[Tuple[int, str]], repeated: List[bool]) -> List[Tuple[int, str, bool]]:
+    """
+    Keep repeated lines as their own segments and merge each run of other lines
+
+    Args:
+        text: Full text
+        lines: split_segments(text)
+        repeated: Whether each line is a dedup candidate
+
+    Returns:
+        (offset, segment, repeated) tuples; a run of non-repeated lines becomes
+        one segment spanning from its first line to the end of its last
+    """
+    segments = []
+    run_start = run_end = None
+    for (offset, line), is_repeated in zip(lines, repeated):
+        if is_repeated:
+            if run_start is not None:
+                segments.append((run_start, text[run_start:run_end], False))
+                run_start = None
+            segments.append((offset, line, True))
+        else:
+            if run_start is None:
+                run_start = offset
+            run_end = offset + len(line)
+    if run_start is not None:
+        segments.append((run_start, text[run_start:run_end], False))
+    return segments
+
+
+class CountMinSketch:
+    """Approximate frequency counts in fixed memory (never undercounts)"""
+
+    def __init__(self, width: int = DEDUP_SKETCH_WIDTH, depth: int = DEDUP_SKETCH_DEPTH,
+                 window: int = DEDUP_SKETCH_WINDOW):
+        self.width = width
+        self.depth = depth
+        self.window = window
+        self.rows = [array("I", bytes(4 * width)) for _ in range(depth)]
+        self.updates = 0
+
+    def _indexes(self, digest: bytes):
+        for row in range(self.depth):
+            yield row, int.from_bytes(digest[row * 4:row * 4 + 4], "little") % self.width
+
+    def add(self, digest: bytes) -> int:
+        """Count one occurrence and return the new estimate"""
+        self.updates += 1
+        if self.updates >= self.window:
+            self._decay()
+        estimate = None
+        for row, index in self._indexes(digest):
+            counters = self.rows[row]
+            if counters[index] < 0xFFFFFFFF:
+                counters[index] += 1
+            estimate = counters[index] if estimate is None else min(estimate, counters[index])
+        return estimate
+
+    def _decay(self):
+        for counters in self.rows:
+            for index, value in enumerate(counters):
+                if value:
+                    counters[index] = value >> 1
+        self.updates = 0
+
+
+class SegmentDeduplicator:
+    """Frequency sketch plus bounded LRU of analyzed segments"""
+
+    def __init__(self, cache_size: int = DEDUP_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.sketch = CountMinSketch()
+        self._cache: "OrderedDict[bytes, Tuple[str, List[SpanTuple]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "segments": 0,
+            "segments_analyzed": 0,
+            "cache_hits": 0,
+            "chars": 0,
+            "chars_analyzed": 0,
+        }
+
+    @staticmethod
+    def segment_key(segment: str, language: str, route_mode: str, config_version: str) -> bytes:
+        """Cache key: segment hash scoped to the language, route mode and recognizer config"""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{config_version}\0{language}\0{route_mode}\0".encode())
+        digest.update(segment.encode("utf-8", "surrogatepass"))
+        return digest.digest()
+
+    def _lookup(self, key: bytes) -> Optional[Tuple[str, List[SpanTuple]]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+            return entry
+
+    def _remember(self, key: bytes, entry: Tuple[str, List[SpanTuple]]):
+        with self._lock:
+            self._cache[key] = entry
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def analyze_batch(self, texts: List[str], language: str = "en", force_route: Optional[str] = None) -> Dict:
+        """
+        Analyze many texts, analyzing each distinct repeated line only once
+
+        Args:
+            texts: Texts to analyze
+            language: Language code, or "auto" to detect it per text
+            force_route: Force a pre-filter route (ROUTE_PATTERNS when degraded)
+
+        Returns:
+            Dict with one analyze_text-style result per text and dedup stats
+        """
+        state = get_engine_state()
+        route_mode = force_route or "auto"
+        languages = []
+        for text in texts:
+            text_language = detect_language(text) if language == "auto" else language
+            if text_language != DEFAULT_LANGUAGE and language_engines.get(text_language) is None:
+                text_language = DEFAULT_LANGUAGE  # No model for this language
+            languages.append(text_language)
+
+        # Hash every line first so the sketch sees within-batch repeats too
+        text_lines = []
+        counts: Dict[bytes, int] = {}
+        with self._lock:
+            for text, text_language in zip(texts, languages):
+                lines = []
+                for offset, line in split_segments(text):
+                    key = self.segment_key(line, text_language, route_mode, state.config_version)
+                    counts[key] = self.sketch.add(key)
+                    lines.append((offset, line, key))
+                text_lines.append(lines)
+            cached = {key for lines in text_lines for _, _, key in lines if key in self._cache}
+
+        # Only repeated lines are cut out; the lines between them stay one segment
+        document_segments = []
+        unique: Dict[bytes, Tuple[str, str, bool]] = {}
+        segments_total = chars_total = 0
+        for text, text_language, lines in zip(texts, languages, text_lines):
+            repeated = [counts[key] >= DEDUP_MIN_COUNT or key in cached for _, _, key in lines]
+            keys = {offset: key for offset, _, key in lines}
+            keyed = []
+            for offset, segment, is_repeated in group_segments(text, [(o, l) for o, l, _ in lines], repeated):
+                if is_repeated:
+                    key = keys[offset]
+                else:
+                    key = self.segment_key(segment, text_language, route_mode, state.config_version)
+                keyed.append((offset, key))
+                segments_total += 1
+                chars_total += len(segment)
+                unique.setdefault(key, (segment, text_language, is_repeated))
+            document_segments.append(keyed)
+
+        # Every distinct segment is analyzed at most once
+        batch: Dict[bytes, Tuple[str, List[SpanTuple]]] = {}
+        chars_analyzed = analyzed = cache_hits = 0
+        for key, (segment, text_language, is_repeated) in unique.items():
+            entry = self._lookup(key)
+            if entry is not None:
+                cache_hits += 1
+            else:
+                route = force_route or screen_text(segment)
+                spans = [] if route == ROUTE_SKIP else collect_spans(segment, text_language, route, state)
+                entry = (route, [(span.entity_type, span.start, span.end, span.score) for span in spans])
+                analyzed += 1
+                chars_analyzed += len(segment)
+                if is_repeated and len(segment) <= DEDUP_MAX_SEGMENT_CHARS:
+                    self._remember(key, entry)
+            batch[key] = entry
+
+        # Fan results out to every occurrence, then resolve per text
+        results = []
+        for text, text_language, keyed in zip(texts, languages, document_segments):
+            route = ROUTE_SKIP
+            spans = []
+            for offset, key in keyed:
+                segment_route, segment_spans = batch[key]
+                if _ROUTE_RANK[segment_route] > _ROUTE_RANK[route]:
+                    route = segment_route
+                spans.extend(
+                    EntitySpan(intern_entity_type(entity_type), start + offset, end + offset, score)
+                    for entity_type, start, end, score in segment_spans
+                )
+            results.append(finalize_analysis(text, spans, route, text_language, state))
+
+        with self._lock:
+            self._stats["segments"] += segments_total
+            self._stats["segments_analyzed"] += analyzed
+            self._stats["cache_hits"] += cache_hits
+            self._stats["chars"] += chars_total
+            self._stats["chars_analyzed"] += chars_analyzed
+
+        return {
+            "results": results,
+            "dedup": {
+                "segments": segments_total,
+                "unique_segments": len(batch),
+                "analyzed_segments": analyzed,
+                "cache_hits": cache_hits,
+                "dedup_ratio": round(1 - len(batch) / segments_total, 4) if segments_total else 0.0,
+                "saved_compute": round(1 - chars_analyzed / chars_total, 4) if chars_total else 0.0,
+            },
+            "route": force_route or "batch",
+            "config_version": state.config_version,
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_segments"] = len(self._cache)
+        stats["dedup_ratio"] = round(1 - stats["segments_analyzed"] / stats["segments"], 4) if stats["segments"] else 0.0
+        stats["saved_compute"] = round(1 - stats["chars_analyzed"] / stats["chars"], 4) if stats["chars"] else 0.0
+        return stats
+
+
+deduplicator = SegmentDeduplicator()
+
+
+@profiled("analyze_batch")
+def analyze_batch(texts: List[str], language: str = "en", force_route: Optional[str] = None) -> Dict:
+    """Module-level entry point for admission.run_analysis (see SegmentDeduplicator.analyze_batch)"""
+    return deduplicator.analyze_batch(texts, language, force_route)
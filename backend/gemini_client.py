@@ -5,6 +5,9 @@ IMPORTANT: Only receives REDACTED text, never raw PII
 import os
 import aiohttp
 import json
+from typing import List, Dict, Optional
+
+from profiling import profiled
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "models/gemini-flash-latest")
@@ -14,28 +17,43 @@ GEMINI_API_URL = os.getenv(
 )
 
 
-async def query_gemini(redacted_text: str) -> str:
+def _build_contents(
+    redacted_text: str,
+    conversation_history: Optional[List[Dict[str, str]]] = None
+) -> Dict:
     """
-    Send ONLY redacted text to Gemini API
+    Convert OpenAI-style messages into Gemini contents/systemInstruction
     
     Args:
-        redacted_text: Text with PII already redacted (e.g., [PERSON], [EMAIL])
+        redacted_text: Current redacted user message
+        conversation_history: Optional previous messages ({"role", "content"})
     
     Returns:
-        Gemini's response string
+        Dict with "contents" and, if there were system messages, "systemInstruction"
     """
-    if not GEMINI_API_KEY or GEMINI_API_KEY == "YOUR_GEMINI_API_KEY_HERE":
-        return "⚠️ Gemini API key not configured. Please add your key to .env file."
+    contents = []
+    system_parts = []
+    for message in conversation_history or []:
+        if message["role"] == "system":
+            system_parts.append({"text": message["content"]})
+        else:
+            role = "model" if message["role"] == "assistant" else "user"
+            contents.append({"role": role, "parts": [{"text": message["content"]}]})
+    contents.append({"role": "user", "parts": [{"text": redacted_text}]})
     
-    url = f"{GEMINI_API_URL}/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
-    
-    # Proper payload structure for Gemini API
-    payload = {
-        "contents": [{
-            "parts": [{
-                "text": redacted_text
-            }]
-        }],
+    request_parts = {"contents": contents}
+    if system_parts:
+        request_parts["systemInstruction"] = {"parts": system_parts}
+    return request_parts
+
+
+def _build_payload(
+    redacted_text: str,
+    conversation_history: Optional[List[Dict[str, str]]] = None
+) -> Dict:
+    """Build the generateContent/streamGenerateContent request body"""
+    return {
+        **_build_contents(redacted_text, conversation_history),
         "generationConfig": {
             "temperature": 0.9,
             "topK": 40,
@@ -61,6 +79,35 @@ async def query_gemini(redacted_text: str) -> str:
             }
         ]
     }
+
+
+@profiled("gemini")
+async def query_gemini(
+    redacted_text: str,
+    conversation_history: Optional[List[Dict[str, str]]] = None,
+    model: Optional[str] = None
+) -> str:
+    """
+    Send ONLY redacted text to Gemini API
+    
+    Args:
+        redacted_text: Text with PII already redacted (e.g., [PERSON], [EMAIL])
+        conversation_history: Optional list of previous (redacted) messages for context
+        model: Gemini model to use (default: GEMINI_MODEL); "models/" is added if missing
+    
+    Returns:
+        Gemini's response string
+    """
+    if not GEMINI_API_KEY or GEMINI_API_KEY == "YOUR_GEMINI_API_KEY_HERE":
+        return "⚠️ Gemini API key not configured. Please add your key to .env file."
+    
+    model = model or GEMINI_MODEL
+    if not model.startswith(("models/", "tunedModels/")):
+        model = f"models/{model}"  # "gemini-1.5-flash" from a fan-out target
+    url = f"{GEMINI_API_URL}/{model}:generateContent?key={GEMINI_API_KEY}"
+    
+    # Proper payload structure for Gemini API
+    payload = _build_payload(redacted_text, conversation_history)
     
     headers = {
         "Content-Type": "application/json"
@@ -133,3 +180,55 @@ async def query_gemini(redacted_text: str) -> str:
     except Exception as e:
         print(f"Unexpected error in query_gemini: {str(e)}")
         return f"⚠️ Unexpected error: {str(e)}"
+
+
+@profiled("gemini_streaming")
+async def query_gemini_streaming(
+    redacted_text: str,
+    conversation_history: Optional[List[Dict[str, str]]] = None
+):
+    """
+    Stream responses from Gemini API (streamGenerateContent over SSE)
+    
+    Args:
+        redacted_text: Text with PII already redacted
+        conversation_history: Optional list of previous (redacted) messages for context
+    
+    Yields:
+        Chunks of text as they arrive from the API
+    """
+    if not GEMINI_API_KEY or GEMINI_API_KEY == "YOUR_GEMINI_API_KEY_HERE":
+        yield "⚠️ Gemini API key not configured."
+        return
+    
+    url = f"{GEMINI_API_URL}/{GEMINI_MODEL}:streamGenerateContent?alt=sse&key={GEMINI_API_KEY}"
+    payload = _build_payload(redacted_text, conversation_history)
+    
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.post(
+                url,
+                json=payload,
+                headers={"Content-Type": "application/json"},
+                timeout=aiohttp.ClientTimeout(total=60)
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    print(f"Gemini API error {response.status}: {error_text}")
+                    yield f"⚠️ Gemini API error ({response.status}). Check logs for details."
+                    return
+                
+                async for line in response.content:
+                    line = line.decode('utf-8').strip()
+                    if not line.startswith('data: '):
+                        continue
+                    try:
+                        data = json.loads(line[6:])
+                    except json.JSONDecodeError:
+                        continue
+                    for candidate in data.get("candidates", [])[:1]:
+                        for part in candidate.get("content", {}).get("parts", []):
+                            if "text" in part:
+                                yield part["text"]
+    except Exception as e:
+        yield f"⚠️ Error: {str(e)}"
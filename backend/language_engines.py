@@ -0,0 +1,195 @@
+"""
+Language Engines - Per-language NLP engines loaded on first use
+Keeps an LRU registry of spaCy-backed analyzers and a fast script-based language ID
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import spacy
+from presidio_analyzer import AnalyzerEngine, RecognizerRegistry
+from presidio_analyzer.nlp_engine import NlpEngineProvider
+from presidio_analyzer.predefined_recognizers import SpacyRecognizer
+
+DEFAULT_LANGUAGE = "en"
+
+
+def _parse_models(value: str) -> Dict[str, str]:
+    """Parse "en:en_core_web_lg,hi:xx_ent_wiki_sm" into a dict"""
+    models = {}
+    for item in value.split(","):
+        if ":" in item:
+            lang, model = item.split(":", 1)
+            models[lang.strip()] = model.strip()
+    return models
+
+
+# spaCy model per language; English is always served by the default engine.
+# Add e.g. "hi:xx_ent_wiki_sm" once that model is installed (see requirements.txt)
+NLP_MODELS = _parse_models(os.getenv("NLP_MODELS", "en:en_core_web_lg"))
+# Maximum number of extra (non-default) language engines kept in memory
+NLP_MAX_ENGINES = int(os.getenv("NLP_MAX_ENGINES", "2"))
+# Evict the least recently used engine (one per load) when RSS exceeds this (0 disables)
+NLP_MEMORY_LIMIT_MB = int(os.getenv("NLP_MEMORY_LIMIT_MB", "0"))
+# Share of Devanagari letters above which a text is routed to the Hindi engine
+DEVANAGARI_THRESHOLD = float(os.getenv("DEVANAGARI_THRESHOLD", "0.3"))
+
+# Regex recognizers that work regardless of language (run once per text)
+LANGUAGE_AGNOSTIC_ENTITIES = {
+    "EMAIL_ADDRESS", "PHONE_NUMBER", "CREDIT_CARD", "IP_ADDRESS", "URL",
+    "CRYPTO", "IBAN_CODE", "US_SSN",
+    "IN_AADHAAR", "IN_PAN", "IN_PASSPORT", "IN_VOTER_ID", "IN_VEHICLE_REGISTRATION",
+}
+
+
+def detect_language(text: str) -> str:
+    """
+    Detect the language of a text from its script
+
+    Only distinguishes languages that have a configured model; anything
+    else falls back to the default language.
+
+    Args:
+        text: Input text
+
+    Returns:
+        Language code (e.g., "en", "hi")
+    """
+    if text.isascii():
+        return DEFAULT_LANGUAGE
+
+    letters = 0
+    devanagari = 0
+    for char in text:
+        if char.isalpha():
+            letters += 1
+            if "ऀ" <= char <= "ॿ":
+                devanagari += 1
+
+    if letters and devanagari / letters >= DEVANAGARI_THRESHOLD and "hi" in NLP_MODELS:
+        return "hi"
+    return DEFAULT_LANGUAGE
+
+
+def _current_rss_mb() -> Optional[float]:
+    """Resident set size of this process in MB (Linux only)"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class LanguageEngineRegistry:
+    """LRU registry of per-language analyzers, loaded on first use"""
+
+    def __init__(self, max_engines: int = NLP_MAX_ENGINES, memory_limit_mb: int = NLP_MEMORY_LIMIT_MB):
+        self.max_engines = max(1, max_engines)
+        self.memory_limit_mb = memory_limit_mb
+        self._engines: "OrderedDict[str, AnalyzerEngine]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per language so a slow model load doesn't block cached lookups
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # Languages whose model failed to load, with the reason (not retried)
+        self._unavailable: Dict[str, str] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def _build(self, language: str) -> Optional[AnalyzerEngine]:
+        """Load the analyzer for a language, or None (logged once) if it can't be loaded"""
+        model_name = NLP_MODELS[language]
+        try:
+            # Presidio would otherwise try to download a missing model mid-request
+            if not spacy.util.is_package(model_name):
+                raise RuntimeError(f"spaCy model '{model_name}' is not installed")
+            nlp_engine = NlpEngineProvider(nlp_configuration={
+                "nlp_engine_name": "spacy",
+                "models": [{"lang_code": language, "model_name": model_name}],
+            }).create_engine()
+            registry = RecognizerRegistry(recognizers=[
+                SpacyRecognizer(
+                    supported_language=language,
+                    supported_entities=nlp_engine.get_supported_entities(),
+                )
+            ])
+            engine = AnalyzerEngine(registry=registry, nlp_engine=nlp_engine, supported_languages=[language])
+        except Exception as e:
+            self._unavailable[language] = str(e)
+            print(f"NLP engine for '{language}' unavailable, using '{DEFAULT_LANGUAGE}': {str(e)}")
+            return None
+        print(f"Loaded NLP engine for '{language}' ({model_name})")
+        return engine
+
+    def _evict_if_needed(self):
+        while self._engines and len(self._engines) >= self.max_engines:
+            self._evict_oldest()
+        if self.memory_limit_mb and self._engines:
+            # At most one eviction per load: the allocator rarely returns freed
+            # memory right away, so RSS can't confirm that an eviction helped
+            rss = _current_rss_mb()
+            if rss is not None and rss > self.memory_limit_mb:
+                self._evict_oldest()
+
+    def _evict_oldest(self):
+        language, _ = self._engines.popitem(last=False)
+        self.evictions += 1
+        print(f"Evicted NLP engine for '{language}'")
+
+    def get(self, language: str) -> Optional[AnalyzerEngine]:
+        """
+        Get the analyzer for a language, loading its model if needed
+
+        Args:
+            language: Language code
+
+        Returns:
+            AnalyzerEngine for the language, or None if no model is configured
+            or it failed to load (callers fall back to DEFAULT_LANGUAGE)
+        """
+        if language not in NLP_MODELS:
+            return None
+
+        with self._lock:
+            engine = self._lookup(language)
+            if engine is not None or language in self._unavailable:
+                return engine
+            load_lock = self._load_locks.setdefault(language, threading.Lock())
+
+        # The per-language lock avoids loading the same model twice
+        with load_lock:
+            with self._lock:
+                engine = self._lookup(language)
+                if engine is not None or language in self._unavailable:
+                    return engine
+            engine = self._build(language)
+            if engine is None:
+                return None
+            with self._lock:
+                self._evict_if_needed()
+                self._engines[language] = engine
+                self.loads += 1
+            return engine
+
+    def _lookup(self, language: str) -> Optional[AnalyzerEngine]:
+        engine = self._engines.get(language)
+        if engine is not None:
+            self._engines.move_to_end(language)
+        return engine
+
+    def stats(self) -> Dict:
+        with self._lock:
+            loaded = list(self._engines.keys())
+            unavailable = dict(self._unavailable)
+        return {
+            "configured": sorted(NLP_MODELS.keys()),
+            "loaded": [DEFAULT_LANGUAGE] + loaded,
+            "unavailable": unavailable,
+            "max_engines": self.max_engines,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+
+language_engines = LanguageEngineRegistry()
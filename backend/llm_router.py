@@ -0,0 +1,309 @@
+"""
+LLM Router - Send one redacted prompt to several providers/models at once
+first_wins returns the first good answer and cancels the other calls, so a
+request no longer inherits one provider's tail latency; compare returns every
+answer side by side. Per-target latency, token and error stats drive the
+optional adaptive selection, which only fans out to the targets with the
+lowest recent p95 latency
+IMPORTANT: Only ever receives REDACTED text (same contract as the clients)
+"""
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from conversation_store import estimate_tokens
+from gemini_client import query_gemini
+from openai_client import query_openai
+from profiling import percentile
+
+# Targets are "provider" or "provider:model", e.g. "gemini,openai:gpt-4o-mini"
+LLM_FANOUT_TARGETS = os.getenv("LLM_FANOUT_TARGETS", "gemini,openai")
+LLM_FANOUT_TIMEOUT = float(os.getenv("LLM_FANOUT_TIMEOUT", "30"))
+# Recent calls per target used for p50/p95 and error rate
+LLM_STATS_WINDOW = int(os.getenv("LLM_STATS_WINDOW", "200"))
+# Adaptive selection: fan out to the K targets with the lowest recent p95
+LLM_ADAPTIVE_TOP_K = int(os.getenv("LLM_ADAPTIVE_TOP_K", "2"))
+# Targets with fewer recent calls than this are always included
+LLM_ADAPTIVE_MIN_SAMPLES = int(os.getenv("LLM_ADAPTIVE_MIN_SAMPLES", "20"))
+# Chance of adding one extra, slower target to keep its stats fresh
+LLM_ADAPTIVE_EXPLORE = float(os.getenv("LLM_ADAPTIVE_EXPLORE", "0.05"))
+# Targets failing more often than this recently are ranked last
+LLM_ADAPTIVE_MAX_ERROR_RATE = float(os.getenv("LLM_ADAPTIVE_MAX_ERROR_RATE", "0.5"))
+
+PROVIDERS = ("gemini", "openai")
+MODE_FIRST_WINS = "first_wins"
+MODE_COMPARE = "compare"
+
+
+def parse_targets(value) -> List[str]:
+    """
+    Normalize a target list
+
+    Args:
+        value: Comma-separated string or list of "provider[:model]"
+
+    Returns:
+        Target names, duplicates removed
+
+    Raises:
+        ValueError: Unknown provider
+    """
+    items = value.split(",") if isinstance(value, str) else value
+    targets = []
+    for item in items:
+        target = item.strip()
+        if not target:
+            continue
+        provider = target.split(":", 1)[0]
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown LLM provider '{provider}' in target '{target}'")
+        if target not in targets:
+            targets.append(target)
+    return targets
+
+
+class TargetStats:
+    """Counters and a sliding window of recent calls for one target"""
+
+    def __init__(self, window: int = LLM_STATS_WINDOW):
+        self.recent = deque(maxlen=window)  # (latency_ms, status)
+        self.calls = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.wins = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, latency_ms: float, status: str):
+        """Add a finished call with status ok, error or timeout"""
+        self.recent.append((latency_ms, status))
+
+    def latencies(self) -> List[float]:
+        """Recent successful latencies, with each timeout counted as the full timeout"""
+        return [latency for latency, status in self.recent if status != "error"]
+
+    def error_rate(self) -> float:
+        return sum(1 for _, status in self.recent if status != "ok") / len(self.recent) if self.recent else 0.0
+
+    def to_dict(self) -> Dict:
+        latencies = self.latencies()
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "wins": self.wins,
+            "error_rate": round(self.error_rate(), 4),
+            "p50_ms": round(percentile(latencies, 0.50), 1),
+            "p95_ms": round(percentile(latencies, 0.95), 1),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+class LLMRouter:
+    """Concurrent fan-out over LLM targets with per-target stats"""
+
+    def __init__(self, default_targets: str = LLM_FANOUT_TARGETS):
+        self.default_targets = parse_targets(default_targets)
+        self._stats: Dict[str, TargetStats] = {}
+
+    def _target_stats(self, target: str) -> TargetStats:
+        stats = self._stats.get(target)
+        if stats is None:
+            stats = self._stats[target] = TargetStats()
+        return stats
+
+    def select(self, targets: Optional[List[str]] = None, adaptive: bool = False,
+               top_k: int = LLM_ADAPTIVE_TOP_K) -> List[str]:
+        """
+        Choose the targets to call
+
+        Args:
+            targets: Candidate targets (default: LLM_FANOUT_TARGETS)
+            adaptive: Keep only the top_k targets by recent p95 latency
+            top_k: Number of targets to keep in adaptive mode
+
+        Returns:
+            Targets in call order (fastest first in adaptive mode)
+        """
+        candidates = parse_targets(targets) if targets else list(self.default_targets)
+        if not adaptive or len(candidates) <= top_k:
+            return candidates
+
+        def rank(target: str):
+            stats = self._target_stats(target)
+            # Every attempt counts as a sample, so a target that keeps failing
+            # leaves the "always try" group and gets demoted
+            if len(stats.recent) < LLM_ADAPTIVE_MIN_SAMPLES:
+                return (0, 0.0)  # Not enough data yet: always try it
+            if stats.error_rate() > LLM_ADAPTIVE_MAX_ERROR_RATE:
+                return (2, 0.0)
+            return (1, percentile(stats.latencies(), 0.95))
+
+        ranked = sorted(candidates, key=rank)
+        chosen = ranked[:max(1, top_k)]
+        rest = ranked[len(chosen):]
+        if rest and random.random() < LLM_ADAPTIVE_EXPLORE:
+            chosen.append(random.choice(rest))
+        return chosen
+
+    async def _call(self, target: str, prompt: str, history: Optional[List[Dict[str, str]]]) -> Dict:
+        provider, _, model = target.partition(":")
+        stats = self._target_stats(target)
+        stats.calls += 1
+        started = time.perf_counter()
+        try:
+            if provider == "openai":
+                response = await query_openai(prompt, model=model or None, conversation_history=history)
+            else:
+                response = await query_gemini(prompt, conversation_history=history, model=model or None)
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        # The clients report failures as "⚠️ ..." strings
+        ok = not response.startswith("⚠️")
+        prompt_tokens = estimate_tokens(prompt) + sum(estimate_tokens(message["content"]) for message in history or [])
+        completion_tokens = estimate_tokens(response) if ok else 0
+        stats.record(latency_ms, "ok" if ok else "error")
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        if not ok:
+            stats.errors += 1
+        return {
+            "target": target,
+            "provider": provider,
+            "model": model or None,
+            "response": response,
+            "ok": ok,
+            "error": None if ok else response,
+            "latency_ms": round(latency_ms, 1),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        }
+
+    def _unfinished(self, target: str, reason: str, latency_ms: Optional[float] = None) -> Dict:
+        """Result entry for a call that was cancelled or timed out"""
+        if reason == "timeout":
+            stats = self._target_stats(target)
+            stats.errors += 1
+            stats.record(latency_ms, "timeout")
+        provider, _, model = target.partition(":")
+        return {
+            "target": target,
+            "provider": provider,
+            "model": model or None,
+            "response": None,
+            "ok": False,
+            "error": reason,
+            "latency_ms": round(latency_ms, 1) if latency_ms is not None else None,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+        }
+
+    async def first_wins(self, prompt: str, targets: List[str],
+                         history: Optional[List[Dict[str, str]]] = None,
+                         timeout: float = LLM_FANOUT_TIMEOUT) -> Dict:
+        """
+        Call all targets concurrently and return the first good answer
+
+        The remaining calls are cancelled as soon as one succeeds. Failed
+        answers that arrived first are reported in "results".
+
+        Returns:
+            Dict with "winner" (result dict, or None if every target failed
+            or timed out) and "results" (every finished or cancelled call)
+        """
+        tasks = {asyncio.create_task(self._call(target, prompt, history)): target for target in targets}
+        pending = set(tasks)
+        results = []
+        winner = None
+        deadline = time.perf_counter() + timeout
+        try:
+            while pending and winner is None:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    results.append(result)
+                    if result["ok"] and winner is None:
+                        winner = result
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        for task in pending:
+            if winner is not None:
+                results.append(self._unfinished(tasks[task], "cancelled"))
+            else:
+                results.append(self._unfinished(tasks[task], "timeout", timeout * 1000))
+        if winner is not None:
+            self._target_stats(winner["target"]).wins += 1
+        return {"winner": winner, "results": results}
+
+    async def compare(self, prompt: str, targets: List[str],
+                      history: Optional[List[Dict[str, str]]] = None,
+                      timeout: float = LLM_FANOUT_TIMEOUT) -> Dict:
+        """
+        Call all targets concurrently and return every answer
+
+        Returns:
+            Dict with "winner" (fastest good answer, or None) and "results"
+            in target order
+        """
+        async def bounded(target: str) -> Dict:
+            try:
+                return await asyncio.wait_for(self._call(target, prompt, history), timeout)
+            except asyncio.TimeoutError:
+                return self._unfinished(target, "timeout", timeout * 1000)
+
+        results = await asyncio.gather(*(bounded(target) for target in targets))
+        good = [result for result in results if result["ok"]]
+        winner = min(good, key=lambda result: result["latency_ms"]) if good else None
+        if winner is not None:
+            self._target_stats(winner["target"]).wins += 1
+        return {"winner": winner, "results": list(results)}
+
+    async def fanout(self, prompt: str, mode: str = MODE_FIRST_WINS, targets: Optional[List[str]] = None,
+                     adaptive: bool = False, history: Optional[List[Dict[str, str]]] = None) -> Dict:
+        """
+        Send a redacted prompt to several LLM targets
+
+        Args:
+            prompt: REDACTED user message
+            mode: "first_wins" or "compare"
+            targets: "provider[:model]" names (default: LLM_FANOUT_TARGETS)
+            adaptive: Only call the targets with the lowest recent p95
+            history: Optional previous (redacted) messages
+
+        Returns:
+            Dict with "winner", "results" and the "targets" called
+        """
+        chosen = self.select(targets, adaptive)
+        if not chosen:
+            raise ValueError("No LLM targets to call")
+        if mode == MODE_COMPARE:
+            outcome = await self.compare(prompt, chosen, history)
+        elif mode == MODE_FIRST_WINS:
+            outcome = await self.first_wins(prompt, chosen, history)
+        else:
+            raise ValueError(f"Unknown fan-out mode '{mode}'")
+        outcome["targets"] = chosen
+        return outcome
+
+    def stats(self) -> Dict:
+        return {
+            "default_targets": self.default_targets,
+            "targets": {target: stats.to_dict() for target, stats in self._stats.items()},
+        }
+
+
+llm_router = LLMRouter()
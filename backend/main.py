@@ -2,26 +2,73 @@
 PrivacyShield.AI Backend - Main API Entry Point
 Team: CodeRed
 """
+import asyncio
+import json
+import math
 import os
-from fastapi import FastAPI, HTTPException
+import time
+import uuid
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Header, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import uvicorn
 
-from privacy_engine import analyze_text, calculate_privacy_score
-# from gemini_client import query_gemini  # LLM integration now done on frontend
-# from db import save_audit_log  # OPTIONAL - Disabled for Vercel deployment (uses localStorage)
-from models import AnalyzeRequest, AnalyzeResponse, HealthResponse
-
+# Load .env before importing modules that read their configuration at import time
 load_dotenv()
 
+from privacy_engine import analyze_text, get_engine_state, get_engine_stats, reload_engine
+from prefilter import get_prefilter_stats
+from recognizer_profiles import get_recognizer_report
+from language_engines import language_engines
+from conversation_store import create_conversation_store, build_history, estimate_tokens
+from gemini_client import query_gemini, query_gemini_streaming
+from openai_client import query_openai, query_openai_streaming
+from pseudonymizer import vaults, StreamingDetokenizer
+from structured import analyze_structured
+from dedup import analyze_batch, deduplicator
+from audit_log import audit_log, build_audit_record
+from admission import admission, AdmissionRejected
+from parallel_analysis import shutdown_pool
+from static_cache import static_cache, SAMPLE_CACHE_CONTROL
+from profiling import profiler
+from llm_router import llm_router
+from wire_formats import CompressionMiddleware, NegotiatedResponse, WireRoute, wants_ndjson
+from models import (
+    AnalyzeRequest,
+    AnalyzeResponse,
+    BatchAnalyzeRequest,
+    BatchAnalyzeResponse,
+    BatchItemResult,
+    ChatRequest,
+    ChatResponse,
+    HealthResponse,
+    LLMFanoutRequest,
+    LLMFanoutResponse,
+    LLMProvider,
+    MAX_TEXT_CHARS,
+    ProfileStartRequest,
+    StructuredAnalyzeRequest,
+    StructuredAnalyzeResponse,
+)
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Reverse proxies whose X-Client-Id / X-Forwarded-For headers are trusted for quota keys
+TRUSTED_PROXIES = {ip.strip() for ip in os.getenv("TRUSTED_PROXIES", "").split(",") if ip.strip()}
+
+# Server-side history of redacted chat turns
+conversation_store = create_conversation_store()
+
 app = FastAPI(
     title="securAI",
     description="Privacy-first AI prompt analyzer with PII redaction",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=NegotiatedResponse
 )
+# JSON or MessagePack bodies on every route (Content-Type / Accept)
+app.router.route_class = WireRoute
 
 # CORS Configuration
 origins = os.getenv("ALLOW_ORIGINS", "http://localhost:5173,http://localhost:5174").split(",")
@@ -33,8 +80,78 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount public folder for static files
-app.mount("/public", StaticFiles(directory="public"), name="public")
+# gzip/zstd request bodies and compressed responses above WIRE_COMPRESS_MIN_BYTES
+app.add_middleware(CompressionMiddleware)
+
+# Returned by /v1/sample when public/sample.json is missing
+SAMPLE_FALLBACK = json.dumps({
+    "original_text": "Sample data not available",
+    "redacted_text": "Sample data not available",
+    "entities": [],
+    "privacy_score": 0,
+    "gemini_response": "This is sample fallback data. Backend is unavailable."
+}).encode()
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    audit_log.start()
+    # Load and pre-compress public/ before the first request
+    print(f"Static cache preloaded {static_cache.preload()} file(s)")
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    # Flush whatever is still buffered before the process exits
+    await audit_log.stop()
+    # Stop the parallel analysis worker processes
+    shutdown_pool()
+    # Write out a profiling session that is still running
+    profiler.stop()
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Reject requests without the configured admin token"""
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+
+def client_key(http_request: Request) -> str:
+    """
+    Quota key: the client IP
+
+    X-Client-Id and X-Forwarded-For are caller-controlled, so they are only
+    used when the request comes from one of TRUSTED_PROXIES (which is
+    expected to set them after authenticating the tenant).
+    """
+    peer = http_request.client.host if http_request.client else "unknown"
+    if peer not in TRUSTED_PROXIES:
+        return peer
+    client_id = http_request.headers.get("x-client-id")
+    if client_id:
+        return f"id:{client_id}"
+    # Nearest address in the forwarding chain that isn't one of our proxies
+    forwarded = [ip.strip() for ip in http_request.headers.get("x-forwarded-for", "").split(",") if ip.strip()]
+    for ip in reversed(forwarded):
+        if ip not in TRUSTED_PROXIES:
+            return ip
+    return peer
+
+
+async def admitted_analysis(http_request: Request, text, analyze=analyze_text,
+                            size: Optional[int] = None, **kwargs) -> dict:
+    """Run analyze_text (or another analysis function) under the client's quotas and the request deadline"""
+    size = len(text) if size is None else size
+    charged_bytes = len(text.encode("utf-8")) if isinstance(text, str) else size
+    try:
+        with admission.admit(client_key(http_request), charged_bytes) as slot:
+            return await admission.run_analysis(analyze, text, size=size, slot=slot, **kwargs)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=e.detail,
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
 
 
 @app.get("/", response_model=dict)
@@ -46,7 +163,13 @@ async def root():
         "version": "v1.0.0",
         "endpoints": {
             "analyze": "/v1/analyze",
+            "analyze_structured": "/v1/analyze/structured",
+            "analyze_batch": "/v1/analyze/batch",
+            "chat": "/v1/chat",
+            "llm_fanout": "/v1/llm/fanout",
             "sample": "/v1/sample",
+            "stats": "/v1/stats",
+            "history": "/history",
             "health": "/health"
         }
     }
@@ -62,8 +185,83 @@ async def health_check():
     )
 
 
+@app.get("/v1/stats")
+async def get_stats():
+    """Return analysis pipeline counters"""
+    return {
+        "prefilter": get_prefilter_stats(),
+        "recognizers": get_engine_stats(),
+        "languages": language_engines.stats(),
+        "conversations": conversation_store.stats(),
+        "vaults": vaults.stats(),
+        "audit_log": audit_log.stats(),
+        "admission": admission.stats(),
+        "dedup": deduplicator.stats(),
+        "static_cache": static_cache.stats(),
+        "llm": llm_router.stats()
+    }
+
+
+@app.get("/admin/recognizers/report", dependencies=[Depends(require_admin)])
+async def recognizer_report():
+    """Return per-recognizer cost/hit-rate stats and pruning recommendations"""
+    return get_recognizer_report(get_engine_state().analyzer.registry)
+
+
+@app.post("/admin/reload", dependencies=[Depends(require_admin)])
+async def reload_recognizers():
+    """
+    Rebuild the recognizers from config/recognizers.json and swap them in
+    
+    The build runs in a worker thread and reuses the loaded spaCy model;
+    requests already in flight finish on the previous version.
+    """
+    try:
+        return await asyncio.to_thread(reload_engine)
+    except (OSError, ValueError) as e:
+        print(f"Recognizer reload failed: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Reload failed: {str(e)}")
+
+
+@app.post("/admin/profile/start", dependencies=[Depends(require_admin)])
+async def start_profiling(request: ProfileStartRequest):
+    """
+    Profile analyze_text and the LLM clients for a time window
+    
+    The session stops by itself after duration_s and writes collapsed stacks
+    (sample mode) or pstats (cprofile mode), plus top allocations if
+    requested, to PROFILE_OUTPUT_DIR.
+    """
+    try:
+        return profiler.start(
+            mode=request.mode.value,
+            duration_s=request.duration_s,
+            sample_rate=request.sample_rate,
+            trace_allocations=request.trace_allocations
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.post("/admin/profile/stop", dependencies=[Depends(require_admin)])
+async def stop_profiling():
+    """Stop the running profiling session early and write its reports"""
+    report = await asyncio.to_thread(profiler.stop)
+    if report is None:
+        raise HTTPException(status_code=409, detail="No profiling session is running")
+    return report
+
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def profiling_status():
+    """Return the running session and the last written report"""
+    return profiler.status()
+
+
 @app.post("/v1/analyze", response_model=AnalyzeResponse)
-async def analyze_prompt(request: AnalyzeRequest):
+async def analyze_prompt(request: AnalyzeRequest, http_request: Request):
     """
     Analyze text for PII, redact sensitive data, and forward to Gemini
     
@@ -72,7 +270,7 @@ async def analyze_prompt(request: AnalyzeRequest):
     2. Calculate privacy score
     3. Redact PII
     4. Send ONLY redacted text to Gemini
-    5. Log to MongoDB (without raw PII)
+    5. Queue an audit record (entity types, counts, score and timing only)
     6. Return results
     """
     try:
@@ -80,10 +278,14 @@ async def analyze_prompt(request: AnalyzeRequest):
             raise HTTPException(status_code=400, detail="Text cannot be empty")
         
         # Step 1 & 2: Analyze and detect entities
-        analysis_result = analyze_text(request.text)
+        started = time.perf_counter()
+        analysis_result = await admitted_analysis(
+            http_request, request.text, language=request.language or "en"
+        )
+        processing_ms = (time.perf_counter() - started) * 1000
         
-        # Step 3: Calculate privacy score
-        privacy_score = calculate_privacy_score(analysis_result["entities"])
+        # Step 3: Privacy score (computed from the compact spans by the engine)
+        privacy_score = analysis_result["privacy_score"]
         
         # Step 4: Get redacted text
         redacted_text = analysis_result["redacted_text"]
@@ -96,55 +298,362 @@ async def analyze_prompt(request: AnalyzeRequest):
             privacy_score=privacy_score,
             llm_response=None,
             llm_provider=None,
-            gemini_response=None
+            gemini_response=None,
+            degraded=analysis_result["degraded"],
+            degraded_reason=analysis_result["degraded_reason"]
         )
         
-        # Step 7: Save audit log (DISABLED for Vercel - using localStorage)
-        # await save_audit_log({
-        #     "original_text": request.text,
-        #     "redacted_text": redacted_text,
-        #     "entities": analysis_result["entities"],
-        #     "privacy_score": privacy_score,
-        #     "entity_types": [e["entity_type"] for e in analysis_result["entities"]],
-        #     "entity_count": len(analysis_result["entities"]),
-        #     "gemini_response": gemini_response
-        # })
+        # Step 6: Queue the audit record; the background task persists it
+        audit_log.record(build_audit_record(
+            "/v1/analyze",
+            analysis_result["entities"],
+            privacy_score,
+            processing_ms,
+            route=analysis_result["route"],
+            language=analysis_result["language"]
+        ))
         
         return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in analyze_prompt: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 
-# DISABLED: MongoDB history endpoint (using localStorage)
-# @app.get("/history")
-# async def get_history():
-#     """Return recent analysis history"""
-#     from db import get_recent_logs
-#     try:
-#         logs = await get_recent_logs(limit=50)
-#         return {"history": logs, "count": len(logs)}
-#     except Exception as e:
-#         print(f"Error fetching history: {str(e)}")
-#         raise HTTPException(status_code=500, detail="Failed to fetch history")
+def batch_ndjson_lines(result: dict):
+    """One JSON line per text (with its index), then a summary line with the dedup stats"""
+    for index, item in enumerate(result["results"]):
+        yield json.dumps({"index": index, **BatchItemResult(**item).model_dump()}) + "\n"
+    yield json.dumps({"dedup": result["dedup"], "degraded": result["degraded"]}) + "\n"
+
+
+@app.post("/v1/analyze/batch", response_model=BatchAnalyzeResponse)
+async def analyze_batch_prompts(request: BatchAnalyzeRequest, http_request: Request):
+    """
+    Analyze many texts at once, analyzing each repeated line only once
+    
+    Signatures, headers and disclaimers that recur across the batch (or
+    across recent batches) are analyzed once and their entities are mapped
+    back to every occurrence. With Accept: application/x-ndjson the results
+    are streamed one JSON line per text, followed by a dedup summary line.
+    """
+    size = sum(len(text) for text in request.texts)
+    if size > MAX_TEXT_CHARS * 10:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_TEXT_CHARS * 10} characters")
+    
+    try:
+        started = time.perf_counter()
+        result = await admitted_analysis(
+            http_request,
+            request.texts,
+            analyze=analyze_batch,
+            size=size,
+            language=request.language or "en"
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for item in result["results"]:
+            audit_log.record(build_audit_record(
+                "/v1/analyze/batch",
+                item["entities"],
+                item["privacy_score"],
+                elapsed_ms / len(result["results"]),
+                route=item["route"],
+                language=item["language"]
+            ))
+        if wants_ndjson(http_request):
+            return StreamingResponse(batch_ndjson_lines(result), media_type="application/x-ndjson")
+        return BatchAnalyzeResponse(
+            results=result["results"],
+            dedup=result["dedup"],
+            degraded=result["degraded"]
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in analyze_batch_prompts: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+
+@app.post("/v1/analyze/structured", response_model=StructuredAnalyzeResponse)
+async def analyze_structured_prompt(request: StructuredAnalyzeRequest, http_request: Request):
+    """
+    Redact JSON payloads or CSV rows field by field, preserving the structure
+    
+    Keys are never analyzed, numeric fields are skipped by policy, and field
+    names (email, phone, pan, ...) select only the relevant recognizers.
+    """
+    content = request.content
+    size = len(content) if isinstance(content, str) else len(json.dumps(content))
+    if size > MAX_TEXT_CHARS:
+        raise HTTPException(status_code=413, detail=f"Content exceeds {MAX_TEXT_CHARS} characters")
+    
+    try:
+        started = time.perf_counter()
+        result = await admitted_analysis(
+            http_request,
+            content,
+            analyze=analyze_structured,
+            size=size,
+            format=request.format.value,
+            numeric_policy=request.numeric_policy,
+            use_field_hints=request.use_field_hints,
+            skip_fields=request.skip_fields,
+            has_header=request.has_header,
+            language=request.language or "en"
+        )
+        audit_log.record(build_audit_record(
+            "/v1/analyze/structured",
+            result["entities"],
+            result["privacy_score"],
+            (time.perf_counter() - started) * 1000,
+            route=result["route"],
+            language=request.language
+        ))
+        return StructuredAnalyzeResponse(**result)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error in analyze_structured_prompt: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+
+@app.post("/v1/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, http_request: Request):
+    """
+    Multi-turn chat with server-side redacted history
+    
+    Process:
+    1. Analyze and redact ONLY the new message
+    2. Load the stored (already redacted) history within the token budget
+    3. Send redacted history + message to the selected LLM
+    4. Append the redacted message and the reply to the conversation
+    """
+    try:
+        conversation_id = request.conversation_id or uuid.uuid4().hex
+        vault = vaults.get(conversation_id).turn() if request.pseudonymize else None
+        
+        started = time.perf_counter()
+        analysis_result = await admitted_analysis(
+            http_request, request.text, language=request.language or "en", vault=vault
+        )
+        audit_log.record(build_audit_record(
+            "/v1/chat",
+            analysis_result["entities"],
+            analysis_result["privacy_score"],
+            (time.perf_counter() - started) * 1000,
+            route=analysis_result["route"],
+            language=analysis_result["language"]
+        ))
+        redacted_text = analysis_result["redacted_text"]
+        
+        history = build_history(conversation_store.get_turns(conversation_id))
+        
+        if request.llm_provider == LLMProvider.OPENAI:
+            llm_response = await query_openai(
+                redacted_text,
+                model=request.model,
+                conversation_history=history
+            )
+        else:
+            llm_response = await query_gemini(redacted_text, conversation_history=history)
+        
+        # The LLM clients report failures as "⚠️ ..." strings; don't keep those turns
+        if not llm_response.startswith("⚠️"):
+            conversation_store.append(conversation_id, "user", redacted_text)
+            conversation_store.append(conversation_id, "assistant", llm_response)
+        
+        # Map this turn's pseudonym tokens in the reply back to the original values
+        if vault is not None:
+            llm_response = vault.detokenize(llm_response)
+        
+        return ChatResponse(
+            conversation_id=conversation_id,
+            redacted_text=redacted_text,
+            entities=analysis_result["entities"],
+            privacy_score=analysis_result["privacy_score"],
+            llm_response=llm_response,
+            llm_provider=request.llm_provider.value if request.llm_provider else None,
+            history_messages=len(history),
+            history_tokens=sum(estimate_tokens(message["content"]) for message in history),
+            pseudonymized=vault is not None,
+            degraded=analysis_result["degraded"]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in chat: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
+
+
+@app.post("/v1/llm/fanout", response_model=LLMFanoutResponse)
+async def llm_fanout(request: LLMFanoutRequest, http_request: Request):
+    """
+    Send one redacted prompt to several LLM providers/models concurrently
+    
+    first_wins returns the first good answer and cancels the other calls;
+    compare waits for every answer and returns them with per-provider
+    latency, estimated tokens and errors. With adaptive, only the targets
+    with the lowest recent p95 latency are called.
+    """
+    try:
+        started = time.perf_counter()
+        analysis_result = await admitted_analysis(http_request, request.text, language=request.language or "en")
+        audit_log.record(build_audit_record(
+            "/v1/llm/fanout",
+            analysis_result["entities"],
+            analysis_result["privacy_score"],
+            (time.perf_counter() - started) * 1000,
+            route=analysis_result["route"],
+            language=analysis_result["language"]
+        ))
+        
+        outcome = await llm_router.fanout(
+            analysis_result["redacted_text"],
+            mode=request.mode.value,
+            targets=request.targets,
+            adaptive=request.adaptive
+        )
+        winner = outcome["winner"]
+        if winner is None and outcome["results"]:
+            # Every target failed: surface the first error like /v1/chat does
+            llm_response = outcome["results"][0]["error"]
+        else:
+            llm_response = winner["response"] if winner else None
+        
+        return LLMFanoutResponse(
+            redacted_text=analysis_result["redacted_text"],
+            entities=analysis_result["entities"],
+            privacy_score=analysis_result["privacy_score"],
+            mode=request.mode.value,
+            llm_response=llm_response,
+            llm_provider=winner["target"] if winner else None,
+            results=outcome["results"],
+            degraded=analysis_result["degraded"]
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error in llm_fanout: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Fan-out failed: {str(e)}")
+
+
+@app.post("/v1/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Streaming variant of /v1/chat
+    
+    Returns the LLM reply as a plain-text stream. With pseudonymize enabled,
+    tokens such as [PERSON_1] are mapped back to the original values chunk by
+    chunk without buffering the whole response. The conversation ID is sent
+    in the X-Conversation-Id header, and X-Analysis-Degraded tells whether
+    only the patterns-only path ran.
+    """
+    conversation_id = request.conversation_id or uuid.uuid4().hex
+    vault = vaults.get(conversation_id).turn() if request.pseudonymize else None
+    
+    try:
+        started = time.perf_counter()
+        analysis_result = await admitted_analysis(
+            http_request, request.text, language=request.language or "en", vault=vault
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in chat_stream: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
+    audit_log.record(build_audit_record(
+        "/v1/chat/stream",
+        analysis_result["entities"],
+        analysis_result["privacy_score"],
+        (time.perf_counter() - started) * 1000,
+        route=analysis_result["route"],
+        language=analysis_result["language"]
+    ))
+    redacted_text = analysis_result["redacted_text"]
+    history = build_history(conversation_store.get_turns(conversation_id))
+    
+    if request.llm_provider == LLMProvider.OPENAI:
+        chunks = query_openai_streaming(redacted_text, model=request.model, conversation_history=history)
+    else:
+        chunks = query_gemini_streaming(redacted_text, conversation_history=history)
+    
+    async def generate():
+        detokenizer = StreamingDetokenizer(vault) if vault is not None else None
+        received = []
+        async for chunk in chunks:
+            received.append(chunk)
+            yield detokenizer.feed(chunk) if detokenizer else chunk
+        if detokenizer:
+            yield detokenizer.flush()
+        
+        reply = "".join(received)
+        if reply and not reply.startswith("⚠️"):
+            conversation_store.append(conversation_id, "user", redacted_text)
+            conversation_store.append(conversation_id, "assistant", reply)
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/plain; charset=utf-8",
+        headers={
+            "X-Conversation-Id": conversation_id,
+            "X-Analysis-Degraded": "true" if analysis_result["degraded"] else "false"
+        }
+    )
+
+
+@app.delete("/v1/chat/{conversation_id}")
+async def delete_conversation(conversation_id: str):
+    """Forget a conversation's stored history"""
+    vaults.delete(conversation_id)
+    if not conversation_store.delete(conversation_id):
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return {"deleted": conversation_id}
 
 
-@app.get("/v1/sample")
-async def get_sample():
-    """Return sample data for frontend fallback"""
-    import json
+@app.get("/history")
+async def get_history(
+    limit: int = Query(50, ge=1, le=200),
+    before_id: Optional[int] = Query(None, description="Return records older than this id"),
+    entity_type: Optional[str] = Query(None, description="Only records containing this entity type")
+):
+    """Return recent analysis history (no text, only entity types, counts, score and timing)"""
+    if audit_log.queryable is None:
+        raise HTTPException(status_code=503, detail="History requires the sqlite audit sink")
     try:
-        with open("public/sample.json", "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
+        logs = await asyncio.to_thread(audit_log.queryable.query, limit, before_id, entity_type)
         return {
-            "original_text": "Sample data not available",
-            "redacted_text": "Sample data not available",
-            "entities": [],
-            "privacy_score": 0,
-            "gemini_response": "This is sample fallback data. Backend is unavailable."
+            "history": logs,
+            "count": len(logs),
+            "next_before_id": logs[-1]["id"] if len(logs) == limit else None
         }
+    except Exception as e:
+        print(f"Error fetching history: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch history")
+
+
+@app.api_route("/v1/sample", methods=["GET", "HEAD"])
+async def get_sample(request: Request):
+    """Return sample data for frontend fallback (cached, supports ETag revalidation)"""
+    asset = static_cache.get("sample.json")
+    if asset is None:
+        return Response(content=SAMPLE_FALLBACK, media_type="application/json")
+    return static_cache.respond(request, asset, SAMPLE_CACHE_CONTROL)
+
+
+@app.api_route("/public/{path:path}", methods=["GET", "HEAD"])
+async def get_static(path: str, request: Request):
+    """Serve files from public/ out of the in-memory static cache"""
+    asset = static_cache.get(path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return static_cache.respond(request, asset)
 
 
 if __name__ == "__main__":
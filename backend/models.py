@@ -1,10 +1,15 @@
 """
 Pydantic Models for Request/Response Validation
 """
+import os
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, List, Optional, Union
 from enum import Enum
 
+# Hard cap on submitted text; larger payloads are rejected with 422
+MAX_TEXT_CHARS = int(os.getenv("MAX_TEXT_CHARS", "100000"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
 
 class LLMProvider(str, Enum):
     """Supported LLM providers"""
@@ -14,7 +19,7 @@ class LLMProvider(str, Enum):
 
 class AnalyzeRequest(BaseModel):
     """Request model for /v1/analyze endpoint"""
-    text: str = Field(..., description="Text to analyze for PII", min_length=1)
+    text: str = Field(..., description="Text to analyze for PII", min_length=1, max_length=MAX_TEXT_CHARS)
     llm_provider: Optional[LLMProvider] = Field(
         default=LLMProvider.GEMINI,
         description="LLM provider to use (gemini or openai)"
@@ -23,6 +28,10 @@ class AnalyzeRequest(BaseModel):
         default=None,
         description="Specific model to use (e.g., gpt-4, gpt-3.5-turbo, gemini-1.5-flash)"
     )
+    language: Optional[str] = Field(
+        default="en",
+        description="Language code of the text (e.g., en, hi), or auto to detect it"
+    )
     
     class Config:
         json_schema_extra = {
@@ -64,6 +73,11 @@ class AnalyzeResponse(BaseModel):
     llm_provider: Optional[str] = Field(None, description="LLM provider used")
     # Keep gemini_response for backward compatibility
     gemini_response: Optional[str] = Field(None, description="Deprecated: use llm_response")
+    degraded: bool = Field(False, description="True if only the patterns-only path ran (NLP skipped)")
+    degraded_reason: Optional[str] = Field(
+        None,
+        description="Why the analysis was degraded (estimated_cost or deadline)"
+    )
     
     class Config:
         json_schema_extra = {
@@ -92,6 +106,225 @@ class AnalyzeResponse(BaseModel):
         }
 
 
+class ChatRequest(BaseModel):
+    """Request model for /v1/chat endpoint"""
+    text: str = Field(
+        ...,
+        description="New user message (analyzed and redacted on its own)",
+        min_length=1,
+        max_length=MAX_TEXT_CHARS
+    )
+    conversation_id: Optional[str] = Field(
+        default=None,
+        description="Conversation to continue; a new one is started if omitted"
+    )
+    llm_provider: Optional[LLMProvider] = Field(
+        default=LLMProvider.GEMINI,
+        description="LLM provider to use (gemini or openai)"
+    )
+    model: Optional[str] = Field(default=None, description="Specific model to use")
+    language: Optional[str] = Field(default="en", description="Language code of the text, or auto to detect it")
+    pseudonymize: bool = Field(
+        default=False,
+        description="Use reversible per-conversation tokens (e.g., [PERSON_1]) instead of placeholders"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "text": "My name is John Doe, can you draft an email to my landlord?",
+                "conversation_id": None,
+                "llm_provider": "openai",
+                "model": "gpt-3.5-turbo"
+            }
+        }
+
+
+class ChatResponse(BaseModel):
+    """Response model for /v1/chat endpoint"""
+    conversation_id: str = Field(..., description="Conversation ID to send with the next turn")
+    redacted_text: str = Field(..., description="Redacted version of the new message")
+    entities: List[EntityDetection] = Field(..., description="Entities detected in the new message")
+    privacy_score: int = Field(..., description="Privacy risk score of the new message (0-100)", ge=0, le=100)
+    llm_response: Optional[str] = Field(None, description="Response from the LLM")
+    llm_provider: Optional[str] = Field(None, description="LLM provider used")
+    history_messages: int = Field(0, description="Number of history messages sent upstream")
+    history_tokens: int = Field(0, description="Estimated tokens of history sent upstream")
+    pseudonymized: bool = Field(False, description="Whether reversible tokens were used")
+    degraded: bool = Field(False, description="True if only the patterns-only path ran (NLP skipped)")
+
+
+class BatchAnalyzeRequest(BaseModel):
+    """Request model for /v1/analyze/batch endpoint"""
+    texts: List[str] = Field(..., description="Texts to analyze", min_length=1, max_length=BATCH_MAX_ITEMS)
+    language: Optional[str] = Field(default="en", description="Language code of the texts or auto")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "texts": [
+                    "Order shipped to John Doe\n--\nThis email is confidential.",
+                    "Refund issued to jane@example.com\n--\nThis email is confidential."
+                ]
+            }
+        }
+
+
+class BatchItemResult(BaseModel):
+    """Analysis result for one text of a batch"""
+    redacted_text: str = Field(..., description="Text with PII redacted")
+    entities: List[EntityDetection] = Field(..., description="List of detected entities")
+    privacy_score: int = Field(..., description="Privacy risk score (0-100)", ge=0, le=100)
+
+
+class DedupStats(BaseModel):
+    """Line-level dedup counters for one batch"""
+    segments: int = Field(..., description="Non-blank lines across the batch")
+    unique_segments: int = Field(..., description="Distinct lines")
+    analyzed_segments: int = Field(..., description="Lines actually analyzed (not cached)")
+    cache_hits: int = Field(..., description="Distinct lines served from the segment cache")
+    dedup_ratio: float = Field(..., description="1 - unique / total lines")
+    saved_compute: float = Field(..., description="Share of characters not analyzed thanks to dedup")
+
+
+class BatchAnalyzeResponse(BaseModel):
+    """Response model for /v1/analyze/batch endpoint"""
+    results: List[BatchItemResult] = Field(..., description="One result per input text, in order")
+    dedup: DedupStats = Field(..., description="Dedup statistics")
+    degraded: bool = Field(False, description="True if only the patterns-only path ran (NLP skipped)")
+
+
+class StructuredFormat(str, Enum):
+    """Supported structured input formats"""
+    JSON = "json"
+    CSV = "csv"
+
+
+class StructuredAnalyzeRequest(BaseModel):
+    """Request model for /v1/analyze/structured endpoint"""
+    content: Union[dict, list, str] = Field(
+        ...,
+        description="JSON object/array, JSON text, or CSV text"
+    )
+    format: StructuredFormat = Field(default=StructuredFormat.JSON, description="json or csv")
+    numeric_policy: str = Field(
+        default="hinted",
+        description="skip, hinted (analyze numbers only in fields like phone/aadhaar) or analyze"
+    )
+    use_field_hints: bool = Field(
+        default=True,
+        description="Narrow detection by field name (email, phone, pan, ...)"
+    )
+    skip_fields: Optional[List[str]] = Field(
+        default=None,
+        description="Field names never analyzed (default: id, _id, uuid, guid)"
+    )
+    has_header: bool = Field(default=True, description="CSV only: first row holds the column names")
+    language: Optional[str] = Field(default="en", description="Language code of the values")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "content": {"id": 17, "name": "John Doe", "email": "john@example.com", "phone": 5551234567},
+                "format": "json"
+            }
+        }
+
+
+class StructuredEntityDetection(EntityDetection):
+    """Detected entity inside a structured field (offsets are within the field value)"""
+    path: str = Field(..., description="Field path, e.g. users[0].email or [3].email for CSV row 3")
+
+
+class StructuredAnalyzeResponse(BaseModel):
+    """Response model for /v1/analyze/structured endpoint"""
+    format: str = Field(..., description="json or csv")
+    redacted: Any = Field(..., description="Content with PII redacted in place (same structure)")
+    entities: List[StructuredEntityDetection] = Field(..., description="Detected entities with field paths")
+    privacy_score: int = Field(..., description="Privacy risk score (0-100)", ge=0, le=100)
+    fields_total: int = Field(0, description="Leaf values found")
+    fields_analyzed: int = Field(0, description="Values sent to the analyzer")
+    fields_skipped: int = Field(0, description="Values skipped by policy (ids, numbers, empty)")
+    analyzer_calls: int = Field(0, description="Batched analyzer passes")
+    degraded: bool = Field(False, description="True if only the patterns-only path ran (NLP skipped)")
+
+
+class FanoutMode(str, Enum):
+    """How /v1/llm/fanout combines the provider answers"""
+    FIRST_WINS = "first_wins"
+    COMPARE = "compare"
+
+
+class LLMFanoutRequest(BaseModel):
+    """Request model for /v1/llm/fanout endpoint"""
+    text: str = Field(..., description="Text to analyze, redact and send", min_length=1, max_length=MAX_TEXT_CHARS)
+    mode: FanoutMode = Field(default=FanoutMode.FIRST_WINS, description="first_wins or compare")
+    targets: Optional[List[str]] = Field(
+        default=None,
+        description="Providers to call as provider or provider:model (default: LLM_FANOUT_TARGETS)"
+    )
+    adaptive: bool = Field(default=False, description="Only call the targets with the lowest recent p95 latency")
+    language: Optional[str] = Field(default="en", description="Language code of the text, or auto to detect it")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "text": "My name is John Doe, can you draft an email to my landlord?",
+                "mode": "first_wins",
+                "targets": ["gemini", "openai:gpt-4o-mini"]
+            }
+        }
+
+
+class LLMFanoutResult(BaseModel):
+    """One provider's answer in a fan-out"""
+    target: str = Field(..., description="provider or provider:model")
+    provider: str = Field(..., description="gemini or openai")
+    model: Optional[str] = Field(None, description="Model, if the target named one")
+    response: Optional[str] = Field(None, description="Answer (None if cancelled or timed out)")
+    ok: bool = Field(..., description="True if the provider returned a usable answer")
+    error: Optional[str] = Field(None, description="Error message, cancelled or timeout")
+    latency_ms: Optional[float] = Field(None, description="Time to the answer")
+    prompt_tokens: int = Field(0, description="Estimated prompt tokens")
+    completion_tokens: int = Field(0, description="Estimated completion tokens")
+
+
+class LLMFanoutResponse(BaseModel):
+    """Response model for /v1/llm/fanout endpoint"""
+    redacted_text: str = Field(..., description="Redacted text sent to the providers")
+    entities: List[EntityDetection] = Field(..., description="Detected entities")
+    privacy_score: int = Field(..., description="Privacy risk score (0-100)", ge=0, le=100)
+    mode: str = Field(..., description="first_wins or compare")
+    llm_response: Optional[str] = Field(None, description="Winning answer (fastest good one)")
+    llm_provider: Optional[str] = Field(None, description="Target that produced llm_response")
+    results: List[LLMFanoutResult] = Field(..., description="Every provider call, including failures")
+    degraded: bool = Field(False, description="True if only the patterns-only path ran (NLP skipped)")
+
+
+class ProfileMode(str, Enum):
+    """Profiler modes"""
+    SAMPLE = "sample"
+    CPROFILE = "cprofile"
+
+
+class ProfileStartRequest(BaseModel):
+    """Request model for /admin/profile/start endpoint"""
+    mode: ProfileMode = Field(default=ProfileMode.SAMPLE, description="sample (stack sampling) or cprofile")
+    duration_s: float = Field(default=60, description="Profiling window in seconds", gt=0)
+    sample_rate: float = Field(default=1.0, description="Fraction of calls to profile", gt=0, le=1)
+    trace_allocations: bool = Field(default=False, description="Also record tracemalloc allocations")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "mode": "sample",
+                "duration_s": 30,
+                "sample_rate": 0.1,
+                "trace_allocations": True
+            }
+        }
+
+
 class HealthResponse(BaseModel):
     """Response model for /health endpoint"""
     status: str = Field(..., description="Health status")
@@ -0,0 +1,367 @@
+"""
+ONNX NER - Quantized transformer NER on CPU with dynamic micro-batching
+An alternative to spaCy's NER for the default language (NER_BACKEND=onnx).
+Runs an int8 ONNX token-classification model (see tools/quantize_onnx_ner.py)
+with onnxruntime. Concurrent requests are gathered for up to
+ONNX_NER_MAX_WAIT_MS and run as one padded batch, which is where a transformer
+gets its CPU throughput from. spaCy still tokenizes and lemmatizes for the
+context-aware enhancer; only its NER/parser components are switched off
+Model directory layout (ONNX_NER_MODEL_DIR):
+- model.onnx: token-classification model, inputs input_ids/attention_mask
+  (and optionally token_type_ids), output logits [batch, tokens, labels]
+- tokenizer.json: Hugging Face fast tokenizer
+- config.json: model config with id2label
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from presidio_analyzer import EntityRecognizer, RecognizerResult
+
+from profiling import percentile
+
+try:
+    import numpy as np
+    import onnxruntime
+    from tokenizers import Tokenizer
+except ImportError:  # Optional dependencies, only needed for NER_BACKEND=onnx
+    np = None
+    onnxruntime = None
+    Tokenizer = None
+
+NER_BACKEND = os.getenv("NER_BACKEND", "spacy").lower()
+ONNX_NER_MODEL_DIR = os.getenv("ONNX_NER_MODEL_DIR", "models/ner-int8")
+# Largest number of token windows run in one inference call
+ONNX_NER_MAX_BATCH = int(os.getenv("ONNX_NER_MAX_BATCH", "16"))
+# How long the scheduler waits for more requests before running a batch
+ONNX_NER_MAX_WAIT_MS = float(os.getenv("ONNX_NER_MAX_WAIT_MS", "4"))
+# Tokens per window; longer texts are split into overlapping windows
+ONNX_NER_MAX_TOKENS = int(os.getenv("ONNX_NER_MAX_TOKENS", "256"))
+ONNX_NER_STRIDE = int(os.getenv("ONNX_NER_STRIDE", "32"))
+ONNX_NER_THREADS = int(os.getenv("ONNX_NER_THREADS", "0"))  # 0 lets onnxruntime decide
+ONNX_NER_MIN_SCORE = float(os.getenv("ONNX_NER_MIN_SCORE", "0.5"))
+# Seconds a caller waits for its batch before giving up
+ONNX_NER_TIMEOUT = float(os.getenv("ONNX_NER_TIMEOUT", "10"))
+
+# Model label (without the B-/I- prefix) -> Presidio entity type
+DEFAULT_LABEL_ENTITIES = {
+    "PER": "PERSON",
+    "PERSON": "PERSON",
+    "LOC": "LOCATION",
+    "GPE": "LOCATION",
+    "FAC": "LOCATION",
+    "LOCATION": "LOCATION",
+    "ORG": "ORGANIZATION",
+    "ORGANIZATION": "ORGANIZATION",
+    "NORP": "NRP",
+    "DATE": "DATE_TIME",
+    "TIME": "DATE_TIME",
+}
+
+
+def _parse_label_entities(value: str) -> Dict[str, str]:
+    """Parse "PER:PERSON,LOC:LOCATION" into a dict (empty value keeps the defaults)"""
+    mapping = dict(DEFAULT_LABEL_ENTITIES)
+    for item in value.split(","):
+        if ":" in item:
+            label, entity = item.split(":", 1)
+            mapping[label.strip()] = entity.strip()
+    return mapping
+
+
+LABEL_ENTITIES = _parse_label_entities(os.getenv("ONNX_NER_LABEL_MAP", ""))
+
+EntityTuple = Tuple[str, int, int, float]
+
+
+def onnx_available() -> bool:
+    """True if onnxruntime, tokenizers and numpy are installed"""
+    return onnxruntime is not None
+
+
+class _Request:
+    __slots__ = ("encodings", "future", "queued_at")
+
+    def __init__(self, encodings):
+        self.encodings = encodings
+        self.future: Future = Future()
+        self.queued_at = time.perf_counter()
+
+
+class OnnxNerModel:
+    """Quantized token-classification model behind a micro-batching scheduler"""
+
+    def __init__(self, model_dir: str = ONNX_NER_MODEL_DIR):
+        if not onnx_available():
+            raise RuntimeError("NER_BACKEND=onnx needs onnxruntime, tokenizers and numpy installed")
+        for filename in ("model.onnx", "tokenizer.json", "config.json"):
+            if not os.path.isfile(os.path.join(model_dir, filename)):
+                raise RuntimeError(f"ONNX NER model is missing {filename} in {model_dir} "
+                                   f"(build it with tools/quantize_onnx_ner.py)")
+
+        with open(os.path.join(model_dir, "config.json")) as f:
+            config = json.load(f)
+        self.id2label = {int(index): label for index, label in config["id2label"].items()}
+        self.entities = sorted({
+            LABEL_ENTITIES[label.split("-", 1)[-1]]
+            for label in self.id2label.values()
+            if label.split("-", 1)[-1] in LABEL_ENTITIES
+        })
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length=ONNX_NER_MAX_TOKENS, stride=ONNX_NER_STRIDE)
+        self.pad_id = self.tokenizer.token_to_id("[PAD]") or self.tokenizer.token_to_id("<pad>") or 0
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if ONNX_NER_THREADS:
+            options.intra_op_num_threads = ONNX_NER_THREADS
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.model_dir = model_dir
+
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "windows": 0, "batches": 0, "padded_tokens": 0, "tokens": 0}
+        # Threads inside predict(), tokenizing or waiting for their batch
+        self._callers = 0
+        self._batch_ms = deque(maxlen=2000)
+        self._wait_ms = deque(maxlen=2000)
+        self._worker = threading.Thread(target=self._run, name="onnx-ner-batcher", daemon=True)
+        self._worker.start()
+        print(f"Loaded ONNX NER model from {model_dir} ({', '.join(self.entities)})")
+
+    def predict(self, text: str) -> List[EntityTuple]:
+        """
+        Find named entities in a text
+
+        Tokenization happens in the calling thread; inference is queued and
+        batched with whatever other requests arrive within the wait window.
+
+        Args:
+            text: Input text
+
+        Returns:
+            (entity_type, start, end, score) tuples with character offsets
+        """
+        if not text.strip():
+            return []
+        with self._stats_lock:
+            self._callers += 1
+        try:
+            encoding = self.tokenizer.encode(text)
+            request = _Request([encoding] + list(encoding.overflowing))
+            self._queue.put(request)
+            window_logits = request.future.result(timeout=ONNX_NER_TIMEOUT)
+        finally:
+            with self._stats_lock:
+                self._callers -= 1
+        return self._decode(text, request.encodings, window_logits)
+
+    def _run(self):
+        """Scheduler thread: gather requests for up to the wait window, then run them"""
+        max_wait = ONNX_NER_MAX_WAIT_MS / 1000
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            windows = len(first.encodings)
+            deadline = time.perf_counter() + max_wait
+            stop = False
+            # Don't wait for more work when every caller is already in the batch
+            while windows < ONNX_NER_MAX_BATCH and len(batch) < self._callers:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+                windows += len(request.encodings)
+
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                print(f"ONNX NER batch failed: {str(e)}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            if stop:
+                return
+
+    def _run_batch(self, batch: List[_Request]):
+        started = time.perf_counter()
+        # (request index, window index, encoding), sorted by length so each
+        # inference call pads to similar lengths
+        windows = [
+            (request_index, window_index, encoding)
+            for request_index, request in enumerate(batch)
+            for window_index, encoding in enumerate(request.encodings)
+        ]
+        windows.sort(key=lambda item: len(item[2].ids))
+        results = [[None] * len(request.encodings) for request in batch]
+
+        padded_tokens = tokens = 0
+        for offset in range(0, len(windows), ONNX_NER_MAX_BATCH):
+            group = windows[offset:offset + ONNX_NER_MAX_BATCH]
+            width = max(len(encoding.ids) for _, _, encoding in group)
+            input_ids = np.full((len(group), width), self.pad_id, dtype=np.int64)
+            attention_mask = np.zeros((len(group), width), dtype=np.int64)
+            for row, (_, _, encoding) in enumerate(group):
+                length = len(encoding.ids)
+                input_ids[row, :length] = encoding.ids
+                attention_mask[row, :length] = 1
+                tokens += length
+            padded_tokens += input_ids.size
+
+            feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feed["token_type_ids"] = np.zeros_like(input_ids)
+            logits = self.session.run(None, {name: value for name, value in feed.items() if name in self.input_names})[0]
+            for row, (request_index, window_index, encoding) in enumerate(group):
+                results[request_index][window_index] = logits[row, :len(encoding.ids)]
+
+        finished = time.perf_counter()
+        for request, window_logits in zip(batch, results):
+            request.future.set_result(window_logits)
+
+        with self._stats_lock:
+            self._stats["requests"] += len(batch)
+            self._stats["windows"] += len(windows)
+            self._stats["batches"] += 1
+            self._stats["tokens"] += tokens
+            self._stats["padded_tokens"] += padded_tokens
+            self._batch_ms.append((finished - started) * 1000)
+            self._wait_ms.extend((started - request.queued_at) * 1000 for request in batch)
+
+    def _decode(self, text: str, encodings, window_logits) -> List[EntityTuple]:
+        """Turn per-token logits into character spans (BIO tags, first sub-token per word)"""
+        # Each window owns the characters from the middle of its overlap with
+        # the previous window to the middle of its overlap with the next one
+        bounds = []
+        for encoding in encodings:
+            offsets = [offset for offset, special in zip(encoding.offsets, encoding.special_tokens_mask)
+                       if not special and offset[1] > offset[0]]
+            bounds.append((offsets[0][0], offsets[-1][1]) if offsets else (0, 0))
+        owned_from = [0] + [(bounds[i - 1][1] + bounds[i][0]) // 2 for i in range(1, len(bounds))]
+        owned_to = owned_from[1:] + [len(text) + 1]
+
+        found = []
+        for encoding, logits, low, high in zip(encodings, window_logits, owned_from, owned_to):
+            shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+            probabilities = shifted / shifted.sum(axis=-1, keepdims=True)
+            label_ids = probabilities.argmax(axis=-1)
+            scores = probabilities.max(axis=-1)
+
+            window_spans = []
+            current = None  # [entity_type, start, end, score_sum, words]
+            previous_word = None
+            for index, (word, (start, end), special) in enumerate(
+                    zip(encoding.word_ids, encoding.offsets, encoding.special_tokens_mask)):
+                if special or end <= start:
+                    continue
+                if word is not None and word == previous_word:
+                    # Later sub-tokens extend the word but don't vote
+                    if current is not None:
+                        current[2] = end
+                    continue
+                previous_word = word
+
+                label = self.id2label[int(label_ids[index])]
+                prefix, _, tag = label.partition("-") if "-" in label else ("", "", label)
+                entity_type = LABEL_ENTITIES.get(tag)
+                if entity_type is None:
+                    if current is not None:
+                        window_spans.append(current)
+                    current = None
+                elif current is None or prefix == "B" or current[0] != entity_type:
+                    if current is not None:
+                        window_spans.append(current)
+                    current = [entity_type, start, end, float(scores[index]), 1]
+                else:
+                    current[2] = end
+                    current[3] += float(scores[index])
+                    current[4] += 1
+            if current is not None:
+                window_spans.append(current)
+            # Keep only spans that start in the part of the text this window owns
+            found.extend(span for span in window_spans if low <= span[1] < high)
+
+        spans = []
+        seen = set()
+        for entity_type, start, end, score_sum, words in found:
+            score = round(score_sum / words, 2)
+            key = (entity_type, start, end)
+            if score >= ONNX_NER_MIN_SCORE and key not in seen:
+                seen.add(key)
+                spans.append((entity_type, start, end, score))
+        return spans
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+            batch_ms = list(self._batch_ms)
+            wait_ms = list(self._wait_ms)
+        return {
+            **stats,
+            "model_dir": self.model_dir,
+            "mean_batch_windows": round(stats["windows"] / stats["batches"], 2) if stats["batches"] else 0.0,
+            "padding_ratio": round(1 - stats["tokens"] / stats["padded_tokens"], 4) if stats["padded_tokens"] else 0.0,
+            "batch_p50_ms": round(percentile(batch_ms, 0.50), 2),
+            "batch_p95_ms": round(percentile(batch_ms, 0.95), 2),
+            "queue_wait_p95_ms": round(percentile(wait_ms, 0.95), 2),
+        }
+
+
+_model: Optional[OnnxNerModel] = None
+_model_lock = threading.Lock()
+
+
+def get_onnx_model() -> OnnxNerModel:
+    """Process-wide model instance, loaded on first use (shared across recognizer reloads)"""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = OnnxNerModel()
+        return _model
+
+
+def onnx_model_stats() -> Optional[Dict]:
+    """Batching stats of the loaded model, or None if it isn't loaded"""
+    return _model.stats() if _model is not None else None
+
+
+class OnnxNerRecognizer(EntityRecognizer):
+    """Presidio recognizer backed by the shared ONNX NER model (replaces SpacyRecognizer)"""
+
+    def __init__(self, model: OnnxNerModel, supported_language: str = "en"):
+        self.model = model
+        super().__init__(
+            supported_entities=model.entities,
+            name="onnx_ner_recognizer",
+            supported_language=supported_language,
+        )
+
+    def load(self) -> None:
+        pass
+
+    def analyze(self, text: str, entities: List[str], nlp_artifacts=None) -> List[RecognizerResult]:
+        wanted = set(entities) if entities else None
+        return [
+            RecognizerResult(entity_type=entity_type, start=start, end=end, score=score)
+            for entity_type, start, end, score in self.model.predict(text)
+            if wanted is None or entity_type in wanted
+        ]
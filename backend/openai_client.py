@@ -7,6 +7,8 @@ import os
 import aiohttp
 from typing import List, Dict, Optional
 
+from profiling import profiled
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
 OPENAI_API_URL = os.getenv(
@@ -15,6 +17,7 @@ OPENAI_API_URL = os.getenv(
 )
 
 
+@profiled("openai")
 async def query_openai(
     redacted_text: str,
     model: str = None,
@@ -120,6 +123,7 @@ async def query_openai(
         return f"⚠️ Unexpected error: {str(e)}"
 
 
+@profiled("openai_streaming")
 async def query_openai_streaming(
     redacted_text: str,
     model: str = None,
@@ -0,0 +1,176 @@
+"""
+Parallel Analysis - Split one long document across worker processes
+Chunks are cut at paragraph or sentence boundaries and analyzed with some
+overlap on both sides; each entity belongs to the chunk whose own region
+contains its start offset, so entities crossing a seam are found once and
+whole. Conflict resolution, location merging and redaction then run over the
+whole document in the calling process (see privacy_engine.analyze_text)
+"""
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from typing import List, Optional, Set, Tuple
+
+PARALLEL_MIN_CHARS = int(os.getenv("PARALLEL_MIN_CHARS", "20000"))
+PARALLEL_WORKERS = int(os.getenv("PARALLEL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARALLEL_CHUNK_MIN_CHARS = int(os.getenv("PARALLEL_CHUNK_MIN_CHARS", "4000"))
+PARALLEL_OVERLAP_CHARS = int(os.getenv("PARALLEL_OVERLAP_CHARS", "200"))
+# Workers import privacy_engine (and load the spaCy model) themselves;
+# forkserver avoids forking a process that already runs threads
+PARALLEL_START_METHOD = os.getenv("PARALLEL_START_METHOD", "forkserver")
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+")
+
+EntityTuple = Tuple[str, int, int, float]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def parallel_enabled(text: str) -> bool:
+    """True if a text is long enough to be split across the worker processes"""
+    return PARALLEL_WORKERS > 1 and len(text) >= PARALLEL_MIN_CHARS
+
+
+def effective_parallelism(text_length: int) -> int:
+    """Expected speed-up of the NLP pass for a text of this length"""
+    if PARALLEL_WORKERS <= 1 or text_length < PARALLEL_MIN_CHARS:
+        return 1
+    return max(1, min(PARALLEL_WORKERS, text_length // PARALLEL_CHUNK_MIN_CHARS))
+
+
+def _find_boundary(text: str, low: int, high: int) -> int:
+    """Best cut point in text[low:high]: a paragraph break, else a sentence end, else whitespace"""
+    window = text[low:high]
+    for pattern in (PARAGRAPH_BREAK, SENTENCE_END):
+        cut = None
+        for match in pattern.finditer(window):
+            cut = match.end()
+        if cut is not None:
+            return low + cut
+    space = window.rfind(" ")
+    return low + space + 1 if space != -1 else high
+
+
+def split_into_chunks(text: str, target_chars: int, overlap: int = PARALLEL_OVERLAP_CHARS) -> List[Tuple[int, int, int, int]]:
+    """
+    Split text into chunks at natural boundaries
+
+    Args:
+        text: Full document
+        target_chars: Approximate size of each chunk's own region
+        overlap: Extra context analyzed on each side of the own region
+
+    Returns:
+        List of (window_start, window_end, own_start, own_end); own regions
+        tile the text exactly, windows extend them by the overlap
+    """
+    length = len(text)
+    chunks = []
+    own_start = 0
+    while own_start < length:
+        if length - own_start <= target_chars * 1.5:
+            own_end = length
+        else:
+            # Cut somewhere in the second half of the target window
+            own_end = _find_boundary(text, own_start + target_chars // 2, own_start + target_chars)
+        window_start = max(0, own_start - overlap)
+        window_end = min(length, own_end + overlap)
+        chunks.append((window_start, window_end, own_start, own_end))
+        own_start = own_end
+    return chunks
+
+
+def _analyze_chunk(chunk_text: str, language: str, route: str, config_version: str,
+                   entities: Optional[Set[str]] = None) -> List[EntityTuple]:
+    """Worker: collect raw entity spans for one chunk (offsets relative to the chunk)"""
+    import privacy_engine  # Imported in the worker process only
+
+    state = privacy_engine.get_engine_state()
+    if state.config_version != config_version:
+        # The parent hot-reloaded its recognizers since this worker started.
+        # The file may have changed again since then, so check what was loaded
+        privacy_engine.reload_engine()
+        state = privacy_engine.get_engine_state()
+        if state.config_version != config_version:
+            raise RuntimeError(f"Worker loaded config {state.config_version}, request uses {config_version}")
+    spans = privacy_engine.collect_spans(chunk_text, language, route, state, entities)
+    return [(span.entity_type, span.start, span.end, span.score) for span in spans]
+
+
+def _warm_worker():
+    import privacy_engine  # noqa: F401 - loads the NLP model before the first chunk arrives
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PARALLEL_WORKERS,
+                mp_context=multiprocessing.get_context(PARALLEL_START_METHOD),
+                initializer=_warm_worker,
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def analyze_chunks_parallel(text: str, language: str, route: str, config_version: str,
+                            entities: Optional[Set[str]] = None) -> Optional[List[EntityTuple]]:
+    """
+    Collect entity spans for a long text on the worker processes
+
+    Args:
+        text: Full document
+        language: Language to analyze as (already resolved)
+        route: Pre-filter route (already chosen for the whole text)
+        config_version: Recognizer config the workers must use
+        entities: Optional set of entity types to restrict detection to
+
+    Returns:
+        (entity_type, start, end, score) tuples with document offsets, or
+        None if the pool or a worker failed (the caller falls back to a serial pass)
+    """
+    target_chars = max(PARALLEL_CHUNK_MIN_CHARS, len(text) // (PARALLEL_WORKERS * 2) + 1)
+    chunks = split_into_chunks(text, target_chars)
+
+    try:
+        pool = _get_pool()
+        futures = [
+            pool.submit(_analyze_chunk, text[window_start:window_end], language, route, config_version, entities)
+            for window_start, window_end, _, _ in chunks
+        ]
+        chunk_results = [future.result() for future in futures]
+    except BrokenProcessPool as e:
+        print(f"Parallel analysis pool failed, falling back to serial: {str(e)}")
+        _reset_pool()
+        return None
+    except Exception as e:
+        # e.g. a worker could not load the request's config version
+        print(f"Parallel analysis chunk failed, falling back to serial: {type(e).__name__}: {str(e)}")
+        return None
+
+    # Rebase offsets and keep each entity only in the chunk that owns its start
+    found = []
+    for (window_start, _, own_start, own_end), results in zip(chunks, chunk_results):
+        for entity_type, start, end, score in results:
+            start += window_start
+            if own_start <= start < own_end:
+                found.append((entity_type, start, end + window_start, score))
+    return found
+
+
+def shutdown_pool():
+    """Stop the worker processes (called on application shutdown)"""
+    _reset_pool()
@@ -0,0 +1,155 @@
+"""
+Pre-filter Gate - Cheap screening in front of the NLP analyzer
+Routes each text to the full NLP path, a patterns-only path or a no-op path
+so plain questions don't pay for a full spaCy parse
+"""
+import os
+import re
+import threading
+from typing import Dict
+
+ROUTE_FULL = "full"          # spaCy NLP + all recognizers
+ROUTE_PATTERNS = "patterns"  # regex recognizers only, no NLP parse
+ROUTE_SKIP = "skip"          # nothing worth analyzing
+
+# Policy controls the recall/precision trade-off of the gate:
+#   off       - always take the full path (gate disabled)
+#   recall    - only skip NLP when there is no sign of names, places or dates
+#               (including a sentence that opens with a possible name)
+#   balanced  - date words alone no longer force NLP; PII-free text is skipped
+#   precision - NLP only for contextual triggers or several capitalized words
+PREFILTER_POLICY = os.getenv("PREFILTER_POLICY", "recall").lower()
+PREFILTER_MIN_CHARS = int(os.getenv("PREFILTER_MIN_CHARS", "3"))
+PREFILTER_POLICIES = ("off", "recall", "balanced", "precision")
+
+# Context phrases used by detect_contextual_names and the professional recognizers
+_CONTEXT_TRIGGERS = re.compile(
+    r"(?i)\b(?:my\s+name|call\s+me|called|i\s+am|i'm|this\s+is|meet|named|hi|hello|hey|from"
+    r"|works?\s+(?:at|for|as)|employed|job\s+is|occupation|profession|position\s+is"
+    r"|role\s+is|title\s+is|company\s+is|organization\s+is|lives?\s+(?:in|at)|address)\b"
+)
+
+# Words spaCy tags as DATE_TIME even in lowercase text
+_DATE_WORDS = re.compile(
+    r"(?i)\b(?:today|tomorrow|yesterday|tonight|weekend|birthday"
+    r"|monday|tuesday|wednesday|thursday|friday|saturday|sunday"
+    r"|january|february|march|april|june|july|august|september|october|november|december"
+    r"|(?:last|next|this)\s+(?:week|month|year))\b"
+)
+
+# Capitalized words that are not at the start of a sentence (likely proper nouns).
+# The standalone pronoun "I" is ignored by requiring two letters.
+_MIDSENTENCE_CAPITALIZED = re.compile(r"(?<=[^.!?\s] )[A-Z][A-Za-z]")
+
+# Capitalized first word of each sentence ("Rahul needs help..."). Only counts
+# as a name signal when it is not one of the usual sentence openers below.
+_SENTENCE_INITIAL = re.compile(r"(?:^|[.!?]\s+)([A-Z][a-z']+)\b")
+_SENTENCE_OPENERS = frozenset("""
+    a an the this that these those there here it its my your our their his her
+    i we you he she they me us them what how why when where who whom whose which
+    can could would should will shall may might must do does did is are was were
+    be been being have has had am if and but or so also then than not no yes ok
+    okay please thanks thank hi hello hey dear let let's lets give write explain
+    tell show list make help suggest translate summarize summarise describe create
+    find check compare convert generate define calculate draft rewrite fix add
+    remove in on at for to with without after before as by from of about into
+    all any some each every one two many much more most few just now today
+    yesterday tomorrow again still only even however although because since while
+    once new good best other another first next last
+""".split())
+
+# Symbols that only appear in emails, URLs and similar pattern-detected values
+_PATTERN_SYMBOLS = re.compile(r"@|://|www\.")
+_DIGIT = re.compile(r"\d")
+
+_stats_lock = threading.Lock()
+_route_counts: Dict[str, Dict[str, int]] = {
+    ROUTE_FULL: {"texts": 0, "chars": 0},
+    ROUTE_PATTERNS: {"texts": 0, "chars": 0},
+    ROUTE_SKIP: {"texts": 0, "chars": 0},
+}
+
+
+def _choose_route(text: str, policy: str) -> str:
+    """Pick the analysis path for a text under the given policy"""
+    if policy == "off":
+        return ROUTE_FULL
+
+    stripped = text.strip()
+    if len(stripped) < PREFILTER_MIN_CHARS or not any(c.isalnum() for c in stripped):
+        return ROUTE_SKIP
+
+    # Capitalization heuristics don't apply to non-Latin scripts
+    if not stripped.isascii():
+        return ROUTE_FULL
+
+    has_trigger = _CONTEXT_TRIGGERS.search(stripped) is not None
+    capitalized = len(_MIDSENTENCE_CAPITALIZED.findall(stripped))
+    initial_names = [word for word in _SENTENCE_INITIAL.findall(stripped)
+                     if word.lower() not in _SENTENCE_OPENERS]
+    has_patterns = (_DIGIT.search(stripped) is not None
+                    or _PATTERN_SYMBOLS.search(stripped) is not None)
+
+    if policy == "precision":
+        if has_trigger or capitalized >= 2:
+            return ROUTE_FULL
+        return ROUTE_PATTERNS if has_patterns else ROUTE_SKIP
+
+    if has_trigger or capitalized:
+        return ROUTE_FULL
+
+    has_date = _DATE_WORDS.search(stripped) is not None
+    if policy == "recall":
+        # A sentence may open with a name, so only known openers stay off the NLP path
+        return ROUTE_FULL if (has_date or initial_names) else ROUTE_PATTERNS
+
+    # balanced
+    return ROUTE_PATTERNS if (has_patterns or has_date) else ROUTE_SKIP
+
+
+def screen_text(text: str, policy: str = None) -> str:
+    """
+    Decide how much analysis a text needs and record the decision
+
+    Args:
+        text: Input text
+        policy: Override for PREFILTER_POLICY
+
+    Returns:
+        One of ROUTE_FULL, ROUTE_PATTERNS or ROUTE_SKIP
+    """
+    policy = (policy or PREFILTER_POLICY).lower()
+    if policy not in PREFILTER_POLICIES:
+        policy = "recall"
+
+    route = _choose_route(text, policy)
+
+    with _stats_lock:
+        counts = _route_counts[route]
+        counts["texts"] += 1
+        counts["chars"] += len(text)
+
+    return route
+
+
+def get_prefilter_stats() -> Dict:
+    """
+    Get counters showing how much traffic each path takes
+
+    Returns:
+        Dict with the active policy and per-route text/char counts and shares
+    """
+    with _stats_lock:
+        snapshot = {route: dict(counts) for route, counts in _route_counts.items()}
+
+    total_texts = sum(counts["texts"] for counts in snapshot.values())
+    total_chars = sum(counts["chars"] for counts in snapshot.values())
+    for counts in snapshot.values():
+        counts["text_share"] = round(counts["texts"] / total_texts, 4) if total_texts else 0.0
+        counts["char_share"] = round(counts["chars"] / total_chars, 4) if total_chars else 0.0
+
+    return {
+        "policy": PREFILTER_POLICY,
+        "total_texts": total_texts,
+        "routes": snapshot,
+    }
@@ -1,236 +1,298 @@
 """
 Privacy Engine - PII Detection and Redaction using Presidio
 Uses pattern-based detection with custom recognizers for plain formats
+Recognizer patterns, weights, priorities and labels come from the versioned
+config/recognizers.json and can be hot-reloaded (see reload_engine)
 """
-from presidio_analyzer import AnalyzerEngine, PatternRecognizer, Pattern
+from presidio_analyzer import AnalyzerEngine, PatternRecognizer, EntityRecognizer, RecognizerResult
 from presidio_analyzer.nlp_engine import NlpEngineProvider
-from presidio_anonymizer import AnonymizerEngine
-from presidio_anonymizer.entities import OperatorConfig
-from typing import List, Dict
+from typing import List, Dict, Optional, Set
 import re
+import threading
+import time
+
+from gazetteer import GazetteerRecognizer
+from onnx_ner import NER_BACKEND, OnnxNerRecognizer, get_onnx_model, onnx_model_stats
+from prefilter import screen_text, ROUTE_PATTERNS, ROUTE_SKIP
+from profiling import profiled
+from parallel_analysis import parallel_enabled, analyze_chunks_parallel
+from recognizer_config import RECOGNIZER_CONFIG_PATH, load_recognizer_config, build_pattern_recognizers
+from language_engines import (
+    DEFAULT_LANGUAGE,
+    LANGUAGE_AGNOSTIC_ENTITIES,
+    NLP_MODELS,
+    detect_language,
+    language_engines,
+)
+from recognizer_profiles import (
+    RECOGNIZER_PROFILE,
+    RECOGNIZER_PROFILING,
+    get_profile_entities,
+    instrument_registry,
+    prune_registry,
+)
 
 # Configure NLP engine with spaCy for better name recognition
+# (other languages are loaded on first use by language_engines)
+# Loaded once; recognizer config reloads reuse it
 nlp_configuration = {
     "nlp_engine_name": "spacy",
-    "models": [{"lang_code": "en", "model_name": "en_core_web_lg"}],
+    "models": [{"lang_code": DEFAULT_LANGUAGE, "model_name": NLP_MODELS.get(DEFAULT_LANGUAGE, "en_core_web_lg")}],
 }
 nlp_engine = NlpEngineProvider(nlp_configuration=nlp_configuration).create_engine()
 
-# Custom recognizer for plain phone numbers (e.g., 555-0123, 555 0123, 5550123)
-phone_recognizer = PatternRecognizer(
-    supported_entity="PHONE_NUMBER",
-    name="plain_phone_recognizer",
-    patterns=[
-        Pattern(name="phone_plain", regex=r"\b\d{3}[-\s]?\d{4}\b", score=0.7),  # 555-0123 or 555 0123
-        Pattern(name="phone_standard", regex=r"\b\d{3}[-\s]?\d{3}[-\s]?\d{4}\b", score=0.8),  # 555-012-3456
-        Pattern(name="phone_parens", regex=r"\(\d{3}\)\s?\d{3}[-\s]?\d{4}\b", score=0.9),  # (555) 012-3456
-        Pattern(name="indian_phone", regex=r"\+?91[-\s]?\d{10}\b", score=0.9),  # +91 9876543210
-        Pattern(name="indian_phone_plain", regex=r"\b[6-9]\d{9}\b", score=0.75),  # 9876543210 (Indian mobile)
-    ],
-)
+# Optional transformer NER for the default language (NER_BACKEND=onnx). spaCy
+# keeps tokenizing/lemmatizing for context words; its own NER is switched off
+onnx_model = None
+if NER_BACKEND == "onnx":
+    try:
+        onnx_model = get_onnx_model()
+    except RuntimeError as e:
+        print(f"ONNX NER unavailable, using spaCy NER: {str(e)}")
+if onnx_model is not None:
+    for spacy_model in nlp_engine.nlp.values():
+        spacy_model.select_pipes(disable=[name for name in ("ner", "parser") if name in spacy_model.pipe_names])
+ACTIVE_NER_BACKEND = "onnx" if onnx_model is not None else "spacy"
 
-# Custom recognizer for occupations/job titles - CASE-INSENSITIVE
-occupation_recognizer = PatternRecognizer(
-    supported_entity="OCCUPATION",
-    name="occupation_recognizer",
-    patterns=[
-        Pattern(
-            name="occupation_context",
-            regex=r"(?i)\b(?:works?\s+as|job\s+is|occupation\s+is|profession\s+is|employed\s+as|position\s+is|role\s+is|title\s+is|i\s+am\s+a|i'm\s+a)\s+(?:a\s+|an\s+)?([a-z][a-z\s]{2,30}?)(?=\s+at|\s+in|\s+for|\.|,|$)",
-            score=0.85
-        ),
-        Pattern(
-            name="occupation_title",
-            regex=r"(?i)\b(software\s+engineer|data\s+scientist|product\s+manager|designer|developer|teacher|doctor|nurse|lawyer|accountant|engineer|manager|consultant|analyst|architect|ceo|cto|cfo|director|professor|researcher|student)\b",
-            score=0.80
-        ),
-    ],
-)
+# Prune recognizers the deployment profile doesn't need (e.g. AU/US IDs for "india")
+PROFILE_ENTITIES = get_profile_entities(RECOGNIZER_PROFILE)
 
-# Custom recognizer for organizations/companies - CASE-INSENSITIVE
-organization_recognizer = PatternRecognizer(
-    supported_entity="ORGANIZATION",
-    name="organization_recognizer",
-    patterns=[
-        Pattern(
-            name="org_context",
-            regex=r"(?i)\b(?:works?\s+at|works?\s+for|employed\s+at|employed\s+by|company\s+is|organization\s+is)\s+([A-Za-z][A-Za-z0-9\s&.]{2,40})(?=\.|,|$|\s+as|\s+in)",
-            score=0.85
-        ),
-        Pattern(
-            name="org_suffix",
-            regex=r"\b([A-Z][A-Za-z0-9\s&.]{2,40})\s+(?:Inc\.?|LLC|Ltd\.?|Corporation|Corp\.?|Company|Co\.?|Technologies|Tech|Systems|Solutions|Services|Group|International|Pvt\.?\s+Ltd\.?|Limited)\b",
-            score=0.90
-        ),
-    ],
-)
 
-# Custom recognizer for US addresses (street number + street + city + state + zip) - CASE-INSENSITIVE
-address_recognizer = PatternRecognizer(
-    supported_entity="LOCATION",
-    name="address_recognizer",
-    patterns=[
-        # Full address with zip: 123 Main St, New York, NY 10001
-        Pattern(
-            name="full_address_zip",
-            regex=r"(?i)\b\d+\s+[A-Za-z\s]+(?:street|st|avenue|ave|road|rd|drive|dr|lane|ln|boulevard|blvd|way|court|ct|place|pl)[\s,]+[A-Za-z\s]+[\s,]+[A-Z]{2}[\s,]+\d{5}(?:-\d{4})?\b",
-            score=0.95
-        ),
-        # Address without state: 123 Main St, New York 10001
-        Pattern(
-            name="address_city_zip",
-            regex=r"(?i)\b\d+\s+[A-Za-z\s]+(?:street|st|avenue|ave|road|rd|drive|dr|lane|ln|boulevard|blvd|way|court|ct|place|pl)[\s,]+[A-Za-z\s]+[\s,]+\d{5}(?:-\d{4})?\b",
-            score=0.9
-        ),
-        # Simple street address with number: 123 Main Street
-        Pattern(
-            name="street_address",
-            regex=r"(?i)\b\d+\s+[A-Za-z\s]+(?:street|st|avenue|ave|road|rd|drive|dr|lane|ln|boulevard|blvd|way|court|ct|place|pl)\b",
-            score=0.75
-        ),
-    ],
-)
+# Interned entity types: each type name maps to a small integer code. Codes are
+# global and never change; the per-type lookups (priority, weight, label) live
+# in lists indexed by code on each EngineState
+_ENTITY_TYPE_CODES: Dict[str, int] = {}
+_ENTITY_TYPE_NAMES: List[str] = []
+_INTERN_LOCK = threading.Lock()
 
-# Custom recognizer for Indian Aadhaar numbers (12 digits, format: 1234 5678 9012)
-aadhaar_recognizer = PatternRecognizer(
-    supported_entity="IN_AADHAAR",
-    name="aadhaar_recognizer",
-    patterns=[
-        Pattern(name="aadhaar_spaced", regex=r"\b\d{4}\s\d{4}\s\d{4}\b", score=0.9),  # 1234 5678 9012
-        Pattern(name="aadhaar_plain", regex=r"\b\d{12}\b", score=0.6),  # 123456789012
-    ],
-)
 
-# Custom recognizer for Indian PAN Card (Format: ABCDE1234F) - CASE-INSENSITIVE
-pan_recognizer = PatternRecognizer(
-    supported_entity="IN_PAN",
-    name="pan_recognizer",
-    patterns=[
-        Pattern(name="pan_card", regex=r"(?i)\b[A-Z]{5}\d{4}[A-Z]\b", score=0.95),  # ABCDE1234F or abcde1234f
-    ],
-)
+def intern_entity_type(entity_type: str) -> int:
+    """
+    Get the compact integer code for an entity type, registering it if new
+    
+    Args:
+        entity_type: Entity type name (e.g., "PERSON")
+    
+    Returns:
+        Integer code for the entity type
+    """
+    code = _ENTITY_TYPE_CODES.get(entity_type)
+    if code is None:
+        with _INTERN_LOCK:
+            code = _ENTITY_TYPE_CODES.get(entity_type)
+            if code is None:
+                code = len(_ENTITY_TYPE_NAMES)
+                _ENTITY_TYPE_NAMES.append(entity_type)
+                _ENTITY_TYPE_CODES[entity_type] = code
+    return code
 
-# Custom recognizer for Indian Vehicle Registration (Format: DL01AB1234, MH02CD5678) - CASE-INSENSITIVE
-vehicle_reg_recognizer = PatternRecognizer(
-    supported_entity="IN_VEHICLE_REGISTRATION",
-    name="vehicle_registration_recognizer",
-    patterns=[
-        Pattern(name="vehicle_reg", regex=r"(?i)\b[A-Z]{2}[-\s]?\d{2}[-\s]?[A-Z]{1,2}[-\s]?\d{4}\b", score=0.85),
-    ],
-)
 
-# Custom recognizer for Indian Passport (Format: A1234567, Z9876543) - CASE-INSENSITIVE
-passport_recognizer = PatternRecognizer(
-    supported_entity="IN_PASSPORT",
-    name="passport_recognizer",
-    patterns=[
-        Pattern(name="indian_passport", regex=r"(?i)\b[A-Z]\d{7}\b", score=0.9),
-    ],
-)
+class EngineState:
+    """
+    One immutable version of the recognizer configuration
+    
+    Holds the analyzer built from a config file plus the weight/priority/label
+    tables. A request captures the current state once and uses it throughout,
+    so a reload never changes the rules halfway through an analysis.
+    """
 
-# Custom recognizer for Indian Voter ID (Format: ABC1234567) - CASE-INSENSITIVE
-voter_id_recognizer = PatternRecognizer(
-    supported_entity="IN_VOTER_ID",
-    name="voter_id_recognizer",
-    patterns=[
-        Pattern(name="voter_id", regex=r"(?i)\b[A-Z]{3}\d{7}\b", score=0.85),
-    ],
-)
+    def __init__(self, config: Dict, analyzer: AnalyzerEngine):
+        self.version = config["version"]
+        self.digest = config["digest"]
+        self.analyzer = analyzer
+        self.entity_weights: Dict[str, int] = config["entity_weights"]
+        self.entity_priority: Dict[str, int] = config["entity_priority"]
+        self.redaction_labels: Dict[str, str] = config["redaction_labels"]
+        self.default_weight = config.get("default_weight", 10)
+        self.default_priority = config.get("default_priority", 50)
+        self.loaded_at = time.time()
+        # Regex/gazetteer recognizers, for the patterns-only route
+        self.pattern_recognizers = [
+            recognizer for recognizer in analyzer.registry.get_recognizers(language=DEFAULT_LANGUAGE, all_fields=True)
+            if isinstance(recognizer, (PatternRecognizer, GazetteerRecognizer))
+        ]
+        self.priority_by_code: List[int] = []
+        self.weight_by_code: List[int] = []
+        self.label_by_code: List[str] = []
+        self._tables_lock = threading.Lock()
+        self.sync_codes()
+
+    @property
+    def config_version(self) -> str:
+        """Declared version plus content digest; use this in cache keys"""
+        return f"{self.version}+{self.digest[:12]}"
+
+    def sync_codes(self):
+        """Extend the per-code tables to cover entity types interned since the last call"""
+        if len(self.label_by_code) == len(_ENTITY_TYPE_NAMES):
+            return
+        with self._tables_lock:
+            for code in range(len(self.label_by_code), len(_ENTITY_TYPE_NAMES)):
+                entity_type = _ENTITY_TYPE_NAMES[code]
+                self.priority_by_code.append(self.entity_priority.get(entity_type, self.default_priority))
+                self.weight_by_code.append(self.entity_weights.get(entity_type, self.default_weight))
+                self.label_by_code.append(self.redaction_labels.get(entity_type, f"[{entity_type}]"))
+
+
+def build_engine_state(config_path: str = RECOGNIZER_CONFIG_PATH) -> EngineState:
+    """
+    Build a new engine state from a config file, reusing the loaded NLP engine
+    
+    Args:
+        config_path: Path to the recognizer config JSON
+    
+    Returns:
+        A ready-to-use EngineState
+    
+    Raises:
+        ValueError: The config is invalid
+    """
+    config = load_recognizer_config(config_path)
+    
+    # Initialize Presidio engine with predefined + custom recognizers and NLP
+    state_analyzer = AnalyzerEngine(nlp_engine=nlp_engine, supported_languages=[DEFAULT_LANGUAGE])
+    for recognizer in build_pattern_recognizers(config, DEFAULT_LANGUAGE):
+        state_analyzer.registry.add_recognizer(recognizer)
+    if onnx_model is not None:
+        state_analyzer.registry.remove_recognizer("SpacyRecognizer")
+        state_analyzer.registry.add_recognizer(OnnxNerRecognizer(onnx_model, DEFAULT_LANGUAGE))
+    if config.get("gazetteer", True):
+        # Gazetteer of occupations, organizations, company suffixes and Indian names,
+        # matched in one Aho-Corasick pass (data/gazetteer/*.txt)
+        state_analyzer.registry.add_recognizer(GazetteerRecognizer())
+    
+    removed = prune_registry(state_analyzer.registry, RECOGNIZER_PROFILE)
+    if removed:
+        print(f"Recognizer profile '{RECOGNIZER_PROFILE}': disabled {len(removed)} recognizers")
+    if RECOGNIZER_PROFILING:
+        instrument_registry(state_analyzer.registry)
+    
+    return EngineState(config, state_analyzer)
+
+
+_engine_state = build_engine_state()
+_reload_lock = threading.Lock()
+_reload_count = 0
 
-# Initialize Presidio engines with custom recognizers and NLP
-analyzer = AnalyzerEngine(nlp_engine=nlp_engine, supported_languages=["en"])
-analyzer.registry.add_recognizer(phone_recognizer)
-analyzer.registry.add_recognizer(address_recognizer)
-analyzer.registry.add_recognizer(aadhaar_recognizer)
-analyzer.registry.add_recognizer(pan_recognizer)
-analyzer.registry.add_recognizer(vehicle_reg_recognizer)
-analyzer.registry.add_recognizer(passport_recognizer)
-analyzer.registry.add_recognizer(voter_id_recognizer)
-analyzer.registry.add_recognizer(occupation_recognizer)
-analyzer.registry.add_recognizer(organization_recognizer)
-anonymizer = AnonymizerEngine()
-
-# Entity weights for privacy score calculation
-ENTITY_WEIGHTS = {
-    "PERSON": 15,
-    "EMAIL_ADDRESS": 20,
-    "PHONE_NUMBER": 18,
-    "CREDIT_CARD": 25,
-    "CRYPTO": 25,
-    "IBAN_CODE": 25,
-    "IP_ADDRESS": 12,
-    "LOCATION": 10,
-    "DATE_TIME": 5,
-    "URL": 8,
-    "US_SSN": 30,
-    "US_DRIVER_LICENSE": 20,
-    "US_PASSPORT": 25,
-    "MEDICAL_LICENSE": 22,
-    "NRP": 15,
-    "US_BANK_NUMBER": 25,
-    "AU_ABN": 20,
-    "AU_ACN": 20,
-    "AU_TFN": 25,
-    "AU_MEDICARE": 25,
-    # Indian PII
-    "IN_AADHAAR": 30,
-    "IN_PAN": 25,
-    "IN_PASSPORT": 25,
-    "IN_VOTER_ID": 20,
-    "IN_VEHICLE_REGISTRATION": 15,
-    # Professional Information
-    "OCCUPATION": 12,
-    "ORGANIZATION": 14,
-}
 
+def get_engine_state() -> EngineState:
+    """Current engine state (capture it once per request)"""
+    return _engine_state
 
-def resolve_entity_conflicts(entities: List[Dict]) -> List[Dict]:
+
+def reload_engine(config_path: str = RECOGNIZER_CONFIG_PATH) -> Dict:
+    """
+    Build a new engine state from the config file and swap it in atomically
+    
+    Requests already running keep the state they captured; the previous state
+    is dropped once they finish. On an invalid config the current state stays.
+    
+    Args:
+        config_path: Path to the recognizer config JSON
+    
+    Returns:
+        Dict with the previous and new config versions and the build time
+    """
+    global _engine_state, _reload_count
+    with _reload_lock:
+        started = time.perf_counter()
+        new_state = build_engine_state(config_path)
+        previous = _engine_state
+        _engine_state = new_state
+        _reload_count += 1
+    return {
+        "previous_version": previous.config_version,
+        "config_version": new_state.config_version,
+        "recognizers": len(new_state.analyzer.registry.recognizers),
+        "build_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def get_engine_stats() -> Dict:
+    """Config version and reload counters for /v1/stats"""
+    state = _engine_state
+    return {
+        "profile": RECOGNIZER_PROFILE,
+        "ner_backend": ACTIVE_NER_BACKEND,
+        "onnx_ner": onnx_model_stats(),
+        "active": len(state.analyzer.registry.recognizers),
+        "config_version": state.config_version,
+        "config_loaded_at": state.loaded_at,
+        "reloads": _reload_count,
+    }
+
+
+class EntitySpan:
+    """
+    Compact internal representation of a detected entity
+    
+    Used through the whole analysis pipeline; entities are only converted to
+    the public dict shape when results leave analyze_text.
+    """
+    __slots__ = ("type_code", "start", "end", "score")
+
+    def __init__(self, type_code: int, start: int, end: int, score: float):
+        self.type_code = type_code
+        self.start = start
+        self.end = end
+        self.score = score
+
+    @property
+    def entity_type(self) -> str:
+        return _ENTITY_TYPE_NAMES[self.type_code]
+
+    def to_dict(self, text: str) -> Dict:
+        """Convert to the public entity dict shape"""
+        return {
+            "entity_type": _ENTITY_TYPE_NAMES[self.type_code],
+            "start": self.start,
+            "end": self.end,
+            "score": self.score,
+            "text": text[self.start:self.end]
+        }
+
+    def __repr__(self) -> str:
+        return f"EntitySpan({self.entity_type}, {self.start}, {self.end}, {self.score})"
+
+
+LOCATION_CODE = intern_entity_type("LOCATION")
+PERSON_CODE = intern_entity_type("PERSON")
+
+
+def resolve_entity_conflicts(entities: List[EntitySpan], state: Optional[EngineState] = None) -> List[EntitySpan]:
     """
     Resolve conflicts when entities overlap
     Priority: PERSON > EMAIL > PHONE > other entities > LOCATION
     
     Args:
-        entities: List of detected entities
+        entities: List of detected entity spans
+        state: Engine state whose priorities apply (default: current)
     
     Returns:
-        List of entities with conflicts resolved
+        List of entity spans with conflicts resolved
     """
     if not entities:
         return entities
     
-    # Define priority order (higher number = higher priority)
-    priority = {
-        "PERSON": 100,
-        "EMAIL_ADDRESS": 90,
-        "PHONE_NUMBER": 80,
-        "IN_AADHAAR": 75,
-        "IN_PAN": 75,
-        "IN_PASSPORT": 75,
-        "CREDIT_CARD": 70,
-        "US_SSN": 70,
-        "OCCUPATION": 20,
-        "ORGANIZATION": 20,
-        "LOCATION": 10,  # Lowest priority
-    }
+    state = state or _engine_state
+    state.sync_codes()
+    priority = state.priority_by_code
     
     # Sort by start position
-    sorted_entities = sorted(entities, key=lambda e: e["start"])
+    sorted_entities = sorted(entities, key=lambda e: e.start)
     resolved = []
     
     for entity in sorted_entities:
         # Check if this entity overlaps with any already resolved entity
         overlaps = False
-        for resolved_entity in resolved:
+        for index, resolved_entity in enumerate(resolved):
             # Check for overlap
-            if (entity["start"] < resolved_entity["end"] and 
-                entity["end"] > resolved_entity["start"]):
+            if (entity.start < resolved_entity.end and 
+                entity.end > resolved_entity.start):
                 # There's an overlap - keep the higher priority entity
-                entity_priority = priority.get(entity["entity_type"], 50)
-                resolved_priority = priority.get(resolved_entity["entity_type"], 50)
-                
-                if entity_priority > resolved_priority:
+                if priority[entity.type_code] > priority[resolved_entity.type_code]:
                     # Replace the resolved entity with this one
-                    resolved.remove(resolved_entity)
+                    del resolved[index]
                     resolved.append(entity)
                 overlaps = True
                 break
@@ -238,27 +300,27 @@ def resolve_entity_conflicts(entities: List[Dict]) -> List[Dict]:
         if not overlaps:
             resolved.append(entity)
     
-    return sorted(resolved, key=lambda e: e["start"])
+    return sorted(resolved, key=lambda e: e.start)
 
 
-def merge_adjacent_locations(entities: List[Dict], text: str, max_gap: int = 15) -> List[Dict]:
+def merge_adjacent_locations(entities: List[EntitySpan], text: str, max_gap: int = 15) -> List[EntitySpan]:
     """
     Merge adjacent LOCATION entities into single address entities
     Also includes nearby numbers (like zip codes) that are part of addresses
     
     Args:
-        entities: List of detected entities
+        entities: List of detected entity spans
         text: Original text
         max_gap: Maximum character gap between locations to merge
     
     Returns:
-        List of entities with merged locations
+        List of entity spans with merged locations
     """
     if not entities:
         return entities
     
     # Sort entities by start position
-    sorted_entities = sorted(entities, key=lambda e: e["start"])
+    sorted_entities = sorted(entities, key=lambda e: e.start)
     merged = []
     i = 0
     
@@ -266,26 +328,26 @@ def merge_adjacent_locations(entities: List[Dict], text: str, max_gap: int = 15)
         current = sorted_entities[i]
         
         # If not a location, add as-is
-        if current["entity_type"] != "LOCATION":
+        if current.type_code != LOCATION_CODE:
             merged.append(current)
             i += 1
             continue
         
         # Start merging locations
-        merge_start = current["start"]
-        merge_end = current["end"]
-        merge_score = current["score"]
+        merge_start = current.start
+        merge_end = current.end
+        merge_score = current.score
         
         # Look ahead for more locations within max_gap
         j = i + 1
         while j < len(sorted_entities):
             next_entity = sorted_entities[j]
-            gap = next_entity["start"] - merge_end
+            gap = next_entity.start - merge_end
             
             # Check if next entity is a location within max_gap characters
-            if next_entity["entity_type"] == "LOCATION" and gap <= max_gap:
-                merge_end = next_entity["end"]
-                merge_score = max(merge_score, next_entity["score"])
+            if next_entity.type_code == LOCATION_CODE and gap <= max_gap:
+                merge_end = next_entity.end
+                merge_score = max(merge_score, next_entity.score)
                 j += 1
             else:
                 break
@@ -299,20 +361,13 @@ def merge_adjacent_locations(entities: List[Dict], text: str, max_gap: int = 15)
             merge_end = merge_end + zip_match.end()
         
         # Create merged entity
-        merged_entity = {
-            "entity_type": "LOCATION",
-            "start": merge_start,
-            "end": merge_end,
-            "score": round(merge_score, 2),
-            "text": text[merge_start:merge_end]
-        }
-        merged.append(merged_entity)
+        merged.append(EntitySpan(LOCATION_CODE, merge_start, merge_end, round(merge_score, 2)))
         i = j
     
     return merged
 
 
-def detect_contextual_names(text: str, existing_entities: List[Dict]) -> List[Dict]:
+def detect_contextual_names(text: str, existing_entities: List[EntitySpan]) -> List[EntitySpan]:
     """
     Detect names based on context clues that Presidio/spaCy might miss
     Looks for patterns like "My name is X", "I am X", "called X", etc.
@@ -321,10 +376,10 @@ def detect_contextual_names(text: str, existing_entities: List[Dict]) -> List[Di
     
     Args:
         text: Original text
-        existing_entities: Already detected entities
+        existing_entities: Already detected entity spans
     
     Returns:
-        List of additional name entities found through context
+        List of additional name entity spans found through context
     """
     additional_entities = []
     
@@ -362,108 +417,202 @@ def detect_contextual_names(text: str, existing_entities: List[Dict]) -> List[Di
             # Check if this position overlaps with existing PERSON entity
             already_has_person = False
             for entity in existing_entities:
-                if (entity["entity_type"] == "PERSON" and 
-                    ((entity["start"] <= start < entity["end"]) or 
-                     (start <= entity["start"] < end))):
+                if (entity.type_code == PERSON_CODE and 
+                    ((entity.start <= start < entity.end) or 
+                     (start <= entity.start < end))):
                     already_has_person = True
                     break
             
             if not already_has_person:
-                additional_entities.append({
-                    "entity_type": "PERSON",
-                    "start": start,
-                    "end": end,
-                    "score": score,
-                    "text": name
-                })
+                additional_entities.append(EntitySpan(PERSON_CODE, start, end, score))
     
     return additional_entities
 
 
-def analyze_text(text: str, language: str = "en") -> Dict:
+def run_pattern_recognizers(text: str, only: Optional[Set[str]] = None,
+                            state: Optional[EngineState] = None) -> List[RecognizerResult]:
     """
-    Analyze text for PII entities and return redacted version
-    Enhanced with custom recognizers for plain phone numbers
+    Run only the regex-based recognizers, skipping the spaCy NLP parse
     
     Args:
         text: Input text to analyze
-        language: Language code (default: "en")
+        only: Optional set of entity types to restrict the recognizers to
+        state: Engine state whose recognizers run (default: current)
     
     Returns:
-        Dict containing:
-            - entities: List of detected entities
-            - redacted_text: Text with PII replaced by placeholders
+        List of Presidio RecognizerResult objects
     """
-    # Step 1: Analyze with Presidio (pattern-based recognizers)
-    analyzer_results = analyzer.analyze(
-        text=text,
-        language=language,
-        entities=None  # Detect all entity types
-    )
-    
-    # Step 2: Format entities for response
-    entities = []
-    for result in analyzer_results:
-        entity = {
-            "entity_type": result.entity_type,
-            "start": result.start,
-            "end": result.end,
-            "score": round(result.score, 2),
-            "text": text[result.start:result.end]
-        }
-        entities.append(entity)
+    state = state or _engine_state
+    results = []
+    for recognizer in state.pattern_recognizers:
+        if only is not None and not only.intersection(recognizer.supported_entities):
+            continue
+        current_results = recognizer.analyze(
+            text=text, entities=recognizer.supported_entities, nlp_artifacts=None
+        )
+        if current_results:
+            results.extend(current_results)
+    return EntityRecognizer.remove_duplicates(results)
+
+
+def redact_spans(text: str, entities: List[EntitySpan], vault=None, state: Optional[EngineState] = None) -> str:
+    """
+    Replace entity spans with their redaction placeholders
+    
+    Adjacent entities of the same type separated only by spaces are redacted
+    as one placeholder, and spans overlapping an earlier span are skipped.
+    
+    Args:
+        text: Original text
+        entities: Entity spans sorted by start position
+        vault: Optional TokenVault; if given, each value gets a reversible
+               per-session token (e.g., [PERSON_1]) instead of a placeholder
+        state: Engine state whose labels apply (default: current)
+    
+    Returns:
+        Text with PII replaced by placeholders
+    """
+    state = state or _engine_state
+    state.sync_codes()
+    labels = state.label_by_code
+    
+    # Collapse overlaps and same-type neighbours into (code, start, end) segments
+    segments = []
+    cursor = 0
+    for entity in entities:
+        if entity.start < cursor:
+            continue
+        if segments:
+            last_code, last_start, _ = segments[-1]
+            gap = text[cursor:entity.start]
+            if entity.type_code == last_code and gap and not gap.strip(" "):
+                segments[-1] = (last_code, last_start, entity.end)
+                cursor = entity.end
+                continue
+        segments.append((entity.type_code, entity.start, entity.end))
+        cursor = entity.end
+    
+    parts = []
+    cursor = 0
+    for code, start, end in segments:
+        parts.append(text[cursor:start])
+        if vault is None:
+            parts.append(labels[code])
+        else:
+            parts.append(vault.tokenize(labels[code][1:-1], text[start:end]))
+        cursor = end
+    parts.append(text[cursor:])
+    return "".join(parts)
+
+
+def score_spans(entities: List[EntitySpan], state: Optional[EngineState] = None) -> int:
+    """
+    Calculate privacy score directly from entity spans
+    
+    Args:
+        entities: List of detected entity spans
+        state: Engine state whose weights apply (default: current)
+    
+    Returns:
+        Privacy score (0-100)
+    """
+    state = state or _engine_state
+    state.sync_codes()
+    weights = state.weight_by_code
+    total_score = 0
+    for entity in entities:
+        total_score += weights[entity.type_code] * entity.score
+    return min(int(total_score), 100)
+
+
+def collect_spans(text: str, language: str, route: str, state: Optional[EngineState] = None,
+                  entities: Optional[Set[str]] = None) -> List[EntitySpan]:
+    """
+    Detection stage: run the recognizers and return raw, unresolved spans
+    
+    Overlapping spans are left in place; finalize_analysis resolves them. The
+    parallel mode runs this stage per chunk in worker processes.
+    
+    Args:
+        text: Input text (or one chunk of it)
+        language: Language to analyze as (already resolved, not "auto")
+        route: Pre-filter route (full or patterns)
+        state: Engine state to use (default: current)
+        entities: Optional set of entity types to restrict detection to
+    
+    Returns:
+        List of entity spans
+    """
+    state = state or _engine_state
+    wanted = PROFILE_ENTITIES
+    if entities is not None:
+        wanted = sorted(entities if PROFILE_ENTITIES is None else entities.intersection(PROFILE_ENTITIES))
+    
+    # Step 1: Analyze with Presidio (full NLP + patterns, or patterns only)
+    if route == ROUTE_PATTERNS:
+        analyzer_results = run_pattern_recognizers(text, only=entities, state=state)
+    elif language != DEFAULT_LANGUAGE and language_engines.get(language) is not None:
+        # Language-agnostic patterns run once, NLP runs on the language's own model
+        only = LANGUAGE_AGNOSTIC_ENTITIES if entities is None else LANGUAGE_AGNOSTIC_ENTITIES & entities
+        analyzer_results = run_pattern_recognizers(text, only=only, state=state)
+        analyzer_results.extend(language_engines.get(language).analyze(
+            text=text,
+            language=language,
+            entities=wanted
+        ))
+    else:
+        analyzer_results = state.analyzer.analyze(
+            text=text,
+            language=DEFAULT_LANGUAGE,
+            entities=wanted  # None detects all entity types
+        )
+    if entities is not None:
+        # Multi-entity recognizers (e.g. the gazetteer) may return other types
+        analyzer_results = [result for result in analyzer_results if result.entity_type in entities]
+    
+    # Step 2: Convert to compact spans
+    spans = [
+        EntitySpan(intern_entity_type(result.entity_type), result.start, result.end, round(result.score, 2))
+        for result in analyzer_results
+    ]
     
     # Step 2.1: Add contextual names that might have been missed
-    contextual_names = detect_contextual_names(text, entities)
-    entities.extend(contextual_names)
+    if entities is None or "PERSON" in entities:
+        spans.extend(detect_contextual_names(text, spans))
+    return spans
+
+
+def finalize_analysis(text: str, entities: List[EntitySpan], route: str, language: str,
+                      state: Optional[EngineState] = None, vault=None) -> Dict:
+    """
+    Resolution stage: resolve conflicts, merge locations, redact and score
+    
+    Always runs over the whole document, so entities found in different
+    chunks are resolved against each other.
+    
+    Args:
+        text: Full input text
+        entities: Raw spans from collect_spans (document offsets)
+        route: Pre-filter route taken
+        language: Language the text was analyzed as
+        state: Engine state to use (default: current)
+        vault: Optional pseudonymizer.TokenVault for reversible tokens
+    
+    Returns:
+        The analyze_text result dict
+    """
+    state = state or _engine_state
     
     # Step 2.5: Resolve conflicts (prioritize PERSON over LOCATION)
-    entities = resolve_entity_conflicts(entities)
+    entities = resolve_entity_conflicts(entities, state)
     
     # Step 3: Merge adjacent locations into single addresses
     entities = merge_adjacent_locations(entities, text)
     
-    # Step 4: Convert entities back to RecognizerResult for anonymizer
-    from presidio_analyzer import RecognizerResult
-    updated_results = []
-    for entity in entities:
-        result = RecognizerResult(
-            entity_type=entity["entity_type"],
-            start=entity["start"],
-            end=entity["end"],
-            score=entity["score"]
-        )
-        updated_results.append(result)
-    
-    # Step 5: Anonymize/Redact the text using updated results
-    anonymized_result = anonymizer.anonymize(
-        text=text,
-        analyzer_results=updated_results,
-        operators={
-            "DEFAULT": OperatorConfig("replace", {"new_value": "[{entity_type}]"}),
-            "PERSON": OperatorConfig("replace", {"new_value": "[PERSON]"}),
-            "EMAIL_ADDRESS": OperatorConfig("replace", {"new_value": "[EMAIL]"}),
-            "PHONE_NUMBER": OperatorConfig("replace", {"new_value": "[PHONE]"}),
-            "CREDIT_CARD": OperatorConfig("replace", {"new_value": "[CREDIT_CARD]"}),
-            "LOCATION": OperatorConfig("replace", {"new_value": "[LOCATION]"}),
-            "DATE_TIME": OperatorConfig("replace", {"new_value": "[DATE]"}),
-            "IP_ADDRESS": OperatorConfig("replace", {"new_value": "[IP_ADDRESS]"}),
-            "URL": OperatorConfig("replace", {"new_value": "[URL]"}),
-            # Indian PII redactions
-            "IN_AADHAAR": OperatorConfig("replace", {"new_value": "[AADHAAR]"}),
-            "IN_PAN": OperatorConfig("replace", {"new_value": "[PAN]"}),
-            "IN_PASSPORT": OperatorConfig("replace", {"new_value": "[PASSPORT]"}),
-            "IN_VOTER_ID": OperatorConfig("replace", {"new_value": "[VOTER_ID]"}),
-            "IN_VEHICLE_REGISTRATION": OperatorConfig("replace", {"new_value": "[VEHICLE_REG]"}),
-            # Professional Information
-            "OCCUPATION": OperatorConfig("replace", {"new_value": "[OCCUPATION]"}),
-            "ORGANIZATION": OperatorConfig("replace", {"new_value": "[ORGANIZATION]"}),
-        }
-    )
-    
-    # Step 6: Post-process redacted text to merge adjacent [LOCATION] tags and clean up
-    redacted_text = anonymized_result.text
+    # Step 4: Redact the text directly from the spans
+    redacted_text = redact_spans(text, entities, vault, state)
     
+    # Step 5: Post-process redacted text to merge adjacent [LOCATION] tags and clean up
     # Replace multiple adjacent [LOCATION] tags with single [LOCATION]
     redacted_text = re.sub(r'(\[LOCATION\]\s*,?\s*)+', '[LOCATION] ', redacted_text)
     redacted_text = re.sub(r'\[LOCATION\]\s+\[LOCATION\]', '[LOCATION]', redacted_text)
@@ -474,12 +623,78 @@ def analyze_text(text: str, language: str = "en") -> Dict:
     # Clean up extra spaces
     redacted_text = re.sub(r'\s+', ' ', redacted_text).strip()
     
+    # Step 6: Convert to the public entity shape only at the boundary
     return {
-        "entities": entities,
-        "redacted_text": redacted_text
+        "entities": [entity.to_dict(text) for entity in entities],
+        "redacted_text": redacted_text,
+        "privacy_score": score_spans(entities, state),
+        "route": route,
+        "language": language,
+        "config_version": state.config_version
     }
 
 
+@profiled("analyze_text")
+def analyze_text(text: str, language: str = "en", vault=None, force_route: Optional[str] = None,
+                 entities: Optional[Set[str]] = None) -> Dict:
+    """
+    Analyze text for PII entities and return redacted version
+    Enhanced with custom recognizers for plain phone numbers
+    Texts of PARALLEL_MIN_CHARS or more are split across worker processes
+    
+    Args:
+        text: Input text to analyze
+        language: Language code (default: "en"), or "auto" to detect it
+        vault: Optional pseudonymizer.TokenVault for reversible tokens
+        force_route: Skip the pre-screen and take this route (e.g., ROUTE_PATTERNS
+            for the degraded path under admission control)
+        entities: Optional set of entity types to restrict detection to
+    
+    Returns:
+        Dict containing:
+            - entities: List of detected entities
+            - redacted_text: Text with PII replaced by placeholders
+            - privacy_score: Privacy risk score (0-100)
+            - route: Pre-filter path taken (full, patterns or skip)
+            - language: Language the text was analyzed as
+            - config_version: Recognizer config version used
+    """
+    # Capture the engine state once so a concurrent reload can't mix versions
+    state = _engine_state
+    
+    if language == "auto":
+        language = detect_language(text)
+    if language != DEFAULT_LANGUAGE and language_engines.get(language) is None:
+        language = DEFAULT_LANGUAGE  # No model for this language
+    
+    # Step 0: Cheap pre-screen decides whether the text needs the NLP parse
+    route = force_route or screen_text(text)
+    if route == ROUTE_SKIP:
+        return {
+            "entities": [],
+            "redacted_text": re.sub(r'\s+', ' ', text).strip(),
+            "privacy_score": 0,
+            "route": route,
+            "language": language,
+            "config_version": state.config_version
+        }
+    
+    # Steps 1-2: Detection, on the worker processes for long documents
+    spans = None
+    if route != ROUTE_PATTERNS and parallel_enabled(text):
+        chunk_entities = analyze_chunks_parallel(text, language, route, state.config_version, entities)
+        if chunk_entities is not None:
+            spans = [
+                EntitySpan(intern_entity_type(entity_type), start, end, score)
+                for entity_type, start, end, score in chunk_entities
+            ]
+    if spans is None:
+        spans = collect_spans(text, language, route, state, entities)
+    
+    # Steps 2.5-6: Resolve, merge, redact and score over the whole text
+    return finalize_analysis(text, spans, route, language, state, vault)
+
+
 def calculate_privacy_score(entities: List[Dict]) -> int:
     """
     Calculate privacy score based on detected entities
@@ -496,6 +711,7 @@ def calculate_privacy_score(entities: List[Dict]) -> int:
     if not entities or len(entities) == 0:
         return 0
     
+    state = _engine_state
     total_score = 0
     
     for entity in entities:
@@ -503,7 +719,7 @@ def calculate_privacy_score(entities: List[Dict]) -> int:
         confidence = entity.get("score", 0.8)
         
         # Get weight for this entity type (default to 10)
-        weight = ENTITY_WEIGHTS.get(entity_type, 10)
+        weight = state.entity_weights.get(entity_type, state.default_weight)
         
         # Add weighted score
         total_score += weight * confidence
@@ -519,4 +735,4 @@ def get_supported_entities() -> List[str]:
     Returns:
         List of entity type names
     """
-    return list(ENTITY_WEIGHTS.keys())
+    return list(_engine_state.entity_weights.keys())
@@ -0,0 +1,417 @@
+"""
+Profiling - On-demand CPU and allocation profiling of live traffic
+An admin starts a session for a time window and a sampled fraction of calls;
+functions wrapped with @profiled (analyze_text, the LLM clients) are then
+measured with either a statistical stack sampler or cProfile, optionally with
+tracemalloc. When no session is active the wrapper costs one attribute check
+Output per session in PROFILE_OUTPUT_DIR/<session_id>/:
+- stacks.collapsed: folded stacks for flamegraph.pl / speedscope (sample mode)
+- cprofile.pstats, cprofile.txt: merged cProfile stats (cprofile mode)
+- allocations.txt: top allocations and growth since the session started
+- summary.json: per-function call counts, latency and allocation deltas
+"""
+import asyncio
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", "profiles")
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "300"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "25"))
+PROFILE_TOP_ALLOCATIONS = int(os.getenv("PROFILE_TOP_ALLOCATIONS", "30"))
+
+MODE_SAMPLE = "sample"
+MODE_CPROFILE = "cprofile"
+PROFILE_MODES = (MODE_SAMPLE, MODE_CPROFILE)
+
+# Root frame for event loop samples taken while async calls are in flight
+EVENT_LOOP_LABEL = "event_loop"
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    # ';' separates frames in the collapsed format
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of values, fraction in [0, 1] (0.0 when empty)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ProfileSession:
+    """One profiling window and the data collected during it"""
+
+    def __init__(self, mode: str, duration_s: float, sample_rate: float, trace_allocations: bool):
+        self.id = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+        self.mode = mode
+        self.duration_s = duration_s
+        self.sample_rate = sample_rate
+        self.trace_allocations = trace_allocations
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+        # thread id -> label of the sampled call running on it
+        self.scopes: Dict[int, str] = {}
+        self.async_in_flight = 0
+        self.loop_thread_id: Optional[int] = None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.profiles: List[cProfile.Profile] = []
+        self.calls: Counter = Counter()
+        self.sampled_calls: Counter = Counter()
+        self.skipped_busy = 0
+        self.latencies_ms: Dict[str, List[float]] = defaultdict(list)
+        self.alloc_bytes: Dict[str, int] = defaultdict(int)
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.owns_tracemalloc = False
+        self.stopping = False
+        self.stop_event = threading.Event()
+        self.sampler: Optional[threading.Thread] = None
+        self.timer: Optional[threading.Timer] = None
+
+    def sample_stacks(self):
+        """Sampler thread: fold the stack of every thread inside a sampled call"""
+        interval = PROFILE_SAMPLE_INTERVAL_MS / 1000
+        own_id = threading.get_ident()
+        while not self.stop_event.wait(interval):
+            with self.lock:
+                scopes = dict(self.scopes)
+                if self.async_in_flight and self.loop_thread_id is not None:
+                    scopes.setdefault(self.loop_thread_id, EVENT_LOOP_LABEL)
+            if not scopes:
+                continue
+            frames = sys._current_frames()
+            for thread_id, label in scopes.items():
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own_id:
+                    continue
+                names = []
+                while frame is not None:
+                    names.append(_frame_name(frame))
+                    frame = frame.f_back
+                names.append(label)
+                self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+
+class Profiler:
+    """Process-wide profiler; at most one session at a time"""
+
+    def __init__(self):
+        # Checked on every wrapped call - keep it a plain attribute
+        self.active = False
+        self.session: Optional[ProfileSession] = None
+        self._lock = threading.Lock()
+        self._last_report: Optional[Dict] = None
+
+    def start(self, mode: str = MODE_SAMPLE, duration_s: float = 60, sample_rate: float = 1.0,
+              trace_allocations: bool = False) -> Dict:
+        """
+        Start a profiling session
+
+        Args:
+            mode: "sample" (statistical stack sampling) or "cprofile"
+            duration_s: Window after which the session stops and is written out
+            sample_rate: Fraction of wrapped calls to profile (0-1]
+            trace_allocations: Also run tracemalloc during the session
+
+        Returns:
+            Session description
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}' (expected one of {', '.join(PROFILE_MODES)})")
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+        if not 0 < duration_s <= PROFILE_MAX_SECONDS:
+            raise ValueError(f"duration_s must be in (0, {PROFILE_MAX_SECONDS:g}]")
+
+        with self._lock:
+            if self.session is not None:
+                raise RuntimeError(f"Profiling session {self.session.id} is already running")
+            session = ProfileSession(mode, duration_s, sample_rate, trace_allocations)
+            if trace_allocations:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+                    session.owns_tracemalloc = True
+                session.baseline = tracemalloc.take_snapshot()
+            if mode == MODE_SAMPLE:
+                session.sampler = threading.Thread(target=session.sample_stacks, name="profile-sampler", daemon=True)
+                session.sampler.start()
+            session.timer = threading.Timer(duration_s, self.stop)
+            session.timer.daemon = True
+            session.timer.start()
+            self.session = session
+            self.active = True
+
+        print(f"Profiling session {session.id} started ({mode}, {duration_s:g}s, rate {sample_rate:g})")
+        return self._describe(session)
+
+    def stop(self) -> Optional[Dict]:
+        """Stop the running session and write its reports; returns the report summary"""
+        with self._lock:
+            session = self.session
+            if session is None or session.stopping:
+                return None
+            session.stopping = True
+            self.active = False
+
+        session.timer.cancel()
+        session.stop_event.set()
+        if session.sampler is not None:
+            session.sampler.join()
+        try:
+            report = self._write_reports(session)
+        finally:
+            # Only now can a new session start (and restart tracemalloc)
+            with self._lock:
+                self.session = None
+        self._last_report = report
+        print(f"Profiling session {session.id} written to {report['output_dir']}")
+        return report
+
+    def status(self) -> Dict:
+        session = self.session
+        return {
+            "active": self.active,
+            "session": self._describe(session) if session else None,
+            "last_report": self._last_report,
+        }
+
+    @staticmethod
+    def _describe(session: ProfileSession) -> Dict:
+        return {
+            "id": session.id,
+            "mode": session.mode,
+            "duration_s": session.duration_s,
+            "sample_rate": session.sample_rate,
+            "trace_allocations": session.trace_allocations,
+            "elapsed_s": round(time.time() - session.started_at, 2),
+            "calls": dict(session.calls),
+            "sampled_calls": dict(session.sampled_calls),
+        }
+
+    def _enter(self, label: str) -> Optional[ProfileSession]:
+        """Decide whether this call is sampled; returns the session if so"""
+        session = self.session
+        if session is None:
+            return None
+        session.calls[label] += 1
+        if session.sample_rate < 1 and random.random() >= session.sample_rate:
+            return None
+        session.sampled_calls[label] += 1
+        return session
+
+    @staticmethod
+    def _record(session: ProfileSession, label: str, started: float, allocated_before: int):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with session.lock:
+            session.latencies_ms[label].append(elapsed_ms)
+            if session.trace_allocations and tracemalloc.is_tracing():
+                # Process-wide counter: concurrent calls blur each other's deltas
+                session.alloc_bytes[label] += tracemalloc.get_traced_memory()[0] - allocated_before
+
+    def call(self, label: str, func, args, kwargs):
+        """Run a sync function, profiling it if this call is sampled"""
+        session = self._enter(label)
+        if session is None:
+            return func(*args, **kwargs)
+
+        thread_id = threading.get_ident()
+        profile = None
+        with session.lock:
+            nested = thread_id in session.scopes
+            if not nested:
+                session.scopes[thread_id] = label
+        if session.mode == MODE_CPROFILE and not nested and sys.getprofile() is None:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is active (e.g. a debugger)
+                profile = None
+                session.skipped_busy += 1
+        allocated_before = tracemalloc.get_traced_memory()[0] if session.trace_allocations else 0
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+            self._record(session, label, started, allocated_before)
+            with session.lock:
+                if profile is not None:
+                    session.profiles.append(profile)
+                if not nested:
+                    session.scopes.pop(thread_id, None)
+
+    async def call_async(self, label: str, func, args, kwargs):
+        """Run a coroutine function, timing it and sampling the event loop while it runs"""
+        session = self._enter(label)
+        if session is None:
+            return await func(*args, **kwargs)
+
+        with session.lock:
+            session.async_in_flight += 1
+            session.loop_thread_id = threading.get_ident()
+        allocated_before = tracemalloc.get_traced_memory()[0] if session.trace_allocations else 0
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            self._record(session, label, started, allocated_before)
+            with session.lock:
+                session.async_in_flight -= 1
+
+    async def iterate_async(self, label: str, func, args, kwargs):
+        """Run an async generator, timing it from first call to exhaustion"""
+        session = self._enter(label)
+        if session is None:
+            async for item in func(*args, **kwargs):
+                yield item
+            return
+
+        with session.lock:
+            session.async_in_flight += 1
+            session.loop_thread_id = threading.get_ident()
+        allocated_before = tracemalloc.get_traced_memory()[0] if session.trace_allocations else 0
+        started = time.perf_counter()
+        try:
+            async for item in func(*args, **kwargs):
+                yield item
+        finally:
+            self._record(session, label, started, allocated_before)
+            with session.lock:
+                session.async_in_flight -= 1
+
+    def _write_reports(self, session: ProfileSession) -> Dict:
+        output_dir = os.path.join(PROFILE_OUTPUT_DIR, session.id)
+        os.makedirs(output_dir, exist_ok=True)
+        files = []
+
+        if session.stacks:
+            path = os.path.join(output_dir, "stacks.collapsed")
+            with open(path, "w") as f:
+                for stack, count in session.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            files.append(path)
+
+        with session.lock:
+            profiles = list(session.profiles)
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            path = os.path.join(output_dir, "cprofile.pstats")
+            stats.dump_stats(path)
+            files.append(path)
+            text = io.StringIO()
+            pstats.Stats(path, stream=text).sort_stats("cumulative").print_stats(60)
+            path = os.path.join(output_dir, "cprofile.txt")
+            with open(path, "w") as f:
+                f.write(text.getvalue())
+            files.append(path)
+
+        if session.trace_allocations and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            if session.owns_tracemalloc:
+                tracemalloc.stop()
+            path = os.path.join(output_dir, "allocations.txt")
+            with open(path, "w") as f:
+                f.write(f"Top {PROFILE_TOP_ALLOCATIONS} allocation sites (live at session end)\n")
+                for stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]:
+                    f.write(f"{stat}\n")
+                if session.baseline is not None:
+                    f.write(f"\nTop {PROFILE_TOP_ALLOCATIONS} growth since session start\n")
+                    for stat in snapshot.compare_to(session.baseline, "lineno")[:PROFILE_TOP_ALLOCATIONS]:
+                        f.write(f"{stat}\n")
+                f.write(f"\nTop {min(10, PROFILE_TOP_ALLOCATIONS)} allocation tracebacks\n")
+                for stat in snapshot.statistics("traceback")[:min(10, PROFILE_TOP_ALLOCATIONS)]:
+                    f.write(f"\n{stat.count} blocks, {stat.size / 1024:.1f} KiB\n")
+                    for line in stat.traceback.format():
+                        f.write(f"{line}\n")
+            files.append(path)
+
+        functions = {}
+        with session.lock:
+            # Calls that started before the stop may still be finishing
+            latencies_ms = {label: list(latencies) for label, latencies in session.latencies_ms.items()}
+        for label, latencies in latencies_ms.items():
+            functions[label] = {
+                "calls": session.calls[label],
+                "sampled_calls": session.sampled_calls[label],
+                "mean_ms": round(sum(latencies) / len(latencies), 2),
+                "p50_ms": round(percentile(latencies, 0.50), 2),
+                "p95_ms": round(percentile(latencies, 0.95), 2),
+                "max_ms": round(max(latencies), 2),
+            }
+            if session.trace_allocations:
+                functions[label]["allocated_bytes"] = session.alloc_bytes[label]
+
+        summary = {
+            **self._describe(session),
+            "stopped_at": time.time(),
+            "stack_samples": session.samples,
+            "skipped_busy": session.skipped_busy,
+            "functions": functions,
+        }
+        path = os.path.join(output_dir, "summary.json")
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+        files.append(path)
+
+        return {"id": session.id, "output_dir": output_dir, "files": files, "functions": functions}
+
+
+profiler = Profiler()
+
+
+def profiled(label: str):
+    """
+    Make a function profileable by label
+
+    Works on plain functions, coroutine functions and async generators; when
+    no session is active the call goes straight through.
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not profiler.active:
+                    return await func(*args, **kwargs)
+                return await profiler.call_async(label, func, args, kwargs)
+            return async_wrapper
+
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if not profiler.active:
+                    return func(*args, **kwargs)
+                return profiler.iterate_async(label, func, args, kwargs)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.active:
+                return func(*args, **kwargs)
+            return profiler.call(label, func, args, kwargs)
+        return wrapper
+    return decorator
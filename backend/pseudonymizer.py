@@ -0,0 +1,253 @@
+"""
+Pseudonymizer - Reversible per-session tokens for LLM round-trips
+Replaces entities with consistent tokens like [PERSON_1] and maps LLM output back
+IMPORTANT: The vault holds raw PII; it never leaves the server and is only
+spilled to disk encrypted
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from conversation_store import CONVERSATION_MAX, CONVERSATION_TTL_SECONDS
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # Optional dependency, only needed for the SQLite spill
+    Fernet = None
+    InvalidToken = Exception
+
+# A vault must outlive the stored history whose tokens it resolves, so by
+# default it follows the conversation store's capacity and TTL
+VAULT_MAX_SESSIONS = int(os.getenv("VAULT_MAX_SESSIONS", str(CONVERSATION_MAX)))
+VAULT_TTL_SECONDS = int(os.getenv("VAULT_TTL_SECONDS", str(CONVERSATION_TTL_SECONDS)))
+VAULT_SPILL_PATH = os.getenv("VAULT_SPILL_PATH", "")
+VAULT_ENCRYPTION_KEY = os.getenv("VAULT_ENCRYPTION_KEY", "")
+
+# Longest token we ever emit, e.g. [IN_VEHICLE_REGISTRATION_12345]
+MAX_TOKEN_LENGTH = 48
+TOKEN_PATTERN = re.compile(r"\[([A-Z][A-Z_]*_\d+)\]")
+
+
+def _normalize(value: str) -> str:
+    return " ".join(value.split()).casefold()
+
+
+class TokenVault:
+    """Session-scoped two-way mapping between original values and tokens"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.updated = time.time()
+        self._forward: Dict[str, str] = {}
+        self._reverse: Dict[str, str] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def tokenize(self, label: str, original: str) -> str:
+        """
+        Get the token for a value, creating a new one the first time it is seen
+
+        Args:
+            label: Placeholder base without brackets (e.g., "PERSON", "EMAIL")
+            original: Original entity text
+
+        Returns:
+            Token such as "[PERSON_1]"
+        """
+        key = f"{label}\x00{_normalize(original)}"
+        with self._lock:
+            token = self._forward.get(key)
+            if token is None:
+                number = self._counters.get(label, 0) + 1
+                self._counters[label] = number
+                token = f"[{label}_{number}]"
+                self._forward[key] = token
+                self._reverse[token] = original
+            self.updated = time.time()
+            return token
+
+    def lookup(self, token: str) -> Optional[str]:
+        """Get the original value for a token such as "[PERSON_1]" """
+        return self._reverse.get(token)
+
+    def detokenize(self, text: str) -> str:
+        """Replace every known token in a complete text"""
+        return TOKEN_PATTERN.sub(lambda m: self._reverse.get(m.group(0), m.group(0)), text)
+
+    def turn(self) -> "VaultTurn":
+        """Start a chat turn that only maps back the tokens it issues"""
+        return VaultTurn(self)
+
+    def __len__(self) -> int:
+        return len(self._reverse)
+
+    def to_json(self) -> str:
+        with self._lock:
+            return json.dumps({
+                "forward": self._forward,
+                "reverse": self._reverse,
+                "counters": self._counters,
+            })
+
+    @classmethod
+    def from_json(cls, session_id: str, data: str) -> "TokenVault":
+        state = json.loads(data)
+        vault = cls(session_id)
+        vault._forward = state["forward"]
+        vault._reverse = state["reverse"]
+        vault._counters = state["counters"]
+        return vault
+
+
+class VaultTurn:
+    """
+    One request's view of a session vault
+
+    Tokenizes through the vault but only maps back the tokens issued in this
+    turn, so a token the client typed (or one from an older turn that the
+    model repeats) never reveals a stored value.
+    """
+
+    def __init__(self, vault: TokenVault):
+        self.vault = vault
+        self.issued: Set[str] = set()
+
+    def tokenize(self, label: str, original: str) -> str:
+        token = self.vault.tokenize(label, original)
+        self.issued.add(token)
+        return token
+
+    def detokenize(self, text: str) -> str:
+        """Replace the tokens issued in this turn"""
+        def replace(match):
+            token = match.group(0)
+            if token not in self.issued:
+                return token
+            original = self.vault.lookup(token)
+            return original if original is not None else token
+        return TOKEN_PATTERN.sub(replace, text)
+
+
+class StreamingDetokenizer:
+    """
+    Replace tokens in streamed LLM output as chunks arrive
+
+    Only a possible partial token at the end of a chunk (an unclosed "[" no
+    longer than a token can be) is held back until the next chunk.
+    """
+
+    def __init__(self, vault):
+        self.vault = vault  # TokenVault or VaultTurn
+        self._pending = ""
+
+    def feed(self, chunk: str) -> str:
+        text = self._pending + chunk
+        self._pending = ""
+        open_index = text.rfind("[")
+        if open_index != -1 and "]" not in text[open_index:] and len(text) - open_index < MAX_TOKEN_LENGTH:
+            self._pending = text[open_index:]
+            text = text[:open_index]
+        return self.vault.detokenize(text)
+
+    def flush(self) -> str:
+        text, self._pending = self._pending, ""
+        return self.vault.detokenize(text)
+
+
+class _EncryptedSpill:
+    """SQLite table of Fernet-encrypted vaults evicted from memory"""
+
+    def __init__(self, path: str, key: str):
+        self._fernet = Fernet(key.encode())
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vaults (session_id TEXT PRIMARY KEY, updated REAL, data BLOB)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_vaults_updated ON vaults(updated)")
+        self._conn.commit()
+
+    def save(self, vault: TokenVault):
+        data = self._fernet.encrypt(vault.to_json().encode())
+        self._conn.execute(
+            "INSERT OR REPLACE INTO vaults (session_id, updated, data) VALUES (?, ?, ?)",
+            (vault.session_id, vault.updated, data))
+        self._conn.commit()
+
+    def load(self, session_id: str, ttl_seconds: int) -> Optional[TokenVault]:
+        row = self._conn.execute(
+            "SELECT updated, data FROM vaults WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("DELETE FROM vaults WHERE session_id = ?", (session_id,))
+        self._conn.execute("DELETE FROM vaults WHERE updated < ?", (time.time() - ttl_seconds,))
+        self._conn.commit()
+        if time.time() - row[0] > ttl_seconds:
+            return None
+        try:
+            return TokenVault.from_json(session_id, self._fernet.decrypt(row[1]).decode())
+        except InvalidToken:
+            print(f"Could not decrypt spilled vault for session {session_id}")
+            return None
+
+    def delete(self, session_id: str):
+        self._conn.execute("DELETE FROM vaults WHERE session_id = ?", (session_id,))
+        self._conn.commit()
+
+
+class VaultRegistry:
+    """In-memory LRU of session vaults with an optional encrypted SQLite spill"""
+
+    def __init__(self, max_sessions: int = VAULT_MAX_SESSIONS, ttl_seconds: int = VAULT_TTL_SECONDS,
+                 spill_path: str = VAULT_SPILL_PATH, encryption_key: str = VAULT_ENCRYPTION_KEY):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._vaults: "OrderedDict[str, TokenVault]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._spill = None
+        if spill_path:
+            if Fernet is None or not encryption_key:
+                print("Vault spill disabled: requires the cryptography package and VAULT_ENCRYPTION_KEY")
+            else:
+                self._spill = _EncryptedSpill(spill_path, encryption_key)
+
+    def get(self, session_id: str) -> TokenVault:
+        """Get (or create) the vault for a session"""
+        now = time.time()
+        with self._lock:
+            vault = self._vaults.pop(session_id, None)
+            if vault is not None and now - vault.updated > self.ttl_seconds:
+                vault = None
+            if vault is None and self._spill is not None:
+                vault = self._spill.load(session_id, self.ttl_seconds)
+            if vault is None:
+                vault = TokenVault(session_id)
+            # Reading counts as activity: the vault expires TTL seconds after the last turn
+            vault.updated = now
+            self._vaults[session_id] = vault
+
+            while len(self._vaults) > self.max_sessions:
+                _, evicted = self._vaults.popitem(last=False)
+                if self._spill is not None and now - evicted.updated <= self.ttl_seconds:
+                    self._spill.save(evicted)
+            return vault
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._vaults.pop(session_id, None)
+            if self._spill is not None:
+                self._spill.delete(session_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "sessions": len(self._vaults),
+                "tokens": sum(len(vault) for vault in self._vaults.values()),
+                "spill_enabled": self._spill is not None,
+            }
+
+
+vaults = VaultRegistry()
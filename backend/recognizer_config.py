@@ -0,0 +1,84 @@
+"""
+Recognizer Config - Versioned recognizer patterns, weights, priorities and labels
+Loaded from config/recognizers.json so they can change without a redeploy
+(see privacy_engine.reload_engine and POST /admin/reload)
+"""
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List
+
+from presidio_analyzer import Pattern, PatternRecognizer
+
+RECOGNIZER_CONFIG_PATH = os.getenv(
+    "RECOGNIZER_CONFIG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "config", "recognizers.json")
+)
+
+REQUIRED_KEYS = ("version", "pattern_recognizers", "entity_weights", "entity_priority", "redaction_labels")
+
+
+def load_recognizer_config(path: str = RECOGNIZER_CONFIG_PATH) -> Dict:
+    """
+    Load and validate a recognizer config file
+
+    Args:
+        path: Path to the JSON config
+
+    Returns:
+        Config dict with a "digest" of the file contents added
+
+    Raises:
+        ValueError: The file is not valid JSON or fails validation
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        config = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in {path}: {str(e)}")
+
+    missing = [key for key in REQUIRED_KEYS if key not in config]
+    if missing:
+        raise ValueError(f"Recognizer config is missing: {', '.join(missing)}")
+
+    names = set()
+    for recognizer in config["pattern_recognizers"]:
+        name = recognizer.get("name")
+        if not name or not recognizer.get("entity") or not recognizer.get("patterns"):
+            raise ValueError(f"Recognizer {name or '?'} needs a name, an entity and patterns")
+        if name in names:
+            raise ValueError(f"Duplicate recognizer name: {name}")
+        names.add(name)
+        for pattern in recognizer["patterns"]:
+            try:
+                re.compile(pattern["regex"])
+            except (KeyError, re.error) as e:
+                raise ValueError(f"Bad regex in {name}/{pattern.get('name')}: {str(e)}")
+            score = pattern.get("score")
+            if isinstance(score, bool) or not isinstance(score, (int, float)) or not 0 <= score <= 1:
+                raise ValueError(f"Score of {name}/{pattern.get('name')} must be a number between 0 and 1")
+
+    for label in config["redaction_labels"].values():
+        if not (label.startswith("[") and label.endswith("]")):
+            raise ValueError(f"Redaction label {label} must be bracketed")
+
+    config["digest"] = hashlib.sha256(raw).hexdigest()
+    return config
+
+
+def build_pattern_recognizers(config: Dict, language: str = "en") -> List[PatternRecognizer]:
+    """Create the PatternRecognizers described by a loaded config, in file order"""
+    return [
+        PatternRecognizer(
+            supported_entity=recognizer["entity"],
+            name=recognizer["name"],
+            supported_language=language,
+            patterns=[
+                Pattern(name=pattern["name"], regex=pattern["regex"], score=pattern["score"])
+                for pattern in recognizer["patterns"]
+            ],
+        )
+        for recognizer in config["pattern_recognizers"]
+    ]
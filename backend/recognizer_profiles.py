@@ -0,0 +1,200 @@
+"""
+Recognizer Profiles - Deployment-level recognizer pruning and profiling
+Builds a pruned registry at startup and measures per-recognizer cost and hit rate
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+# Entity types kept by each deployment profile ("full" keeps every recognizer)
+RECOGNIZER_PROFILES: Dict[str, Optional[Set[str]]] = {
+    "full": None,
+    "india": {
+        "PERSON", "LOCATION", "NRP", "DATE_TIME",
+        "EMAIL_ADDRESS", "PHONE_NUMBER", "CREDIT_CARD", "IP_ADDRESS", "URL",
+        "IN_AADHAAR", "IN_PAN", "IN_PASSPORT", "IN_VOTER_ID", "IN_VEHICLE_REGISTRATION",
+        "OCCUPATION", "ORGANIZATION",
+    },
+    "us": {
+        "PERSON", "LOCATION", "NRP", "DATE_TIME",
+        "EMAIL_ADDRESS", "PHONE_NUMBER", "CREDIT_CARD", "IP_ADDRESS", "URL",
+        "US_SSN", "US_ITIN", "US_DRIVER_LICENSE", "US_PASSPORT", "US_BANK_NUMBER",
+        "MEDICAL_LICENSE", "OCCUPATION", "ORGANIZATION",
+    },
+    "minimal": {
+        "PERSON", "LOCATION", "EMAIL_ADDRESS", "PHONE_NUMBER", "CREDIT_CARD",
+    },
+}
+
+RECOGNIZER_PROFILE = os.getenv("RECOGNIZER_PROFILE", "full").lower()
+RECOGNIZER_PROFILING = os.getenv("RECOGNIZER_PROFILING", "false").lower() == "true"
+
+# A recognizer is recommended for removal once it has run this many times
+# with a hit rate below the threshold
+PROFILING_MIN_CALLS = int(os.getenv("PROFILING_MIN_CALLS", "200"))
+PROFILING_MIN_HIT_RATE = float(os.getenv("PROFILING_MIN_HIT_RATE", "0.001"))
+
+
+def get_profile_entities(profile: str) -> Optional[List[str]]:
+    """
+    Get the entity types a deployment profile keeps
+
+    Args:
+        profile: Profile name (full, india, us, minimal)
+
+    Returns:
+        Sorted list of entity types, or None to keep everything
+    """
+    if profile not in RECOGNIZER_PROFILES:
+        print(f"Unknown recognizer profile '{profile}', using 'full'")
+        return None
+    entities = RECOGNIZER_PROFILES[profile]
+    return sorted(entities) if entities is not None else None
+
+
+def prune_registry(registry, profile: str) -> List[str]:
+    """
+    Remove recognizers that detect none of the profile's entity types
+
+    Args:
+        registry: Presidio RecognizerRegistry
+        profile: Profile name (full, india, us, minimal)
+
+    Returns:
+        Names of the removed recognizers
+    """
+    keep = get_profile_entities(profile)
+    if keep is None:
+        return []
+
+    keep = set(keep)
+    kept, removed = [], []
+    for recognizer in registry.recognizers:
+        if keep.intersection(recognizer.supported_entities):
+            kept.append(recognizer)
+        else:
+            removed.append(recognizer.name)
+    registry.recognizers = kept
+    return removed
+
+
+class RecognizerProfiler:
+    """Accumulates per-recognizer call counts, wall time and hits"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict] = {}
+
+    def record(self, name: str, entities: List[str], elapsed: float, hits: int):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = {"entities": entities, "calls": 0, "texts_with_hits": 0,
+                         "hits": 0, "total_seconds": 0.0}
+                self._stats[name] = stats
+            stats["calls"] += 1
+            stats["hits"] += hits
+            stats["total_seconds"] += elapsed
+            if hits:
+                stats["texts_with_hits"] += 1
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+
+profiler = RecognizerProfiler()
+
+
+def instrument_registry(registry) -> int:
+    """
+    Wrap every recognizer's analyze() with timing and hit counting
+
+    Only called when RECOGNIZER_PROFILING is enabled, so there is no
+    overhead otherwise.
+
+    Args:
+        registry: Presidio RecognizerRegistry
+
+    Returns:
+        Number of recognizers instrumented
+    """
+    count = 0
+    for recognizer in registry.recognizers:
+        if getattr(recognizer, "_profiled", False):
+            continue
+        original = recognizer.analyze
+        name = recognizer.name
+        entities = list(recognizer.supported_entities)
+
+        def timed_analyze(*args, _original=original, _name=name, _entities=entities, **kwargs):
+            started = time.perf_counter()
+            results = _original(*args, **kwargs)
+            profiler.record(_name, _entities, time.perf_counter() - started, len(results or []))
+            return results
+
+        recognizer.analyze = timed_analyze
+        recognizer._profiled = True
+        count += 1
+    return count
+
+
+def get_recognizer_report(registry=None) -> Dict:
+    """
+    Build a cost/hit-rate report and recommend recognizers to disable
+
+    Args:
+        registry: Optional registry, used to list recognizers that never ran
+
+    Returns:
+        Dict with per-recognizer stats sorted by cost and a list of recommendations
+    """
+    stats = profiler.snapshot()
+    if registry is not None:
+        for recognizer in registry.recognizers:
+            stats.setdefault(recognizer.name, {
+                "entities": list(recognizer.supported_entities), "calls": 0,
+                "texts_with_hits": 0, "hits": 0, "total_seconds": 0.0,
+            })
+
+    total_seconds = sum(s["total_seconds"] for s in stats.values()) or 1.0
+    recognizers = []
+    recommendations = []
+    for name, s in stats.items():
+        calls = s["calls"]
+        hit_rate = s["texts_with_hits"] / calls if calls else 0.0
+        entry = {
+            "name": name,
+            "entities": s["entities"],
+            "calls": calls,
+            "hits": s["hits"],
+            "hit_rate": round(hit_rate, 5),
+            "avg_ms": round(s["total_seconds"] * 1000 / calls, 4) if calls else 0.0,
+            "cost_share": round(s["total_seconds"] / total_seconds, 4),
+        }
+        recognizers.append(entry)
+
+        if calls >= PROFILING_MIN_CALLS and hit_rate < PROFILING_MIN_HIT_RATE:
+            recommendations.append({
+                "name": name,
+                "entities": s["entities"],
+                "reason": f"hit rate {hit_rate:.4%} over {calls} calls, "
+                          f"{entry['cost_share']:.1%} of recognizer time",
+            })
+
+    recognizers.sort(key=lambda e: e["cost_share"], reverse=True)
+    recommendations.sort(key=lambda e: e["name"])
+
+    return {
+        "profile": RECOGNIZER_PROFILE,
+        "profiling_enabled": RECOGNIZER_PROFILING,
+        "min_calls": PROFILING_MIN_CALLS,
+        "min_hit_rate": PROFILING_MIN_HIT_RATE,
+        "recognizers": recognizers,
+        "recommend_disable": recommendations,
+    }
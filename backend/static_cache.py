@@ -0,0 +1,183 @@
+"""
+Static Cache - Preloaded, pre-compressed static files with ETags
+Serves public/ (including sample.json for /v1/sample) from memory with
+gzip/brotli variants, ETag/If-None-Match and Cache-Control handling.
+A file is reloaded when its modification time or size changes
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from email.utils import formatdate
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from wire_formats import quality_values
+
+try:
+    import brotli
+except ImportError:  # Optional dependency; gzip is always available
+    brotli = None
+
+STATIC_DIR = os.getenv("STATIC_DIR", "public")
+STATIC_CACHE_CONTROL = os.getenv("STATIC_CACHE_CONTROL", "public, max-age=3600")
+SAMPLE_CACHE_CONTROL = os.getenv("SAMPLE_CACHE_CONTROL", "public, max-age=60, stale-while-revalidate=600")
+# How often (seconds) a cached file's mtime is re-checked
+STATIC_CHECK_INTERVAL = float(os.getenv("STATIC_CHECK_INTERVAL", "2"))
+STATIC_MIN_COMPRESS_BYTES = int(os.getenv("STATIC_MIN_COMPRESS_BYTES", "256"))
+# Files larger than this are not held in memory (served with 404 from the cache)
+STATIC_MAX_FILE_BYTES = int(os.getenv("STATIC_MAX_FILE_BYTES", str(8 * 1024 * 1024)))
+
+
+class CachedAsset:
+    """One file with its compressed variants and validators"""
+
+    __slots__ = ("path", "mtime_ns", "size", "body", "gzip", "br", "etag", "media_type",
+                 "last_modified", "checked")
+
+    def __init__(self, path: str):
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            body = f.read()
+        self.path = path
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.body = body
+        self.gzip = None
+        self.br = None
+        if len(body) >= STATIC_MIN_COMPRESS_BYTES:
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            self.gzip = compressed if len(compressed) < len(body) else None
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                self.br = compressed if len(compressed) < len(body) else None
+        # Weak: the same validator covers the identity, gzip and brotli variants
+        self.etag = f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type in ("application/json", "application/javascript"):
+            media_type += "; charset=utf-8"
+        self.media_type = media_type
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.checked = time.monotonic()
+
+    def is_stale(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return True
+        return stat.st_mtime_ns != self.mtime_ns or stat.st_size != self.size
+
+
+class StaticCache:
+    """In-memory cache of a static directory"""
+
+    def __init__(self, directory: str = STATIC_DIR):
+        self.directory = os.path.realpath(directory)
+        self._assets: Dict[str, CachedAsset] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "not_modified": 0, "reloads": 0, "misses": 0}
+
+    def preload(self) -> int:
+        """Load every file of the directory; returns the number of files cached"""
+        count = 0
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                name = os.path.relpath(os.path.join(root, filename), self.directory).replace(os.sep, "/")
+                if self.get(name) is not None:
+                    count += 1
+        return count
+
+    def _resolve(self, name: str) -> Optional[str]:
+        """Absolute path for a file inside the directory, or None (blocks ../ traversal)"""
+        path = os.path.realpath(os.path.join(self.directory, name))
+        if not path.startswith(self.directory + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def get(self, name: str) -> Optional[CachedAsset]:
+        """
+        Get a cached file, loading or reloading it if needed
+
+        Args:
+            name: Path relative to the static directory (e.g., "sample.json")
+
+        Returns:
+            The cached asset, or None if the file doesn't exist
+        """
+        asset = self._assets.get(name)
+        now = time.monotonic()
+        if asset is not None and now - asset.checked < STATIC_CHECK_INTERVAL:
+            return asset
+
+        with self._lock:
+            asset = self._assets.get(name)
+            if asset is not None:
+                if not asset.is_stale():
+                    asset.checked = now
+                    return asset
+                self._stats["reloads"] += 1
+            path = self._resolve(name)
+            if path is None or os.path.getsize(path) > STATIC_MAX_FILE_BYTES:
+                self._assets.pop(name, None)
+                self._stats["misses"] += 1
+                return None
+            asset = CachedAsset(path)
+            self._assets[name] = asset
+            return asset
+
+    def respond(self, request: Request, asset: CachedAsset, cache_control: str = STATIC_CACHE_CONTROL) -> Response:
+        """
+        Build the response for a cached file
+
+        Returns 304 when If-None-Match matches, otherwise the smallest encoding
+        the client accepts (brotli, gzip or identity).
+        """
+        headers = {
+            "ETag": asset.etag,
+            "Cache-Control": cache_control,
+            "Last-Modified": asset.last_modified,
+            "Vary": "Accept-Encoding",
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            # Weak comparison: W/"x" matches "x" and W/"x"
+            candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in candidates or asset.etag.removeprefix("W/") in candidates:
+                self._stats["not_modified"] += 1
+                return Response(status_code=304, headers=headers)
+
+        self._stats["hits"] += 1
+        accepted = quality_values(request.headers.get("accept-encoding", ""))
+        wildcard = accepted.get("*", 0.0)
+        # Highest client q-value wins; ties go to the smaller body (br, gzip, identity).
+        # Identity only competes when the client gives it an explicit q-value
+        body = asset.body
+        best_quality = accepted.get("identity", 0.0)
+        encoding = None
+        for name, variant in (("gzip", asset.gzip), ("br", asset.br)):
+            quality = accepted.get(name, wildcard)
+            if variant is not None and quality > 0 and quality >= best_quality:
+                body, encoding, best_quality = variant, name, quality
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            return Response(status_code=200, headers=headers, media_type=asset.media_type)
+        return Response(content=body, headers=headers, media_type=asset.media_type)
+
+    def stats(self) -> Dict:
+        return {
+            **self._stats,
+            "files": len(self._assets),
+            "bytes": sum(len(asset.body) for asset in self._assets.values()),
+            "brotli": brotli is not None,
+        }
+
+
+static_cache = StaticCache()
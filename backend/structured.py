@@ -0,0 +1,342 @@
+"""
+Structured Mode - Record-aware redaction of JSON payloads and CSV rows
+Only values are analyzed (never keys), numeric fields are skipped by policy,
+and field names such as "email" or "pan" narrow detection to the relevant
+recognizers. Values are batched into one analyzer call per recognizer group
+and each value is redacted in place, so the structure is preserved and
+entities never merge across field boundaries
+"""
+import csv
+import io
+import json
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from language_engines import DEFAULT_LANGUAGE
+from prefilter import ROUTE_FULL, ROUTE_PATTERNS, ROUTE_SKIP, screen_text
+from profiling import profiled
+from privacy_engine import (
+    collect_spans,
+    get_engine_state,
+    merge_adjacent_locations,
+    redact_spans,
+    resolve_entity_conflicts,
+    score_spans,
+)
+
+# Field-name hints: whole "_"-separated words (or word sequences) of the
+# normalized field name, mapped to the entity types such a field can hold.
+# Every matching rule contributes; a name that matches none gets full detection
+FIELD_HINTS: List[Tuple[Set[str], Set[str]]] = [
+    ({"email", "e_mail", "mail_id"}, {"EMAIL_ADDRESS"}),
+    ({"phone", "mobile", "cell", "tel", "telephone", "whatsapp", "contact_no", "contact_number"},
+     {"PHONE_NUMBER"}),
+    ({"aadhaar", "aadhar", "uidai"}, {"IN_AADHAAR"}),
+    ({"pan", "pan_no", "pan_number", "pan_card"}, {"IN_PAN"}),
+    ({"passport"}, {"IN_PASSPORT", "US_PASSPORT"}),
+    ({"voter", "epic"}, {"IN_VOTER_ID"}),
+    ({"vehicle", "reg_no", "registration_no", "registration_number", "number_plate", "license_plate"},
+     {"IN_VEHICLE_REGISTRATION"}),
+    ({"ssn", "social_security"}, {"US_SSN"}),
+    ({"cc", "card_no", "card_number", "credit_card"}, {"CREDIT_CARD"}),
+    ({"iban"}, {"IBAN_CODE"}),
+    ({"ip", "ip_addr", "ip_address"}, {"IP_ADDRESS"}),
+    ({"url", "website", "link", "homepage"}, {"URL"}),
+    ({"dob", "birth", "birthday", "date"}, {"DATE_TIME"}),
+    ({"name", "surname", "fname", "lname"}, {"PERSON"}),
+    ({"address", "street", "city", "state", "zip", "zipcode", "pincode", "pin_code", "postal", "location"},
+     {"LOCATION"}),
+    ({"company", "employer", "organisation", "organization", "org"}, {"ORGANIZATION"}),
+    ({"occupation", "profession", "job", "designation", "title"}, {"OCCUPATION"}),
+]
+
+# Names made of hint words that don't hold what the words suggest ("file_name")
+AMBIGUOUS_FIELDS = {"file_name", "host_name", "user_name", "domain_name", "server_name", "table_name"}
+
+# Entity types that need the spaCy parse; other hinted groups take the patterns-only route
+NLP_ENTITIES = {"PERSON", "LOCATION", "NRP", "DATE_TIME", "ORGANIZATION"}
+
+# Fields that hold identifiers, never PII
+DEFAULT_SKIP_FIELDS = {"id", "_id", "uuid", "guid"}
+
+# Joins values batched into one analyzer call; the "|" stops regex character
+# classes like [A-Za-z\s]+ from running into the next value
+FIELD_SEPARATOR = "\n\n|\n\n"
+
+NUMERIC_VALUE = re.compile(r"^[\s+\-]*[\d.,]+\s*$")
+
+# Numeric policies: skip numbers entirely, analyze them only in hinted fields
+# (e.g. "phone": 9876543210), or analyze every number
+NUMERIC_POLICIES = ("skip", "hinted", "analyze")
+
+
+def _normalize_field(name: str) -> str:
+    name = re.sub(r"([a-z])([A-Z])", r"\1_\2", name)
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def hinted_entities(field: Optional[str]) -> Optional[Set[str]]:
+    """
+    Entity types a field name suggests
+
+    Args:
+        field: Field name (JSON key or CSV header)
+
+    Returns:
+        Set of entity types, or None if the name gives no hint
+    """
+    if not field:
+        return None
+    words = [word for word in _normalize_field(field).split("_") if word]
+    terms = set(words)
+    terms.update(word[:-1] for word in words if len(word) > 3 and word.endswith("s"))  # "emails"
+    for size in (2, 3):
+        terms.update("_".join(words[i:i + size]) for i in range(len(words) - size + 1))
+    if terms & AMBIGUOUS_FIELDS:
+        return None
+
+    hint: Set[str] = set()
+    for keywords, entities in FIELD_HINTS:
+        if terms & keywords:
+            hint |= entities
+    return hint or None
+
+
+class _Field:
+    __slots__ = ("path", "label", "value", "hint", "offset", "spans")
+
+    def __init__(self, path: Tuple, label: str, value: str, hint: Optional[Set[str]]):
+        self.path = path
+        self.label = label
+        self.value = value
+        self.hint = hint
+        self.offset = 0
+        self.spans = []
+
+
+def _format_path(path: Tuple) -> str:
+    """JSON path label such as users[0].email"""
+    parts = []
+    for key in path:
+        if isinstance(key, int):
+            parts.append(f"[{key}]")
+        else:
+            parts.append(f".{key}" if parts else str(key))
+    return "".join(parts)
+
+
+class StructuredRedactor:
+    """Collects the fields of one document, analyzes them in batches and redacts in place"""
+
+    def __init__(self, numeric_policy: str = "hinted", use_field_hints: bool = True,
+                 skip_fields: Optional[Set[str]] = None, language: str = DEFAULT_LANGUAGE,
+                 force_route: Optional[str] = None, vault=None):
+        if numeric_policy not in NUMERIC_POLICIES:
+            raise ValueError(f"numeric_policy must be one of {', '.join(NUMERIC_POLICIES)}")
+        self.numeric_policy = numeric_policy
+        self.use_field_hints = use_field_hints
+        self.skip_fields = {_normalize_field(name) for name in (skip_fields or DEFAULT_SKIP_FIELDS)}
+        self.language = language
+        self.force_route = force_route
+        self.vault = vault
+        self.state = get_engine_state()
+        self.fields: List[_Field] = []
+        self.total = 0
+        self.skipped = 0
+        self.analyzer_calls = 0
+
+    def _consider(self, path: Tuple, label: str, name: Optional[str], value: Any) -> Optional[_Field]:
+        """Register a leaf value for analysis, or return None if policy skips it"""
+        self.total += 1
+        if name is not None and _normalize_field(name) in self.skip_fields:
+            self.skipped += 1
+            return None
+        hint = hinted_entities(name) if self.use_field_hints else None
+
+        if isinstance(value, bool) or value is None:
+            self.skipped += 1
+            return None
+        numeric = isinstance(value, (int, float)) or (isinstance(value, str) and NUMERIC_VALUE.match(value))
+        if numeric and (self.numeric_policy == "skip" or (self.numeric_policy == "hinted" and hint is None)):
+            self.skipped += 1
+            return None
+        text = value if isinstance(value, str) else str(value)
+        if not text.strip():
+            self.skipped += 1
+            return None
+
+        field = _Field(path, label, text, hint)
+        self.fields.append(field)
+        return field
+
+    def _analyze_fields(self):
+        """Batch fields by hint group, run one detection pass per group, split spans back"""
+        groups: Dict[Optional[frozenset], List[_Field]] = {}
+        for field in self.fields:
+            key = frozenset(field.hint) if field.hint is not None else None
+            groups.setdefault(key, []).append(field)
+
+        for key, fields in groups.items():
+            entities = set(key) if key is not None else None
+            parts = []
+            offset = 0
+            for field in fields:
+                field.offset = offset
+                parts.append(field.value)
+                offset += len(field.value) + len(FIELD_SEPARATOR)
+            batch = FIELD_SEPARATOR.join(parts)
+
+            if self.force_route:
+                route = self.force_route
+            elif entities is not None:
+                route = ROUTE_FULL if entities & NLP_ENTITIES else ROUTE_PATTERNS
+            else:
+                route = screen_text(batch)
+            if route == ROUTE_SKIP:
+                continue
+
+            spans = collect_spans(batch, self.language, route, self.state, entities)
+            self.analyzer_calls += 1
+
+            # Each span belongs to the field containing its start; clip at the field end
+            spans.sort(key=lambda span: span.start)
+            index = 0
+            for span in spans:
+                while index + 1 < len(fields) and span.start >= fields[index + 1].offset:
+                    index += 1
+                field = fields[index]
+                field_end = field.offset + len(field.value)
+                if span.start >= field_end:
+                    continue  # Inside a separator
+                span.start -= field.offset
+                span.end = min(span.end, field_end) - field.offset
+                field.spans.append(span)
+
+    def _redact_field(self, field: _Field) -> str:
+        spans = resolve_entity_conflicts(field.spans, self.state)
+        spans = merge_adjacent_locations(spans, field.value)
+        field.spans = spans
+        return redact_spans(field.value, spans, self.vault, self.state)
+
+    def redact_json(self, document: Any) -> Any:
+        """Redacted copy of a JSON document (dict/list tree)"""
+        leaves = []
+
+        def walk(node, path, name):
+            if isinstance(node, dict):
+                return {key: walk(value, path + (key,), key) for key, value in node.items()}
+            if isinstance(node, list):
+                return [walk(value, path + (index,), name) for index, value in enumerate(node)]
+            field = self._consider(path, _format_path(path), name, node)
+            if field is not None:
+                leaves.append((path, field, node))
+            return node
+
+        copy = walk(document, (), None)
+        self._analyze_fields()
+
+        # Replace only values with detections; the rest keep their original type
+        for path, field, _ in leaves:
+            if not field.spans:
+                continue
+            parent = copy
+            for key in path[:-1]:
+                parent = parent[key]
+            if path:
+                parent[path[-1]] = self._redact_field(field)
+            else:
+                copy = self._redact_field(field)
+        return copy
+
+    def redact_csv(self, content: str, has_header: bool = True) -> str:
+        """Redacted copy of CSV text (same rows, columns and dialect)"""
+        try:
+            dialect = csv.Sniffer().sniff(content[:4096], delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        rows = list(csv.reader(io.StringIO(content), dialect))
+        header = rows[0] if has_header and rows else None
+
+        cells = []
+        for row_index, row in enumerate(rows):
+            if header is not None and row_index == 0:
+                continue  # Column names are keys, never analyzed
+            for column, value in enumerate(row):
+                name = header[column] if header is not None and column < len(header) else None
+                label = f"[{row_index}].{name}" if name else f"[{row_index}][{column}]"
+                field = self._consider((row_index, column), label, name, value)
+                if field is not None:
+                    cells.append(field)
+
+        self._analyze_fields()
+        for field in cells:
+            if field.spans:
+                row_index, column = field.path
+                rows[row_index][column] = self._redact_field(field)
+
+        output = io.StringIO()
+        writer = csv.writer(output, dialect, lineterminator="\r\n" if "\r\n" in content else "\n")
+        writer.writerows(rows)
+        return output.getvalue()
+
+    def entities(self) -> List[Dict]:
+        """Detected entities with their field path and offsets within the field value"""
+        result = []
+        for field in self.fields:
+            for span in field.spans:
+                entity = span.to_dict(field.value)
+                entity["path"] = field.label
+                result.append(entity)
+        return result
+
+
+@profiled("analyze_structured")
+def analyze_structured(content: Any, format: str = "json", numeric_policy: str = "hinted",
+                       use_field_hints: bool = True, skip_fields: Optional[List[str]] = None,
+                       has_header: bool = True, language: str = DEFAULT_LANGUAGE,
+                       force_route: Optional[str] = None, vault=None) -> Dict:
+    """
+    Redact a JSON document or CSV text while preserving its structure
+
+    Args:
+        content: Parsed JSON (dict/list), JSON text, or CSV text
+        format: "json" or "csv"
+        numeric_policy: skip, hinted (only in fields like "phone") or analyze
+        use_field_hints: Narrow detection by field name (email, phone, pan, ...)
+        skip_fields: Field names never analyzed (default: id, _id, uuid, guid)
+        has_header: CSV only - first row holds the column names
+        language: Language code of the values
+        force_route: Force a pre-filter route (ROUTE_PATTERNS when degraded)
+        vault: Optional pseudonymizer.TokenVault for reversible tokens
+
+    Returns:
+        Dict with the redacted content, entities (with field paths), privacy
+        score and field counters
+    """
+    redactor = StructuredRedactor(numeric_policy, use_field_hints,
+                                  set(skip_fields) if skip_fields is not None else None,
+                                  language if language and language != "auto" else DEFAULT_LANGUAGE,
+                                  force_route, vault)
+    if format == "csv":
+        if not isinstance(content, str):
+            raise ValueError("CSV content must be a string")
+        redacted = redactor.redact_csv(content, has_header)
+    elif format == "json":
+        document = json.loads(content) if isinstance(content, str) else content
+        redacted = redactor.redact_json(document)
+    else:
+        raise ValueError("format must be json or csv")
+
+    all_spans = [span for field in redactor.fields for span in field.spans]
+    return {
+        "format": format,
+        "redacted": redacted,
+        "entities": redactor.entities(),
+        "privacy_score": score_spans(all_spans, redactor.state),
+        "fields_total": redactor.total,
+        "fields_analyzed": len(redactor.fields),
+        "fields_skipped": redactor.skipped,
+        "analyzer_calls": redactor.analyzer_calls,
+        "route": force_route or "structured",
+        "config_version": redactor.state.config_version,
+    }
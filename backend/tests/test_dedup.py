@@ -0,0 +1,31 @@
+"""
+Dedup tests - Repeated lines are cut out, other lines stay together
+"""
+from dedup import SegmentDeduplicator, group_segments, split_segments
+
+
+def test_text_without_repeats_stays_whole():
+    text = "Ship to:\n221 Baker Street\nLondon"
+    lines = split_segments(text)
+    assert group_segments(text, lines, [False] * len(lines)) == [(0, text, False)]
+
+
+def test_repeated_line_splits_the_runs():
+    text = "Hello team\nplease call 9876543210\n-- \nSent from my phone"
+    lines = split_segments(text)
+    repeated = [line == "Sent from my phone" for _, line in lines]
+    segments = group_segments(text, lines, repeated)
+    assert [segment for _, segment, _ in segments] == [
+        "Hello team\nplease call 9876543210\n-- ", "Sent from my phone"]
+    assert segments[1] == (text.index("Sent"), "Sent from my phone", True)
+
+
+def test_batch_dedups_signature_and_keeps_offsets():
+    deduplicator = SegmentDeduplicator()
+    texts = ["Mail a@b.com\nSig Line", "Call 9876543210\nSig Line"]
+    result = deduplicator.analyze_batch(texts)
+    assert result["dedup"]["segments"] == 4
+    assert result["dedup"]["unique_segments"] == 3
+    first, second = result["results"]
+    assert [e["text"] for e in first["entities"]] == ["a@b.com"]
+    assert [e["text"] for e in second["entities"]] == ["9876543210"]
@@ -0,0 +1,48 @@
+"""
+Gazetteer tests - Given names need a surname or a context cue
+"""
+import pytest
+
+from gazetteer import GazetteerRecognizer
+
+
+@pytest.fixture(scope="module")
+def recognizer():
+    recognizer = GazetteerRecognizer()
+    recognizer.load()
+    return recognizer
+
+
+def persons(recognizer, text):
+    return [text[result.start:result.end] for result in recognizer.analyze(text, ["PERSON"])]
+
+
+def test_given_and_family_name(recognizer):
+    assert persons(recognizer, "rahul sharma called") == ["rahul sharma"]
+
+
+def test_given_name_with_capitalized_surname(recognizer):
+    assert persons(recognizer, "Priya Venkataraman joined today") == ["Priya Venkataraman"]
+
+
+def test_given_name_after_cue(recognizer):
+    assert persons(recognizer, "Mr. Anand will call") == ["Anand"]
+    assert persons(recognizer, "Hi, I'm Priya and I need help") == ["Priya"]
+
+
+def test_bare_given_name_is_left_to_ner(recognizer):
+    assert persons(recognizer, "Kiran needs help with the report") == []
+
+
+def organizations(recognizer, text):
+    return [text[result.start:result.end] for result in recognizer.analyze(text, ["ORGANIZATION"])]
+
+
+def test_one_word_organization_needs_capital(recognizer):
+    assert organizations(recognizer, "I ate an apple and some sap") == []
+    assert organizations(recognizer, "She works at Apple now") == ["Apple"]
+
+
+def test_suffix_walk_back_stops_at_determiner(recognizer):
+    assert organizations(recognizer, "The Bank of England raised rates") == []
+    assert organizations(recognizer, "He joined Ravi Steels Pvt Ltd") == ["Ravi Steels Pvt Ltd"]
@@ -0,0 +1,20 @@
+"""
+Language Engines tests - Missing models fall back instead of failing requests
+"""
+import language_engines
+from language_engines import LanguageEngineRegistry
+
+
+def test_missing_model_is_marked_unavailable(monkeypatch):
+    monkeypatch.setitem(language_engines.NLP_MODELS, "hi", "no_such_spacy_model")
+    registry = LanguageEngineRegistry()
+
+    assert registry.get("hi") is None
+    assert registry.get("hi") is None
+    stats = registry.stats()
+    assert "hi" in stats["unavailable"]
+    assert stats["loads"] == 0
+
+
+def test_unconfigured_language_returns_none():
+    assert LanguageEngineRegistry().get("zz") is None
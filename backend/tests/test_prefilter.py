@@ -0,0 +1,24 @@
+"""
+Pre-filter Gate tests - Route decisions under each policy
+"""
+from prefilter import ROUTE_FULL, ROUTE_PATTERNS, ROUTE_SKIP, screen_text
+
+
+def test_sentence_initial_name_takes_full_route():
+    assert screen_text("Rahul needs help with his taxes.", policy="recall") == ROUTE_FULL
+
+
+def test_name_opening_a_later_sentence_takes_full_route():
+    assert screen_text("thanks for the reply. Priya will send the form.", policy="recall") == ROUTE_FULL
+
+
+def test_plain_question_skips_nlp_under_recall():
+    assert screen_text("Can you summarize the benefits of unit testing?", policy="recall") == ROUTE_PATTERNS
+
+
+def test_off_policy_always_full():
+    assert screen_text("how many bytes are in a kilobyte", policy="off") == ROUTE_FULL
+
+
+def test_blank_text_is_skipped():
+    assert screen_text("  ?! ", policy="recall") == ROUTE_SKIP
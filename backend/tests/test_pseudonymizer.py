@@ -0,0 +1,33 @@
+"""
+Pseudonymizer tests - Vault lifetime and per-turn detokenization
+"""
+import time
+
+from pseudonymizer import StreamingDetokenizer, VaultRegistry
+
+
+def test_turn_only_maps_back_its_own_tokens():
+    registry = VaultRegistry(spill_path="")
+    first = registry.get("s1").turn()
+    assert first.tokenize("PERSON", "Rahul") == "[PERSON_1]"
+
+    second = registry.get("s1").turn()
+    assert second.tokenize("EMAIL", "r@example.com") == "[EMAIL_1]"
+    reply = "Hello [PERSON_1], we wrote to [EMAIL_1]"
+    assert second.detokenize(reply) == "Hello [PERSON_1], we wrote to r@example.com"
+
+
+def test_streaming_detokenizer_uses_turn():
+    turn = VaultRegistry(spill_path="").get("s2").turn()
+    turn.tokenize("PERSON", "Priya")
+    detokenizer = StreamingDetokenizer(turn)
+    assert detokenizer.feed("Hi [PERS") + detokenizer.feed("ON_1]!") + detokenizer.flush() == "Hi Priya!"
+
+
+def test_get_keeps_an_active_vault_alive():
+    registry = VaultRegistry(ttl_seconds=1, spill_path="")
+    registry.get("s3").turn().tokenize("PERSON", "Arjun")
+    registry.get("s3").updated -= 0.8
+    registry.get("s3")  # touched again
+    time.sleep(0.3)
+    assert len(registry.get("s3")) == 1
@@ -0,0 +1,27 @@
+"""
+Recognizer Config tests - Invalid configs raise ValueError
+"""
+import json
+
+import pytest
+
+from recognizer_config import RECOGNIZER_CONFIG_PATH, load_recognizer_config
+
+
+def write_config(tmp_path, score):
+    with open(RECOGNIZER_CONFIG_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+    config["pattern_recognizers"][0]["patterns"][0]["score"] = score
+    path = tmp_path / "recognizers.json"
+    path.write_text(json.dumps(config), encoding="utf-8")
+    return str(path)
+
+
+def test_shipped_config_is_valid():
+    assert load_recognizer_config()["digest"]
+
+
+@pytest.mark.parametrize("score", ["0.8", None, True, 1.5])
+def test_bad_score_is_a_validation_error(tmp_path, score):
+    with pytest.raises(ValueError, match="plain_phone_recognizer"):
+        load_recognizer_config(write_config(tmp_path, score))
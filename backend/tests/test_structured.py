@@ -0,0 +1,31 @@
+"""
+Structured Mode tests - Field-name hints match whole words only
+"""
+import pytest
+
+from structured import hinted_entities
+
+
+@pytest.mark.parametrize("field", [
+    "hotel", "cancelled", "statement", "capacity", "ethnicity",
+    "updated_at", "linkedin", "username", "filename", "hostname",
+    "user_name", "file_name", "notes",
+])
+def test_names_without_a_hint_word_get_full_detection(field):
+    assert hinted_entities(field) is None
+
+
+@pytest.mark.parametrize("field, expected", [
+    ("email", {"EMAIL_ADDRESS"}),
+    ("contactEmail", {"EMAIL_ADDRESS"}),
+    ("mobile_no", {"PHONE_NUMBER"}),
+    ("pan_number", {"IN_PAN"}),
+    ("registration_date", {"DATE_TIME"}),
+    ("vehicle_registration", {"IN_VEHICLE_REGISTRATION"}),
+    ("firstName", {"PERSON"}),
+    ("city", {"LOCATION"}),
+    ("company_name", {"ORGANIZATION", "PERSON"}),
+    ("emails", {"EMAIL_ADDRESS"}),
+])
+def test_hint_words(field, expected):
+    assert hinted_entities(field) == expected
@@ -0,0 +1,145 @@
+"""
+Bench Engine - In-process throughput/latency benchmark of the NER backends
+Runs privacy_engine.analyze_text directly (no HTTP) from N concurrent threads
+and reports docs/sec and latency percentiles per NER backend, plus the ONNX
+micro-batcher's batch size, padding and queue wait. Each backend runs in its
+own subprocess because the backend is chosen when privacy_engine is imported
+
+Usage:
+    # Compare spaCy against the int8 ONNX model at 1, 4 and 16 concurrent callers
+    python tools/bench_engine.py --backends spacy,onnx --concurrency 1,4,16 --docs 400
+
+    # Texts from a file (one per line) instead of the built-in samples
+    python tools/bench_engine.py --backends onnx --texts prompts.txt --json bench.json
+
+Run from the backend directory (it imports privacy_engine).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List
+
+from loadtest import SAMPLE_TEXTS, percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_backend(backend: str, concurrency_levels: List[int], docs: int, texts: List[str], warmup: int) -> List[Dict]:
+    """Benchmark the backend this process was started with (NER_BACKEND)"""
+    sys.path.insert(0, BACKEND_DIR)
+    import privacy_engine
+    from prefilter import ROUTE_FULL
+
+    active = privacy_engine.ACTIVE_NER_BACKEND
+    if active != backend:
+        raise SystemExit(f"NER backend '{backend}' is unavailable (running '{active}')")
+    # Full NLP route only: the pre-filter would skip part of the work
+    route = ROUTE_FULL
+
+    for index in range(warmup):
+        privacy_engine.analyze_text(texts[index % len(texts)], force_route=route)
+
+    steps = []
+    for concurrency in concurrency_levels:
+        latencies: List[float] = []
+        lock = threading.Lock()
+        counter = iter(range(docs))
+
+        def worker():
+            while True:
+                with lock:
+                    index = next(counter, None)
+                if index is None:
+                    return
+                started = time.perf_counter()
+                privacy_engine.analyze_text(texts[index % len(texts)], force_route=route)
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    latencies.append(elapsed)
+
+        before = privacy_engine.onnx_model_stats() or {}
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+        after = privacy_engine.onnx_model_stats() or {}
+
+        step = {
+            "backend": backend,
+            "concurrency": concurrency,
+            "docs": docs,
+            "docs_per_sec": round(docs / wall, 1),
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+        }
+        if after:
+            batches = after["batches"] - before.get("batches", 0)
+            windows = after["windows"] - before.get("windows", 0)
+            step["mean_batch"] = round(windows / batches, 2) if batches else 0.0
+            step["padding_ratio"] = after["padding_ratio"]
+            step["queue_wait_p95_ms"] = after["queue_wait_p95_ms"]
+        steps.append(step)
+    return steps
+
+
+def print_table(steps: List[Dict]):
+    columns = ["backend", "concurrency", "docs_per_sec", "p50_ms", "p95_ms", "p99_ms",
+               "mean_batch", "padding_ratio", "queue_wait_p95_ms"]
+    print(" | ".join(f"{c:>17}" for c in columns))
+    for step in steps:
+        print(" | ".join(f"{str(step.get(c, '-')):>17}" for c in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NER backends in-process")
+    parser.add_argument("--backends", default="spacy,onnx", help="Comma-separated: spacy, onnx")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated caller thread counts")
+    parser.add_argument("--docs", type=int, default=200, help="Documents per concurrency level")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--texts", help="File with one text per line")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    texts = SAMPLE_TEXTS
+    if args.texts:
+        with open(args.texts, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+
+    if args.worker:
+        steps = run_backend(args.worker, concurrency_levels, args.docs, texts, args.warmup)
+        print(json.dumps(steps))
+        return
+
+    steps = []
+    for backend in [name.strip() for name in args.backends.split(",") if name.strip()]:
+        command = [sys.executable, os.path.abspath(__file__), "--worker", backend,
+                   "--concurrency", args.concurrency, "--docs", str(args.docs), "--warmup", str(args.warmup)]
+        if args.texts:
+            command += ["--texts", os.path.abspath(args.texts)]
+        env = dict(os.environ, NER_BACKEND=backend, PARALLEL_WORKERS="1")
+        print(f"Benchmarking {backend}...")
+        completed = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"  {backend} failed: {(completed.stderr or completed.stdout).strip().splitlines()[-1:]}")
+            continue
+        steps.extend(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    print()
+    print_table(steps)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"steps": steps}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Eval Profiles - Accuracy versus latency of the detection configurations
+Runs the labeled corpus in data/eval/pii_corpus.txt through privacy_engine for
+every combination of recognizer profile, NER backend, pre-filter policy and
+spaCy model, then reports per-entity precision/recall next to docs/sec and p95
+latency. The summary is a Pareto table: a configuration is marked when no other
+one is both faster and at least as accurate, so a faster mode can be turned on
+with a known recall cost. Each configuration runs in its own subprocess because
+these settings are read when privacy_engine is imported
+
+Usage:
+    # Every profile with spaCy, comparing the gate off against the default policy
+    python tools/eval_profiles.py --profiles full,india,us,minimal --policies off,recall
+
+    # spaCy large vs small vs the int8 ONNX backend, exact span boundaries
+    python tools/eval_profiles.py --backends spacy,onnx --models en_core_web_lg,en_core_web_sm --strict
+
+    # Keep the numbers for a later comparison
+    python tools/eval_profiles.py --json eval.json
+
+Corpus lines mark gold entities inline as [[ENTITY_TYPE:text]].
+Run from the backend directory (it imports privacy_engine).
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from loadtest import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_PATH = os.path.join(BACKEND_DIR, "data", "eval", "pii_corpus.txt")
+
+_MARKUP = re.compile(r"\[\[([A-Z_]+):(.+?)\]\]")
+
+Span = Tuple[str, int, int]
+
+
+def load_corpus(path: str = CORPUS_PATH) -> List[Dict]:
+    """
+    Parse the labeled corpus
+
+    Args:
+        path: Corpus file (one document per line, [[TYPE:text]] markup)
+
+    Returns:
+        List of {"text": plain text, "gold": [(entity_type, start, end), ...]}
+    """
+    docs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            text_parts = []
+            gold = []
+            position = 0
+            last = 0
+            for match in _MARKUP.finditer(line):
+                before = line[last:match.start()]
+                text_parts.append(before)
+                position += len(before)
+                value = match.group(2)
+                gold.append((match.group(1), position, position + len(value)))
+                text_parts.append(value)
+                position += len(value)
+                last = match.end()
+            text_parts.append(line[last:])
+            docs.append({"text": "".join(text_parts), "gold": gold})
+    return docs
+
+
+def run_config(backend: str, docs: List[Dict], repeat: int, warmup: int) -> Dict:
+    """Analyze the corpus with the configuration this process was started with"""
+    sys.path.insert(0, BACKEND_DIR)
+    import privacy_engine
+
+    active = privacy_engine.ACTIVE_NER_BACKEND
+    if active != backend:
+        raise SystemExit(f"NER backend '{backend}' is unavailable (running '{active}')")
+
+    texts = [doc["text"] for doc in docs]
+    for index in range(warmup):
+        privacy_engine.analyze_text(texts[index % len(texts)])
+
+    predictions = []
+    routes: Dict[str, int] = {}
+    for text in texts:
+        result = privacy_engine.analyze_text(text)
+        predictions.append([(e["entity_type"], e["start"], e["end"]) for e in result["entities"]])
+        routes[result["route"]] = routes.get(result["route"], 0) + 1
+
+    # Timing passes are separate so the accuracy pass doesn't count as warm-up
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            call_started = time.perf_counter()
+            privacy_engine.analyze_text(text)
+            latencies.append((time.perf_counter() - call_started) * 1000)
+    wall = time.perf_counter() - started
+
+    return {
+        "predictions": predictions,
+        "routes": routes,
+        "docs_per_sec": round(len(latencies) / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+    }
+
+
+def _overlaps(a: Span, b: Span) -> bool:
+    return a[1] < b[2] and b[1] < a[2]
+
+
+def score(docs: List[Dict], predictions: List[List[Span]], strict: bool = False) -> Dict[str, Dict]:
+    """
+    Count per-entity true/false positives and misses
+
+    A prediction matches a gold span of the same type when the spans overlap
+    (or, with strict, when the boundaries are identical). Each gold span and
+    each prediction is matched at most once.
+
+    Returns:
+        {entity_type: {"tp", "fp", "fn", "precision", "recall"}}
+    """
+    counts: Dict[str, Dict] = {}
+
+    def bucket(entity_type: str) -> Dict:
+        if entity_type not in counts:
+            counts[entity_type] = {"tp": 0, "fp": 0, "fn": 0}
+        return counts[entity_type]
+
+    for doc, predicted in zip(docs, predictions):
+        unmatched = [tuple(span) for span in predicted]
+        for gold in doc["gold"]:
+            hit = None
+            for span in unmatched:
+                if span[0] != gold[0]:
+                    continue
+                if (span == gold) if strict else _overlaps(span, gold):
+                    hit = span
+                    break
+            if hit is None:
+                bucket(gold[0])["fn"] += 1
+            else:
+                unmatched.remove(hit)
+                bucket(gold[0])["tp"] += 1
+        for span in unmatched:
+            bucket(span[0])["fp"] += 1
+
+    for entry in counts.values():
+        found = entry["tp"] + entry["fp"]
+        expected = entry["tp"] + entry["fn"]
+        entry["precision"] = round(entry["tp"] / found, 3) if found else None
+        entry["recall"] = round(entry["tp"] / expected, 3) if expected else None
+    return counts
+
+
+def summarize(per_entity: Dict[str, Dict], weights: Dict[str, int], default_weight: int) -> Dict:
+    """Micro precision/recall plus recall weighted by the privacy-score entity weights"""
+    tp = sum(entry["tp"] for entry in per_entity.values())
+    fp = sum(entry["fp"] for entry in per_entity.values())
+    fn = sum(entry["fn"] for entry in per_entity.values())
+    weighted_hit = weighted_total = 0
+    for entity_type, entry in per_entity.items():
+        weight = weights.get(entity_type, default_weight)
+        weighted_hit += weight * entry["tp"]
+        weighted_total += weight * (entry["tp"] + entry["fn"])
+    return {
+        "precision": round(tp / (tp + fp), 3) if tp + fp else 0.0,
+        "recall": round(tp / (tp + fn), 3) if tp + fn else 0.0,
+        "weighted_recall": round(weighted_hit / weighted_total, 3) if weighted_total else 0.0,
+    }
+
+
+def mark_pareto(results: List[Dict]):
+    """Flag configurations no other one beats on both weighted recall and docs/sec"""
+    for result in results:
+        result["pareto"] = not any(
+            other is not result
+            and other["weighted_recall"] >= result["weighted_recall"]
+            and other["docs_per_sec"] >= result["docs_per_sec"]
+            and (other["weighted_recall"] > result["weighted_recall"]
+                 or other["docs_per_sec"] > result["docs_per_sec"])
+            for other in results
+        )
+
+
+def print_tables(results: List[Dict]):
+    columns = ["config", "docs_per_sec", "p50_ms", "p95_ms", "precision", "recall", "weighted_recall", "pareto"]
+    width = max([len(result["config"]) for result in results] + [15])
+    print(" | ".join([f"{columns[0]:<{width}}"] + [f"{c:>15}" for c in columns[1:]]))
+    for result in sorted(results, key=lambda r: -r["docs_per_sec"]):
+        cells = [f"{result['config']:<{width}}"]
+        for column in columns[1:]:
+            value = result[column]
+            if column == "pareto":
+                value = "*" if value else ""
+            cells.append(f"{str(value):>15}")
+        print(" | ".join(cells))
+
+    # Per-entity precision/recall, one column per configuration
+    print()
+    entity_types = sorted({entity_type for result in results for entity_type in result["per_entity"]})
+    names = [result["config"] for result in results]
+    print(" | ".join([f"{'entity (P/R)':<24}"] + [f"{name:>{max(11, len(name))}}" for name in names]))
+    for entity_type in entity_types:
+        cells = [f"{entity_type:<24}"]
+        for result, name in zip(results, names):
+            entry = result["per_entity"].get(entity_type)
+            if entry is None:
+                cell = "-"
+            else:
+                precision = "-" if entry["precision"] is None else f"{entry['precision']:.2f}"
+                recall = "-" if entry["recall"] is None else f"{entry['recall']:.2f}"
+                cell = f"{precision}/{recall}"
+            cells.append(f"{cell:>{max(11, len(name))}}")
+        print(" | ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-entity accuracy vs latency of detection configurations")
+    parser.add_argument("--profiles", default="full,india,minimal", help="Comma-separated RECOGNIZER_PROFILE values")
+    parser.add_argument("--backends", default="spacy", help="Comma-separated NER_BACKEND values: spacy, onnx")
+    parser.add_argument("--policies", default="off,recall,precision", help="Comma-separated PREFILTER_POLICY values")
+    parser.add_argument("--models", default="", help="Comma-separated spaCy models for English (default: NLP_MODELS)")
+    parser.add_argument("--corpus", default=CORPUS_PATH, help="Labeled corpus file")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the corpus per configuration")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--strict", action="store_true", help="Require exact span boundaries (default: overlap)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    docs = load_corpus(args.corpus)
+    if args.worker:
+        print(json.dumps(run_config(args.worker, docs, args.repeat, args.warmup)))
+        return
+
+    sys.path.insert(0, BACKEND_DIR)
+    from recognizer_config import load_recognizer_config
+    recognizer_config = load_recognizer_config()
+    weights = recognizer_config["entity_weights"]
+    default_weight = recognizer_config.get("default_weight", 10)
+
+    def split(value: str) -> List[str]:
+        return [item.strip() for item in value.split(",") if item.strip()]
+
+    gold_count = sum(len(doc["gold"]) for doc in docs)
+    print(f"Corpus: {len(docs)} documents, {gold_count} labeled entities")
+
+    results = []
+    for profile, backend, policy, model in itertools.product(
+            split(args.profiles), split(args.backends), split(args.policies), split(args.models) or [None]):
+        name = "/".join(part for part in (profile, backend, policy, model) if part)
+        env = dict(os.environ, RECOGNIZER_PROFILE=profile, NER_BACKEND=backend,
+                   PREFILTER_POLICY=policy, PARALLEL_WORKERS="1")
+        if model:
+            env["NLP_MODELS"] = f"en:{model}"
+        command = [sys.executable, os.path.abspath(__file__), "--worker", backend, "--corpus",
+                   os.path.abspath(args.corpus), "--repeat", str(args.repeat), "--warmup", str(args.warmup)]
+        print(f"Evaluating {name}...")
+        completed = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"  {name} failed: {(completed.stderr or completed.stdout).strip().splitlines()[-1:]}")
+            continue
+        run = json.loads(completed.stdout.strip().splitlines()[-1])
+
+        per_entity = score(docs, run["predictions"], args.strict)
+        result = {
+            "config": name,
+            "profile": profile,
+            "backend": backend,
+            "policy": policy,
+            "model": model,
+            "docs_per_sec": run["docs_per_sec"],
+            "p50_ms": run["p50_ms"],
+            "p95_ms": run["p95_ms"],
+            "routes": run["routes"],
+            "per_entity": per_entity,
+        }
+        result.update(summarize(per_entity, weights, default_weight))
+        results.append(result)
+
+    if not results:
+        raise SystemExit("No configuration could be evaluated")
+    mark_pareto(results)
+    print()
+    print_tables(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"strict": args.strict, "documents": len(docs), "entities": gold_count,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Load Test - Async open-loop load generator for the securAI backend
+Drives /v1/analyze and the LLM forwarding paths (/v1/chat, /v1/chat/stream)
+at a target RPS and reports latency percentiles and the saturation point
+
+Usage:
+    # Single rate
+    python tools/loadtest.py --url http://localhost:8000 --target analyze --rps 20 --duration 30
+
+    # Ramp until saturation (p95 over the SLO, errors, or throughput falling behind)
+    python tools/loadtest.py --target chat --provider openai --ramp 5,10,20,40,80 --slo-ms 2000
+
+Run the backend against tools/mock_llm_server.py to load-test forwarding
+without hitting the real Gemini/OpenAI APIs.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List
+
+import aiohttp
+
+SAMPLE_TEXTS = [
+    "My name is Rahul Sharma and my phone number is 9876543210",
+    "Hi, I'm Sarah Johnson, email sarah.j@techcorp.com, I live at 123 Main Street, Boston MA 02118",
+    "what is the capital of france?",
+    "My PAN is ABCDE1234F and Aadhaar 1234 5678 9012, please fill the form",
+    "I work as a data scientist at Infosys Technologies in Bangalore",
+    "Can you summarize the benefits of unit testing?",
+    "Call me Priya, my card is 4111 1111 1111 1111",
+    "Write a haiku about the monsoon",
+]
+
+ENDPOINTS = {
+    "analyze": "/v1/analyze",
+    "chat": "/v1/chat",
+    "stream": "/v1/chat/stream",
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def _one_request(session: aiohttp.ClientSession, url: str, payload: Dict,
+                       stream: bool, results: List[Dict]):
+    started = time.perf_counter()
+    first_byte = None
+    status = 0
+    try:
+        async with session.post(url, json=payload) as response:
+            status = response.status
+            if stream:
+                async for _ in response.content.iter_any():
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - started
+            else:
+                await response.read()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        status = -1
+    elapsed = time.perf_counter() - started
+    results.append({"status": status, "latency": elapsed, "ttfb": first_byte})
+
+
+async def run_step(args, rps: float, texts: List[str]) -> Dict:
+    """Send requests at a fixed arrival rate (open loop) for args.duration seconds"""
+    url = args.url.rstrip("/") + ENDPOINTS[args.target]
+    stream = args.target == "stream"
+    results: List[Dict] = []
+    in_flight = set()
+    dropped = 0
+
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=args.max_in_flight)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        started = time.perf_counter()
+        sent = 0
+        while True:
+            now = time.perf_counter() - started
+            if now >= args.duration:
+                break
+            # Schedule by arrival time so slow responses don't lower the offered load
+            due = int(now * rps) + 1
+            while sent < due:
+                if len(in_flight) >= args.max_in_flight:
+                    dropped += 1
+                else:
+                    payload = {"text": random.choice(texts)}
+                    if args.target != "analyze":
+                        payload["llm_provider"] = args.provider
+                        payload["pseudonymize"] = args.pseudonymize
+                    task = asyncio.create_task(_one_request(session, url, payload, stream, results))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+                sent += 1
+            await asyncio.sleep(min(0.005, 1 / rps))
+        if in_flight:
+            await asyncio.wait(in_flight)
+        wall = time.perf_counter() - started
+
+    latencies = [r["latency"] * 1000 for r in results if r["status"] == 200]
+    errors = sum(1 for r in results if r["status"] != 200)
+    rate_limited = sum(1 for r in results if r["status"] == 429)
+    ttfbs = [r["ttfb"] * 1000 for r in results if r["ttfb"] is not None]
+    return {
+        "target_rps": rps,
+        "achieved_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "requests": len(results),
+        "dropped": dropped,
+        "errors": errors,
+        "rate_limited": rate_limited,
+        "error_rate": round(errors / len(results), 4) if results else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p90_ms": round(percentile(latencies, 90), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(max(latencies), 1) if latencies else 0.0,
+        "ttfb_p95_ms": round(percentile(ttfbs, 95), 1) if ttfbs else None,
+    }
+
+
+def is_saturated(step: Dict, args) -> bool:
+    return (step["achieved_rps"] < 0.9 * step["target_rps"]
+            or step["error_rate"] > args.max_error_rate
+            or step["dropped"] > 0
+            or (args.slo_ms and step["p95_ms"] > args.slo_ms))
+
+
+def print_table(steps: List[Dict]):
+    columns = ["target_rps", "achieved_rps", "requests", "errors", "rate_limited", "dropped",
+               "p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms", "ttfb_p95_ms"]
+    print(" | ".join(f"{c:>12}" for c in columns))
+    for step in steps:
+        print(" | ".join(f"{str(step[c]):>12}" for c in columns))
+
+
+async def main_async(args):
+    texts = SAMPLE_TEXTS
+    if args.texts:
+        with open(args.texts, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+
+    rates = [float(r) for r in args.ramp.split(",")] if args.ramp else [args.rps]
+    steps = []
+    saturation = None
+    for rps in rates:
+        step = await run_step(args, rps, texts)
+        steps.append(step)
+        print(f"{args.target} @ {rps} rps: p95={step['p95_ms']}ms achieved={step['achieved_rps']} "
+              f"errors={step['errors']} dropped={step['dropped']}")
+        if is_saturated(step, args):
+            saturation = rps
+            if args.ramp:
+                break
+
+    print()
+    print_table(steps)
+    if args.ramp:
+        print()
+        if saturation is None:
+            print(f"No saturation up to {rates[-1]} rps")
+        else:
+            print(f"Saturated at {saturation} rps")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"target": args.target, "steps": steps, "saturated_at": saturation}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load generator for the securAI backend")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--target", choices=sorted(ENDPOINTS), default="analyze")
+    parser.add_argument("--provider", choices=["gemini", "openai"], default="gemini")
+    parser.add_argument("--pseudonymize", action="store_true")
+    parser.add_argument("--rps", type=float, default=10)
+    parser.add_argument("--ramp", help="Comma-separated RPS steps, stops at saturation")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per step")
+    parser.add_argument("--max-in-flight", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--slo-ms", type=float, default=0, help="p95 latency SLO for saturation")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--texts", help="File with one prompt per line")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Mock LLM Server - Local stand-in for Gemini and OpenAI
+Implements the generateContent / streamGenerateContent and chat-completions
+(including SSE streaming) wire formats used by gemini_client.py and
+openai_client.py, with configurable latency, errors and 429s
+
+Usage:
+    python tools/mock_llm_server.py --port 9100 --latency-ms 400 --error-rate 0.01 --rate-limit-rate 0.02
+
+Then point the backend at it:
+    GEMINI_API_URL=http://localhost:9100/v1beta GEMINI_API_KEY=mock
+    OPENAI_API_URL=http://localhost:9100/v1/chat/completions OPENAI_API_KEY=mock
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from aiohttp import web
+
+
+def _reply_text(prompt: str) -> str:
+    """Deterministic reply that echoes the prompt (keeps placeholders/tokens intact)"""
+    return f"Mock reply to: {prompt[:200]}. Let me know if you need anything else."
+
+
+def _split_chunks(text: str, words_per_chunk: int):
+    words = text.split(" ")
+    for i in range(0, len(words), words_per_chunk):
+        chunk = " ".join(words[i:i + words_per_chunk])
+        yield chunk if i + words_per_chunk >= len(words) else chunk + " "
+
+
+class MockLLM:
+    def __init__(self, args):
+        self.latency_ms = args.latency_ms
+        self.jitter_ms = args.jitter_ms
+        self.error_rate = args.error_rate
+        self.rate_limit_rate = args.rate_limit_rate
+        self.chunk_words = args.chunk_words
+        self.chunk_delay_ms = args.chunk_delay_ms
+        self.counts = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    async def _delay(self):
+        delay = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+    def _injected_failure(self):
+        """Return an error response to inject, or None"""
+        self.counts["requests"] += 1
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            self.counts["rate_limited"] += 1
+            return web.json_response(
+                {"error": {"code": 429, "message": "Resource has been exhausted (mock)"}}, status=429)
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.counts["errors"] += 1
+            return web.json_response(
+                {"error": {"code": 500, "message": "Internal error (mock)"}}, status=500)
+        return None
+
+    # Gemini: POST {base}/models/<model>:generateContent | :streamGenerateContent?alt=sse
+    async def gemini(self, request: web.Request) -> web.StreamResponse:
+        path = request.match_info["tail"]
+        body = await request.json()
+        contents = body.get("contents") or [{}]
+        prompt = "".join(part.get("text", "") for part in contents[-1].get("parts", []))
+
+        await self._delay()
+        failure = self._injected_failure()
+        if failure is not None:
+            return failure
+
+        reply = _reply_text(prompt)
+        if path.endswith(":generateContent"):
+            return web.json_response({
+                "candidates": [{
+                    "content": {"role": "model", "parts": [{"text": reply}]},
+                    "finishReason": "STOP",
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": len(prompt) // 4 + 1,
+                    "candidatesTokenCount": len(reply) // 4 + 1,
+                },
+            })
+
+        if path.endswith(":streamGenerateContent"):
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for chunk in _split_chunks(reply, self.chunk_words):
+                event = {"candidates": [{"content": {"role": "model", "parts": [{"text": chunk}]}}]}
+                await response.write(f"data: {json.dumps(event)}\r\n\r\n".encode())
+                await asyncio.sleep(self.chunk_delay_ms / 1000)
+            await response.write_eof()
+            return response
+
+        return web.json_response({"error": {"code": 404, "message": "Unknown method"}}, status=404)
+
+    # OpenAI: POST /v1/chat/completions (stream=true for SSE)
+    async def openai(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        messages = body.get("messages") or [{}]
+        prompt = messages[-1].get("content", "")
+        model = body.get("model", "gpt-3.5-turbo")
+
+        await self._delay()
+        failure = self._injected_failure()
+        if failure is not None:
+            return failure
+
+        reply = _reply_text(prompt)
+        created = int(time.time())
+        if not body.get("stream"):
+            return web.json_response({
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply},
+                             "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": sum(len(m.get("content", "")) for m in messages) // 4 + 1,
+                    "completion_tokens": len(reply) // 4 + 1,
+                },
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for chunk in _split_chunks(reply, self.chunk_words):
+            event = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(event)}\n\n".encode())
+            await asyncio.sleep(self.chunk_delay_ms / 1000)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini and OpenAI APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=300, help="Mean time to first byte")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Std-dev of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests failing with 429")
+    parser.add_argument("--chunk-words", type=int, default=3, help="Words per streamed chunk")
+    parser.add_argument("--chunk-delay-ms", type=float, default=20, help="Delay between streamed chunks")
+    args = parser.parse_args()
+
+    mock = MockLLM(args)
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", mock.openai)
+    app.router.add_get("/stats", mock.stats)
+    app.router.add_post("/v1beta/{tail:.+}", mock.gemini)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
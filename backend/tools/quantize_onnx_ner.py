@@ -0,0 +1,128 @@
+"""
+Quantize ONNX NER - Export a Hugging Face NER model to int8 ONNX for NER_BACKEND=onnx
+Exports a token-classification model with dynamic batch/sequence axes,
+applies dynamic int8 weight quantization and writes the directory layout
+onnx_ner.py expects (model.onnx, tokenizer.json, config.json)
+
+Usage:
+    pip install torch transformers onnx onnxruntime
+    python tools/quantize_onnx_ner.py --model dslim/bert-base-NER --output models/ner-int8
+
+    # Compare int8 predictions against the fp32 export on a few texts
+    python tools/quantize_onnx_ner.py --model dslim/bert-base-NER --output models/ner-int8 --verify
+
+Any model whose labels use the B-/I- scheme works; map unusual label names
+with ONNX_NER_LABEL_MAP (e.g. "PERSON_NAME:PERSON").
+"""
+import argparse
+import json
+import os
+import time
+
+VERIFY_TEXTS = [
+    "My name is Rahul Sharma and I live in Bangalore",
+    "Hi, I'm Sarah Johnson from Boston, I work at Infosys Technologies",
+    "Priya Venkataraman met Arjun Reddy at the Chennai office of Tata Consultancy Services",
+    "Can you summarize the benefits of unit testing?",
+]
+
+
+def export(model_name: str, output_dir: str, opset: int) -> str:
+    """Export the fp32 model, tokenizer and config; returns the fp32 model path"""
+    import torch
+    from transformers import AutoModelForTokenClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    model = AutoModelForTokenClassification.from_pretrained(model_name)
+    model.eval()
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, "tokenizer.json"))
+    with open(os.path.join(output_dir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "source_model": model_name,
+            "id2label": {str(index): label for index, label in model.config.id2label.items()},
+        }, f, indent=2)
+
+    sample = tokenizer(VERIFY_TEXTS[0], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "tokens"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch", 1: "tokens"}
+    fp32_path = os.path.join(output_dir, "model-fp32.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    print(f"Exported {model_name} to {fp32_path} ({os.path.getsize(fp32_path) / 1e6:.1f} MB)")
+    return fp32_path
+
+
+def quantize(fp32_path: str, output_dir: str) -> str:
+    """Dynamic int8 quantization of the weights (activations stay fp32)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_path = os.path.join(output_dir, "model.onnx")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8, per_channel=True)
+    print(f"Quantized to {int8_path} ({os.path.getsize(int8_path) / 1e6:.1f} MB)")
+    return int8_path
+
+
+def verify(fp32_path: str, int8_path: str, output_dir: str):
+    """Report token-label agreement and latency of the int8 model against fp32"""
+    import numpy as np
+    import onnxruntime
+    from tokenizers import Tokenizer
+
+    tokenizer = Tokenizer.from_file(os.path.join(output_dir, "tokenizer.json"))
+    sessions = {
+        "fp32": onnxruntime.InferenceSession(fp32_path, providers=["CPUExecutionProvider"]),
+        "int8": onnxruntime.InferenceSession(int8_path, providers=["CPUExecutionProvider"]),
+    }
+    agree = total = 0
+    elapsed = {name: 0.0 for name in sessions}
+    for text in VERIFY_TEXTS:
+        encoding = tokenizer.encode(text)
+        feed = {
+            "input_ids": np.array([encoding.ids], dtype=np.int64),
+            "attention_mask": np.array([encoding.attention_mask], dtype=np.int64),
+            "token_type_ids": np.array([encoding.type_ids], dtype=np.int64),
+        }
+        labels = {}
+        for name, session in sessions.items():
+            inputs = {model_input.name: feed[model_input.name] for model_input in session.get_inputs()}
+            started = time.perf_counter()
+            logits = session.run(None, inputs)[0]
+            elapsed[name] += time.perf_counter() - started
+            labels[name] = logits[0].argmax(axis=-1)
+        agree += int((labels["fp32"] == labels["int8"]).sum())
+        total += len(encoding.ids)
+    print(f"Token label agreement int8 vs fp32: {agree / total:.2%} over {total} tokens")
+    for name, seconds in elapsed.items():
+        print(f"  {name}: {seconds / len(VERIFY_TEXTS) * 1000:.1f} ms/text (batch of 1)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and int8-quantize a NER model for NER_BACKEND=onnx")
+    parser.add_argument("--model", default="dslim/bert-base-NER", help="Hugging Face model name or path")
+    parser.add_argument("--output", default="models/ner-int8", help="Output directory (ONNX_NER_MODEL_DIR)")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--verify", action="store_true", help="Compare int8 against fp32 on sample texts")
+    parser.add_argument("--keep-fp32", action="store_true", help="Keep model-fp32.onnx next to the int8 model")
+    args = parser.parse_args()
+
+    fp32_path = export(args.model, args.output, args.opset)
+    int8_path = quantize(fp32_path, args.output)
+    if args.verify:
+        verify(fp32_path, int8_path, args.output)
+    if not args.keep_fp32:
+        os.remove(fp32_path)
+
+
+if __name__ == "__main__":
+    main()
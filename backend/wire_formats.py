@@ -0,0 +1,347 @@
+"""
+Wire Formats - Compressed and binary request/response bodies
+- CompressionMiddleware: decompresses gzip/zstd request bodies (bounded, so a
+  small upload can't expand without limit) and compresses responses above
+  WIRE_COMPRESS_MIN_BYTES with zstd or gzip per Accept-Encoding. Streamed
+  responses are flushed chunk by chunk; responses that already carry a
+  Content-Encoding (the static cache) pass through untouched
+- WireRoute / NegotiatedResponse: MessagePack request bodies and responses
+  (Content-Type / Accept: application/msgpack) on every route, next to JSON
+- NDJSON (Accept: application/x-ndjson) is offered by the batch endpoint, see
+  wants_ndjson
+"""
+import gzip
+import io
+import os
+import zlib
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import msgpack
+except ImportError:  # Optional dependency; JSON is always available
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency; gzip is always available
+    zstandard = None
+
+WIRE_COMPRESS_MIN_BYTES = int(os.getenv("WIRE_COMPRESS_MIN_BYTES", "1024"))
+WIRE_GZIP_LEVEL = int(os.getenv("WIRE_GZIP_LEVEL", "5"))
+WIRE_ZSTD_LEVEL = int(os.getenv("WIRE_ZSTD_LEVEL", "3"))
+# Limits for compressed request bodies (before and after decompression)
+WIRE_MAX_BODY_BYTES = int(os.getenv("WIRE_MAX_BODY_BYTES", str(16 * 1024 * 1024)))
+WIRE_MAX_DECOMPRESSED_BYTES = int(os.getenv("WIRE_MAX_DECOMPRESSED_BYTES", str(64 * 1024 * 1024)))
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+COMPRESSIBLE_TYPES = (
+    "application/json", NDJSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, "application/javascript",
+    "text/plain", "text/html", "text/css", "text/csv",
+)
+
+# Response format chosen for the current request ("json" or "msgpack")
+negotiated_format: ContextVar[str] = ContextVar("negotiated_format", default="json")
+
+
+class WireError(Exception):
+    """A request body that can't be decoded (carries the HTTP status to return)"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def quality_values(header: str) -> Dict[str, float]:
+    """Parse "gzip;q=0.8, zstd" into {"gzip": 0.8, "zstd": 1.0} (q=0 means refused)"""
+    values = {}
+    for part in header.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        values[name.strip()] = quality
+    return values
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Response encoding with the highest client q-value, or None for identity
+
+    Server preference (zstd, then gzip) only breaks ties; identity wins when
+    the client rates it above every compressed encoding it accepts.
+    """
+    accepted = quality_values(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, accepted.get("identity", 0.0)
+    for encoding in ("gzip", "zstd"):
+        if encoding == "zstd" and zstandard is None:
+            continue
+        quality = accepted.get(encoding, wildcard)
+        if quality > 0 and quality >= best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def accepts_media_type(accept: Optional[str], media_types) -> bool:
+    """True if the Accept header explicitly asks for one of media_types"""
+    if not accept:
+        return False
+    accepted = quality_values(accept)
+    return any(accepted.get(media_type, 0.0) > 0 for media_type in media_types)
+
+
+def wants_ndjson(request: Request) -> bool:
+    """True if the client asked for a streamed NDJSON response"""
+    return accepts_media_type(request.headers.get("accept"), (NDJSON_MEDIA_TYPE,))
+
+
+def decompress_body(body: bytes, encoding: str, limit: int = WIRE_MAX_DECOMPRESSED_BYTES) -> bytes:
+    """
+    Decompress a request body without letting it grow past a limit
+
+    Raises:
+        WireError: Unsupported encoding (415), too large (413) or corrupt (400)
+    """
+    if encoding in ("gzip", "x-gzip", "deflate"):
+        wbits = zlib.MAX_WBITS | 16 if encoding != "deflate" else zlib.MAX_WBITS
+        decompressor = zlib.decompressobj(wbits)
+        try:
+            data = decompressor.decompress(body, limit + 1)
+        except zlib.error as e:
+            raise WireError(400, f"Invalid {encoding} body: {str(e)}")
+        if len(data) > limit or decompressor.unconsumed_tail:
+            raise WireError(413, f"Decompressed body exceeds {limit} bytes")
+        if not decompressor.eof:
+            raise WireError(400, f"Truncated {encoding} body")
+        return data
+    if encoding == "zstd" and zstandard is not None:
+        try:
+            with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body)) as reader:
+                data = reader.read(limit + 1)
+        except zstandard.ZstdError as e:
+            raise WireError(400, f"Invalid {encoding} body: {str(e)}")
+        if len(data) > limit:
+            raise WireError(413, f"Decompressed body exceeds {limit} bytes")
+        return data
+    raise WireError(415, f"Unsupported Content-Encoding '{encoding}'")
+
+
+class _StreamCompressor:
+    """Incremental gzip/zstd compressor that can flush after each chunk"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=WIRE_ZSTD_LEVEL).compressobj()
+        else:
+            self._compressor = zlib.compressobj(WIRE_GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def chunk(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.compress(data)
+        if final:
+            return output + self._compressor.flush()
+        if self.encoding == "zstd":
+            return output + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return output + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def compress_body(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=WIRE_ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=WIRE_GZIP_LEVEL, mtime=0)
+
+
+class _CompressingSend:
+    """Wraps the ASGI send callable of one response"""
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.compressor: Optional[_StreamCompressor] = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether to compress
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=list(start["headers"]))
+            content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+            if ("content-encoding" in headers
+                    or start["status"] in (204, 304)
+                    or content_type not in COMPRESSIBLE_TYPES
+                    or (not more_body and len(body) < self.minimum_size)):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            headers["Content-Encoding"] = self.encoding
+            vary = headers.get("vary")
+            if not vary:
+                headers["Vary"] = "Accept-Encoding"
+            elif "accept-encoding" not in vary.lower():
+                headers["Vary"] = f"{vary}, Accept-Encoding"
+            if more_body:
+                # Streamed: compress chunk by chunk, length unknown
+                self.compressor = _StreamCompressor(self.encoding)
+                if "content-length" in headers:
+                    del headers["content-length"]
+                body = self.compressor.chunk(body, final=False)
+            else:
+                body = compress_body(body, self.encoding)
+                headers["Content-Length"] = str(len(body))
+            await self.send({**start, "headers": headers.raw})
+            await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        if self.passthrough or self.compressor is None:
+            await self.send(message)
+            return
+        await self.send({
+            "type": "http.response.body",
+            "body": self.compressor.chunk(body, final=not more_body),
+            "more_body": more_body,
+        })
+
+
+class CompressionMiddleware:
+    """ASGI middleware for compressed request and response bodies"""
+
+    def __init__(self, app, minimum_size: int = WIRE_COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        content_encoding = headers.get("content-encoding", "").strip().lower()
+        if content_encoding and content_encoding != "identity":
+            try:
+                body = decompress_body(await self._read_body(receive), content_encoding)
+            except WireError as e:
+                response = JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+                await response(scope, receive, send)
+                return
+            scope = dict(scope)
+            scope["headers"] = [
+                (name, value) for name, value in scope["headers"]
+                if name not in (b"content-encoding", b"content-length")
+            ] + [(b"content-length", str(len(body)).encode())]
+            receive = self._replay(body, receive)
+
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size))
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise WireError(400, "Client disconnected")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > WIRE_MAX_BODY_BYTES:
+                raise WireError(413, f"Compressed body exceeds {WIRE_MAX_BODY_BYTES} bytes")
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    @staticmethod
+    def _replay(body: bytes, receive):
+        sent = False
+
+        async def replay():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+        return replay
+
+
+class NegotiatedResponse(JSONResponse):
+    """JSON by default; MessagePack when the route negotiated it (see WireRoute)"""
+
+    def __init__(self, content=None, *args, **kwargs):
+        if negotiated_format.get() == "msgpack":
+            self.media_type = MSGPACK_MEDIA_TYPE
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content) -> bytes:
+        if self.media_type == MSGPACK_MEDIA_TYPE:
+            return msgpack.packb(content, use_bin_type=True)
+        return super().render(content)
+
+
+class WireRoute(APIRoute):
+    """Route that accepts MessagePack bodies and negotiates the response format"""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def wire_handler(request: Request) -> Response:
+            content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+            if content_type in MSGPACK_MEDIA_TYPES:
+                if msgpack is None:
+                    return JSONResponse(status_code=415, content={"detail": "MessagePack is not supported by this server"})
+                body = await request.body()
+                try:
+                    data = msgpack.unpackb(body, raw=False)
+                except (ValueError, msgpack.UnpackException) as e:
+                    return JSONResponse(status_code=400, content={"detail": f"Invalid MessagePack body: {str(e)}"})
+                # Hand FastAPI the decoded body as if it had parsed JSON
+                scope = dict(request.scope)
+                scope["headers"] = [
+                    (name, value) for name, value in scope["headers"] if name != b"content-type"
+                ] + [(b"content-type", b"application/json")]
+                request = Request(scope, request.receive)
+                request._body = body
+                request._json = data
+
+            wanted = "json"
+            if msgpack is not None and accepts_media_type(request.headers.get("accept"), MSGPACK_MEDIA_TYPES):
+                wanted = "msgpack"
+            token = negotiated_format.set(wanted)
+            try:
+                return await handler(request)
+            finally:
+                negotiated_format.reset(token)
+
+        return wire_handler